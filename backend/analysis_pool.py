@@ -0,0 +1,97 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+from checks import RuleSelection
+from telemetry import recording, replay
+from wcag_checker import WCAGChecker
+
+WARMUP_HTML = '<html lang="en"><body><main><h1>WebLens</h1><a href="/">Home</a></main></body></html>'
+
+
+class AnalysisQueueFullError(RuntimeError):
+    pass
+
+
+def analyze_html(html_content: str, url: Optional[str] = None, parser: Optional[str] = None, rules: RuleSelection = None) -> Dict[str, Any]:
+    # Module-level so it pickles by reference into the worker processes
+    return WCAGChecker(parser=parser, rules=rules).analyze_html(html_content, url)
+
+def _run_recorded(function: Callable[..., Any], *args: Any) -> Any:
+    # Runs in the worker; the metric observations made meanwhile go back
+    # with the result so the server process can add them to its registry
+    with recording() as observations:
+        result = function(*args)
+    return result, observations
+
+def _warm_worker() -> None:
+    # Runs once per worker process: imports the parser and checks and fills
+    # their caches before the first real page arrives
+    analyze_html(WARMUP_HTML, "warmup")
+
+
+class AnalysisPool:
+    # Parsing and checking are CPU bound, so they run in worker processes and
+    # the event loop only awaits them. Workers are replaced after
+    # `max_tasks_per_child` analyses and at most `max_queue` analyses may be
+    # waiting or running at once.
+    def __init__(self, workers: int, max_tasks_per_child: int, max_queue: int):
+        self.workers = workers
+        self.max_tasks_per_child = max_tasks_per_child or None
+        self.max_queue = max_queue
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self._executor = self._create_executor()
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_warm_worker,
+            max_tasks_per_child=self.max_tasks_per_child,
+        )
+
+    async def start(self) -> None:
+        # Workers are spawned on demand; one concurrent no-op per worker
+        # brings them all up before the first request
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[loop.run_in_executor(self._executor, os.getpid) for _ in range(self.workers)])
+
+    async def analyze(
+        self, html_content: str, url: str, parser: Optional[str] = None, rules: RuleSelection = None
+    ) -> Dict[str, Any]:
+        return await self.run(analyze_html, html_content, url, parser, rules)
+
+    async def run(self, function: Callable[..., Any], *args: Any) -> Any:
+        # `function` must be defined at module level so it can be pickled
+        if self.pending >= self.max_queue:
+            self.rejected += 1
+            raise AnalysisQueueFullError(f"Analysis queue is full ({self.max_queue} pages pending)")
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result, observations = await loop.run_in_executor(self._executor, _run_recorded, function, *args)
+        except BrokenProcessPool:
+            # A worker died mid-task (e.g. killed for memory); start over with
+            # a fresh pool so later requests are unaffected
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._create_executor()
+            raise
+        finally:
+            self.pending -= 1
+        self.completed += 1
+        replay(observations)
+        return result
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,89 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+from http_client import FetchError
+from report_cache import normalize_url
+from singleflight import SingleFlight
+
+
+class HostLimiter:
+    # One semaphore per host, shared by every batch, so no site receives
+    # more than `per_host` concurrent fetches. Semaphores are dropped when
+    # their host has no fetch in flight.
+    def __init__(self, per_host: int):
+        self.per_host = per_host
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._users: Dict[str, int] = {}
+
+    @asynccontextmanager
+    async def acquire(self, url: str) -> AsyncIterator[None]:
+        host = (urlsplit(url).hostname or "").lower()
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.per_host)
+            self._users[host] = 0
+        self._users[host] += 1
+        try:
+            async with self._semaphores[host]:
+                yield
+        finally:
+            self._users[host] -= 1
+            if not self._users[host]:
+                del self._semaphores[host]
+                del self._users[host]
+
+
+def error_detail(e: Exception) -> Dict[str, str]:
+    if isinstance(e, FetchError):
+        return e.as_dict()
+    return {"message": str(e), "type": type(e).__name__}
+
+
+async def audit_url(
+    checker: Any, url: str, cache: Optional[Any] = None, flights: Optional[SingleFlight] = None
+) -> Tuple[Dict[str, Any], Optional[str]]:
+    # Fetches and analyzes `url`, through the report cache when there is
+    # one. With `flights`, concurrent audits of the same page with the same
+    # parser and rules share one fetch and one analysis. Returns the report
+    # and the cache status.
+    async def audit() -> Tuple[Dict[str, Any], Optional[str]]:
+        if cache is None:
+            return await checker.analyze_url(url), None
+        return await cache.analyze(checker, url)
+
+    if flights is None:
+        return await audit()
+    key = (normalize_url(url), checker.parser_name, checker.rules_name)
+    (report, cache_status), _ = await flights.run(key, audit)
+    return {**report, "url": url}, cache_status
+
+
+class BatchRunner:
+    # Checks many URLs concurrently. `concurrency` bounds the pages in flight
+    # across all batches (fetch and analysis); the host limiter bounds the
+    # fetches per site. A fetched page is analyzed while other pages are
+    # still downloading.
+    def __init__(self, concurrency: int, per_host: int, flights: Optional[SingleFlight] = None):
+        self.slots = asyncio.Semaphore(concurrency)
+        self.hosts = HostLimiter(per_host)
+        self.flights = flights
+
+    async def _check_one(self, checker: Any, url: str, cache: Any) -> Dict[str, Any]:
+        async with self.slots:
+            try:
+                report, cache_status = await audit_url(checker, url, cache, self.flights)
+            except Exception as e:
+                return {"url": url, "report": None, "error": error_detail(e), "cache": None}
+        return {"url": url, "report": report, "error": None, "cache": cache_status}
+
+    async def run(self, checker: Any, urls: List[str], cache: Optional[Any] = None) -> Dict[str, Any]:
+        results = await asyncio.gather(*[self._check_one(checker, url, cache) for url in urls])
+        failed = sum(1 for result in results if result["error"] is not None)
+        return {
+            "results": results,
+            "summary": {
+                "total": len(results),
+                "succeeded": len(results) - failed,
+                "failed": failed,
+            },
+        }
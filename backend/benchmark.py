@@ -0,0 +1,251 @@
+import argparse
+import gc
+import json
+import platform
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from checks import RULES
+from parsers import available_parsers, parse_html
+from responses import encode_payload
+from settings import settings
+from wcag_checker import WCAGChecker
+
+# Times HTML parsing, each rule (WCAGChecker._check_<rule>), the metrics and
+# report serialization separately, over deterministic synthetic pages and
+# the saved fixtures. --save stores the timings as a JSON baseline;
+# --baseline compares against one and exits non-zero when any stage got
+# slower than --threshold times its baseline. --compare-parsers only times
+# parsing, with every installed parser backend.
+#
+#   python benchmark.py [--sizes 10k,100k,1m,10m] [--kinds mixed,forms] [--rounds N]
+#                       [--save FILE] [--baseline FILE] [--threshold 1.5] [--compare-parsers]
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+DEFAULT_SIZES = "10k,100k,1m"
+SEED = 1234
+# Slowdowns smaller than this are timer noise, whatever their ratio
+NOISE_FLOOR = 0.0005
+
+WORDS = (
+    "account order delivery search settings profile help contact terms price basket review "
+    "shipping update save cancel details summary history report payment address"
+).split()
+JARGON = ["API", "backend", "cache", "query", "runtime", "endpoint"]
+COLORS = ["#777", "#999", "#333", "red", "rgb(120, 120, 120)", "#fff", "hsl(0, 0%, 60%)", "navy"]
+
+def _sentence(rng: random.Random, words: int) -> str:
+    chosen = [rng.choice(WORDS) for _ in range(words)]
+    if rng.random() < 0.2:
+        chosen[rng.randrange(words)] = rng.choice(JARGON)
+    return " ".join(chosen).capitalize() + "."
+
+def _mixed_block(rng: random.Random, index: int) -> str:
+    # Article content: headings, paragraphs, images, links and styled text
+    level = rng.choice([2, 2, 3, 4])
+    parts = [f"<section id='s{index}'><h{level}>{_sentence(rng, 3)}</h{level}>"]
+    for _ in range(rng.randint(1, 4)):
+        style = f" style='color: {rng.choice(COLORS)}'" if rng.random() < 0.3 else ""
+        parts.append(f"<p class='body c{rng.randrange(8)}'{style}>{_sentence(rng, rng.randint(8, 60))}</p>")
+    if rng.random() < 0.5:
+        alt = f" alt='{_sentence(rng, 2)}'" if rng.random() < 0.6 else ""
+        parts.append(f"<img src='/img/{index}.png'{alt}>")
+    for _ in range(rng.randint(0, 3)):
+        text = rng.choice(["", "click here", _sentence(rng, 2)])
+        parts.append(f"<a href='/p/{rng.randrange(1000)}'>{text}</a>")
+    if rng.random() < 0.2:
+        parts.append(f"<div onclick='go({index})'>{_sentence(rng, 2)}</div>")
+    parts.append("</section>")
+    return "".join(parts)
+
+def _form_block(rng: random.Random, index: int) -> str:
+    # Forms with labelled, unlabelled, required and grouped controls
+    parts = [f"<form id='f{index}' action='/submit/{index}'>"]
+    for field in range(rng.randint(2, 8)):
+        name = f"{rng.choice(WORDS)}{index}_{field}"
+        kind = rng.choice(["text", "email", "password", "checkbox", "select", "textarea"])
+        if rng.random() < 0.6:
+            parts.append(f"<label for='{name}'>{_sentence(rng, 2)}</label>")
+        required = " required" if rng.random() < 0.3 else ""
+        if kind == "select":
+            options = "".join(f"<option>{rng.choice(WORDS)}</option>" for _ in range(rng.randint(2, 6)))
+            parts.append(f"<select id='{name}' name='{name}'{required}>{options}</select>")
+        elif kind == "textarea":
+            parts.append(f"<textarea id='{name}' name='{name}'{required}></textarea>")
+        else:
+            placeholder = f" placeholder='{rng.choice(WORDS)}'" if rng.random() < 0.5 else ""
+            parts.append(f"<input type='{kind}' id='{name}' name='{name}'{placeholder}{required}>")
+    parts.append(rng.choice(["<button type='submit'>Save</button>", "<button></button>", "<input type='submit'>"]))
+    parts.append("</form>")
+    return "".join(parts)
+
+def _table_block(rng: random.Random, index: int) -> str:
+    # Data tables, with and without header cells and captions
+    columns = rng.randint(3, 8)
+    parts = [f"<table id='t{index}'>"]
+    if rng.random() < 0.5:
+        parts.append(f"<caption>{_sentence(rng, 3)}</caption>")
+    if rng.random() < 0.6:
+        parts.append("<tr>" + "".join(f"<th>{rng.choice(WORDS)}</th>" for _ in range(columns)) + "</tr>")
+    for _ in range(rng.randint(3, 20)):
+        parts.append("<tr>" + "".join(f"<td>{rng.randrange(10000)}</td>" for _ in range(columns)) + "</tr>")
+    parts.append("</table>")
+    return "".join(parts)
+
+def _nested_block(rng: random.Random, index: int) -> str:
+    # Deeply nested wrappers around a little content
+    depth = rng.randint(50, 250)
+    opening = "".join(f"<div class='w{level % 7}'>" for level in range(depth))
+    return f"{opening}<span>{_sentence(rng, 4)}</span><a href='#n{index}'>{rng.choice(WORDS)}</a>{'</div>' * depth}"
+
+KINDS: Dict[str, Callable[[random.Random, int], str]] = {
+    "mixed": _mixed_block,
+    "forms": _form_block,
+    "tables": _table_block,
+    "nested": _nested_block,
+}
+
+def synthetic_page(kind: str, size: int, seed: int = SEED) -> str:
+    # The same kind, size and seed always give the same page
+    rng = random.Random(f"{seed}:{kind}:{size}")
+    head = (
+        "<!DOCTYPE html><html lang='en'><head><title>Benchmark</title><style>"
+        ".body { color: #555; background: #fff } .c3 { color: #aaa } nav a { color: navy }"
+        "@media (max-width: 600px) { .c5 { color: #bbb } }</style></head><body>"
+        "<nav><a href='/'>Home</a><a href='/help'>Help</a></nav><main>"
+    )
+    tail = "</main><footer><a href='/contact'>Contact</a></footer></body></html>"
+    parts = [head]
+    length = len(head) + len(tail)
+    block = KINDS[kind]
+    index = 0
+    while length < size:
+        part = block(rng, index)
+        parts.append(part)
+        length += len(part)
+        index += 1
+    parts.append(tail)
+    return "".join(parts)
+
+def best_time(function: Callable[[], object], rounds: int) -> float:
+    # Best of `rounds`, with the garbage collector paused as timeit does
+    best = float("inf")
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            start = time.perf_counter()
+            function()
+            best = min(best, time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return best
+
+def benchmark_page(checker: WCAGChecker, html: str, rounds: int) -> Dict[str, float]:
+    timings = {"parse": best_time(lambda: parse_html(html, checker.parser), rounds)}
+    soup = parse_html(html, checker.parser)
+
+    issues = []
+    for name in RULES:
+        method = getattr(checker, f"_check_{name}")
+        issues.extend(method(soup))
+        timings[f"rule:{name}"] = best_time(lambda: method(soup), rounds)
+    timings["metrics"] = best_time(lambda: checker._calculate_metrics(soup, issues), rounds)
+    timings["analyze"] = best_time(lambda: checker.analyze_soup(soup, "benchmark"), rounds)
+
+    report = checker.analyze_soup(soup, "benchmark")
+    timings["serialize:json"] = best_time(lambda: json.dumps(report), rounds)
+    timings["serialize:fast"] = best_time(lambda: encode_payload(report, "application/json"), rounds)
+    return timings
+
+def corpus(kinds: List[str], sizes: List[str], fixtures_dir: Path) -> List[Tuple[str, str]]:
+    pages = [(f"{kind}-{size}", synthetic_page(kind, SIZES[size])) for size in sizes for kind in kinds]
+    for fixture in sorted(fixtures_dir.glob("*.html")):
+        pages.append((f"fixture-{fixture.stem}", fixture.read_text(encoding="utf-8")))
+    return pages
+
+def run(pages: List[Tuple[str, str]], parser: Optional[str], rounds: int) -> Dict[str, float]:
+    checker = WCAGChecker(parser=parser, rules="all")
+    timings = {}
+    print(f"{'page':<20} {'KB':>8} {'parse ms':>10} {'analyze ms':>11}  slowest rule")
+    for page, html in pages:
+        stages = benchmark_page(checker, html, rounds)
+        slowest = max((stage for stage in stages if stage.startswith("rule:")), key=lambda stage: stages[stage])
+        print(
+            f"{page:<20} {len(html) / 1000:>8.0f} {stages['parse'] * 1000:>10.2f} {stages['analyze'] * 1000:>11.2f}"
+            f"  {slowest[5:]} ({stages[slowest] * 1000:.2f} ms)"
+        )
+        for stage, seconds in stages.items():
+            timings[f"{page}/{stage}"] = seconds
+    return timings
+
+def parse_times(pages: List[Tuple[str, str]], parsers: List[str], rounds: int) -> Dict[str, float]:
+    # Total parse time of the corpus per parser backend
+    return {
+        parser: sum(best_time(lambda: parse_html(html, parser), rounds) for _, html in pages)
+        for parser in parsers
+    }
+
+def regressions(timings: Dict[str, float], baseline: Dict[str, float], threshold: float) -> List[Tuple[str, float, float]]:
+    slower = []
+    for key, seconds in timings.items():
+        before = baseline.get(key)
+        if before is None:
+            continue
+        if seconds > before * threshold and seconds - before > NOISE_FLOOR:
+            slower.append((key, before, seconds))
+    return slower
+
+def main() -> int:
+    arg_parser = argparse.ArgumentParser(description="Parsing and rule micro-benchmarks")
+    arg_parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"comma-separated, from {', '.join(SIZES)}")
+    arg_parser.add_argument("--kinds", default=",".join(KINDS), help=f"comma-separated, from {', '.join(KINDS)}")
+    arg_parser.add_argument("--fixtures", default=str(FIXTURES_DIR))
+    arg_parser.add_argument("--parser", default=None)
+    arg_parser.add_argument("--rounds", type=int, default=5)
+    arg_parser.add_argument("--save", metavar="FILE", help="write the timings as a JSON baseline")
+    arg_parser.add_argument("--baseline", metavar="FILE", help="compare against a saved baseline")
+    arg_parser.add_argument("--threshold", type=float, default=1.5, help="allowed slowdown ratio")
+    arg_parser.add_argument("--compare-parsers", action="store_true", help="only time parsing, per installed backend")
+    args = arg_parser.parse_args()
+
+    sizes = [size for size in args.sizes.split(",") if size]
+    kinds = [kind for kind in args.kinds.split(",") if kind]
+    unknown = [name for name in sizes if name not in SIZES] + [name for name in kinds if name not in KINDS]
+    if unknown:
+        print(f"Unknown size or kind: {', '.join(unknown)}")
+        return 2
+
+    pages = corpus(kinds, sizes, Path(args.fixtures))
+    if args.compare_parsers:
+        print(f"{'parser':<12} {'parse ms':>10}")
+        for parser, seconds in sorted(parse_times(pages, available_parsers(), args.rounds).items(), key=lambda item: item[1]):
+            print(f"{parser:<12} {seconds * 1000:>10.2f}")
+        return 0
+
+    timings = run(pages, args.parser, args.rounds)
+
+    if args.save:
+        Path(args.save).write_text(json.dumps({
+            "python": platform.python_version(),
+            "parser": args.parser or settings.parser,
+            "rounds": args.rounds,
+            "timings": timings,
+        }, indent=2, sort_keys=True) + "\n")
+        print(f"Saved {len(timings)} timings to {args.save}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())["timings"]
+        slower = regressions(timings, baseline, args.threshold)
+        compared = len(timings.keys() & baseline.keys())
+        print(f"{compared} timings compared with {args.baseline}, threshold {args.threshold:g}x")
+        for key, before, seconds in sorted(slower, key=lambda item: item[2] / item[1], reverse=True):
+            print(f"  {key:<60} {before * 1000:>10.2f} ms -> {seconds * 1000:>10.2f} ms  ({seconds / before:.2f}x)")
+        return 1 if slower else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
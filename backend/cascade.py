@@ -0,0 +1,320 @@
+from bs4 import Tag
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
+import re
+import soupsieve
+from colors import BLACK, RGBA, WHITE, composite, parse_color, parse_declarations
+
+# Resolves each element's effective text and background color from its
+# style attribute and the document's <style> blocks. Only rules that set a
+# color property are kept, indexed by the id, class or tag their rightmost
+# compound selector requires, so an element is matched against a handful of
+# candidate rules rather than the whole stylesheet; ancestor requirements are
+# checked against the keys of the current ancestors before a selector is
+# evaluated. External stylesheets are not fetched.
+
+# Text color, background color, in that order; None when it cannot be
+# determined statically (var(), background images, ...)
+ColorState = Tuple[Optional[RGBA], Optional[RGBA]]
+ROOT_STATE: ColorState = (BLACK, WHITE)
+
+COLOR_PROPERTIES = {'color', 'background-color', 'background-image', 'background'}
+COMMENT_PATTERN = re.compile(r'/\*.*?\*/', re.DOTALL)
+BRACE_PATTERN = re.compile(r'[{}]')
+# At-rules whose rules apply to the normal on-screen rendering
+GROUPING_RULES = ('@media', '@supports', '@layer', '@container')
+SKIPPED_MEDIA = re.compile(r'\bprint\b|\bspeech\b|prefers-color-scheme\s*:\s*dark|forced-colors|prefers-contrast', re.IGNORECASE)
+NESTED_PATTERN = re.compile(r'\([^()]*\)|\[[^\[\]]*\]')
+COMBINATOR_PATTERN = re.compile(r'\s*([>+~])\s*|\s+')
+TAG_PATTERN = re.compile(r'[a-zA-Z][\w-]*')
+SIMPLE_COMPOUND_PATTERN = re.compile(r'(?:[a-zA-Z][\w-]*|\*)?(?:[#.]-?[_a-zA-Z][\w-]*)*')
+BUCKET_PREFERENCE = {'id': 0, 'class': 1, 'tag': 2}
+ID_PATTERN = re.compile(r'#(-?[_a-zA-Z][\w-]*)')
+CLASS_PATTERN = re.compile(r'\.(-?[_a-zA-Z][\w-]*)')
+TYPE_PATTERN = re.compile(r'(?:^|[\s>+~])([a-zA-Z][\w-]*)')
+PSEUDO_CLASS_PATTERN = re.compile(r'(?<!:):(?!:)[\w-]+')
+WHERE_PATTERN = re.compile(r':where\(')
+IMAGE_PATTERN = re.compile(r'url\(|gradient\(|image\(|image-set\(|element\(', re.IGNORECASE)
+INHERITED_VALUES = ('inherit', 'unset', 'revert', 'revert-layer')
+TRANSPARENT_VALUES = ('initial', 'transparent', 'none') + INHERITED_VALUES
+
+
+def _blocks(css: str) -> Iterator[Tuple[str, str]]:
+    # (prelude, body) for each top-level block
+    position = 0
+    while True:
+        opening = css.find('{', position)
+        if opening < 0:
+            return
+        depth = 1
+        cursor = opening + 1
+        while depth:
+            brace = BRACE_PATTERN.search(css, cursor)
+            if brace is None:
+                cursor = len(css) + 1
+                break
+            depth += 1 if brace.group() == '{' else -1
+            cursor = brace.end()
+        # Statements such as @import end with ';' before the next prelude
+        prelude = css[position:opening].rpartition(';')[2].strip()
+        yield prelude, css[opening + 1:cursor - 1]
+        position = cursor
+
+
+def screen_media(media: str) -> bool:
+    return not SKIPPED_MEDIA.search(media)
+
+
+def style_rules(css: str) -> Iterator[Tuple[str, str]]:
+    # (selector list, declarations) of every style rule that applies on
+    # screen, with grouping at-rules flattened
+    for prelude, body in _blocks(COMMENT_PATTERN.sub('', css)):
+        if not prelude.startswith('@'):
+            yield prelude, body
+        elif prelude.lower().startswith(GROUPING_RULES) and screen_media(prelude):
+            yield from style_rules(body)
+
+
+def _split_selectors(selectors: str) -> List[str]:
+    parts, depth, start = [], 0, 0
+    for position, char in enumerate(selectors):
+        if char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            parts.append(selectors[start:position])
+            start = position + 1
+    parts.append(selectors[start:])
+    return [part.strip() for part in parts if part.strip()]
+
+
+def _strip_nested(selector: str) -> str:
+    while True:
+        stripped = NESTED_PATTERN.sub('', selector)
+        if stripped == selector:
+            return stripped
+        selector = stripped
+
+
+def specificity(selector: str) -> Tuple[int, int, int]:
+    # Close to the CSS rules: arguments of :not()/:is()/:has() count, those
+    # of :where() do not
+    while True:
+        match = WHERE_PATTERN.search(selector)
+        if match is None:
+            break
+        depth, end = 1, match.end()
+        while end < len(selector) and depth:
+            depth += {'(': 1, ')': -1}.get(selector[end], 0)
+            end += 1
+        selector = selector[:match.start()] + selector[end:]
+    selector = re.sub(r'\[[^\]]*\]', '[]', selector)
+    selector = re.sub(r':(?:not|is|matches|has)\(', '(', selector)
+    ids = len(ID_PATTERN.findall(selector))
+    classes = len(CLASS_PATTERN.findall(selector)) + selector.count('[') + len(PSEUDO_CLASS_PATTERN.findall(selector))
+    types = len(TYPE_PATTERN.findall(selector.replace('(', ' '))) + selector.count('::')
+    return ids, classes, types
+
+
+def _compound_keys(compound: str) -> List[Tuple[str, str]]:
+    if '\\' in compound or '|' in compound:
+        return []
+    keys = [('id', value) for value in ID_PATTERN.findall(compound)]
+    keys += [('class', value) for value in CLASS_PATTERN.findall(compound)]
+    match = TAG_PATTERN.match(compound)
+    if match:
+        keys.append(('tag', match.group().lower()))
+    return keys
+
+
+def selector_keys(selector: str) -> Tuple[List[Tuple[str, str]], FrozenSet[Tuple[str, str]], bool]:
+    # The ids, classes and tag a matching element must have, those some of
+    # its ancestors must have, and whether the element's own keys alone
+    # decide the match
+    plain = _strip_nested(selector).strip()
+    parts = COMBINATOR_PATTERN.split(plain)
+    ancestors: Set[Tuple[str, str]] = set()
+    through_ancestor = False
+    for position in range(len(parts) - 2, 0, -2):
+        # Compounds left of a descendant or child combinator are ancestors;
+        # sibling compounds are not, but their ancestors are
+        if (parts[position] or ' ') in ' >':
+            through_ancestor = True
+        if through_ancestor:
+            ancestors.update(_compound_keys(parts[position - 1]))
+    simple = len(parts) == 1 and plain == selector and SIMPLE_COMPOUND_PATTERN.fullmatch(selector) is not None
+    return _compound_keys(parts[-1]), frozenset(ancestors), simple
+
+
+def element_keys(element: Tag) -> Set[Tuple[str, str]]:
+    keys = {('tag', element.name)}
+    value = element.get('id')
+    if isinstance(value, str) and value:
+        keys.add(('id', value))
+    value = element.get('class')
+    if value:
+        for token in value if isinstance(value, list) else value.split():
+            keys.add(('class', token))
+    return keys
+
+
+def _shorthand(value: str) -> List[Tuple[str, str]]:
+    # The background-color and background-image parts of `background`
+    lowered = value.lower()
+    if 'var(' in lowered:
+        return [('background-color', value), ('background-image', 'none')]
+    image = value if IMAGE_PATTERN.search(value) else 'none'
+    color = 'transparent'
+    for token in _split_selectors(re.sub(r'\s+(?![^(]*\))', ',', value)):
+        if parse_color(token) is not None:
+            color = token
+    return [('background-color', color), ('background-image', image)]
+
+
+@dataclass(slots=True)
+class StyleRule:
+    selector: str
+    specificity: Tuple[int, int, int]
+    order: int
+    declarations: Tuple[Tuple[str, str, bool], ...]
+    keys: FrozenSet[Tuple[str, str]]
+    ancestor_keys: FrozenSet[Tuple[str, str]]
+    simple: bool
+    compiled: Optional[soupsieve.SoupSieve] = None
+
+    def matches(self, element: Tag, keys: Set[Tuple[str, str]], ancestors: Set[Tuple[str, str]]) -> bool:
+        # Cheap rejections first, as browsers do: keys the element or its
+        # ancestors lack rule the selector out without evaluating it
+        if not self.keys <= keys:
+            return False
+        if self.simple:
+            return True
+        if not self.ancestor_keys <= ancestors:
+            return False
+        if self.compiled is None:
+            try:
+                self.compiled = soupsieve.compile(self.selector)
+            except (soupsieve.SelectorSyntaxError, NotImplementedError):
+                # Pseudo-elements and selectors soupsieve cannot evaluate
+                self.simple, self.keys = True, frozenset([('never', '')])
+                return False
+        return self.compiled.match(element)
+
+
+class StyleIndex:
+    # Rules bucketed by one id, class or tag their subject must have
+    def __init__(self, sheets: Iterable[str]):
+        self.buckets: Dict[Tuple[str, str], List[StyleRule]] = defaultdict(list)
+        self.universal: List[StyleRule] = []
+        self.size = 0
+        for css in sheets:
+            for selectors, body in style_rules(css):
+                declarations = tuple(d for d in parse_declarations(body) if d[0] in COLOR_PROPERTIES)
+                if not declarations:
+                    continue
+                for selector in _split_selectors(selectors):
+                    keys, ancestor_keys, simple = selector_keys(selector)
+                    rule = StyleRule(
+                        selector, specificity(selector), self.size, declarations, frozenset(keys), ancestor_keys, simple
+                    )
+                    if keys:
+                        # Ids are the most selective, then classes, then tags
+                        self.buckets[min(keys, key=lambda key: BUCKET_PREFERENCE[key[0]])].append(rule)
+                    else:
+                        self.universal.append(rule)
+                    self.size += 1
+
+    def matching(self, element: Tag, keys: Set[Tuple[str, str]], ancestors: Set[Tuple[str, str]]) -> List[StyleRule]:
+        matched = [rule for rule in self.universal if rule.matches(element, keys, ancestors)]
+        buckets = self.buckets
+        for key in keys:
+            if key in buckets:
+                matched += [rule for rule in buckets[key] if rule.matches(element, keys, ancestors)]
+        return matched
+
+
+class ColorCascade:
+    def __init__(self, sheets: Iterable[str]):
+        self.index = StyleIndex(sheets)
+
+    def declared(self, element: Tag, keys: Set[Tuple[str, str]], ancestors: Set[Tuple[str, str]]) -> Dict[str, str]:
+        # Winning value of each color property, by importance, origin
+        # (inline beats stylesheets), specificity and source order
+        winners: Dict[str, Tuple[Tuple, str]] = {}
+
+        def declare(name: str, value: str, rank: Tuple) -> None:
+            parts = _shorthand(value) if name == 'background' else [(name, value)]
+            for part, part_value in parts:
+                if part not in winners or winners[part][0] <= rank:
+                    winners[part] = (rank, part_value)
+
+        if self.index.size:
+            for rule in self.index.matching(element, keys, ancestors):
+                for name, value, important in rule.declarations:
+                    declare(name, value, (important, False, rule.specificity, rule.order))
+        style = element.get('style')
+        if isinstance(style, str) and style:
+            for position, (name, value, important) in enumerate(parse_declarations(style)):
+                if name in COLOR_PROPERTIES:
+                    declare(name, value, (important, True, (0, 0, 0), position))
+        return {name: value for name, (_, value) in winners.items()}
+
+    def resolve_all(self, elements: Iterable[Tag]) -> Iterator[Tuple[Tag, ColorState, ColorState, bool]]:
+        # Takes elements in document order, so parents are resolved before
+        # their children. Yields each element with its parent's colors, its
+        # own, and whether it sets a color itself.
+        states: Dict[int, ColorState] = {}
+        # Keys of the current ancestors, counted so nested elements sharing
+        # a key can be popped independently
+        counts: Counter = Counter()
+        ancestors: Set[Tuple[str, str]] = set()
+        stack: List[Tuple[Tag, Set[Tuple[str, str]]]] = []
+        for element in elements:
+            parent = element.parent
+            while stack and stack[-1][0] is not parent:
+                for key in stack.pop()[1]:
+                    counts[key] -= 1
+                    if not counts[key]:
+                        ancestors.discard(key)
+            keys = element_keys(element)
+            inherited = states.get(id(parent), ROOT_STATE)
+            state, sets_color = self.resolve(element, keys, ancestors, inherited)
+            states[id(element)] = state
+            yield element, inherited, state, sets_color
+            stack.append((element, keys))
+            counts.update(keys)
+            ancestors.update(keys)
+
+    def resolve(
+        self, element: Tag, keys: Set[Tuple[str, str]], ancestors: Set[Tuple[str, str]], inherited: ColorState
+    ) -> Tuple[ColorState, bool]:
+        declared = self.declared(element, keys, ancestors)
+        if not declared:
+            return inherited, False
+        color, background = inherited
+
+        value = declared.get('color', 'inherit').lower()
+        if value == 'initial':
+            color = BLACK
+        elif value not in INHERITED_VALUES and value != 'currentcolor':
+            color = parse_color(value)
+
+        if declared.get('background-image', 'none').lower() != 'none':
+            # Text over an image: the background cannot be known
+            return (color, None), True
+        value = declared.get('background-color', 'transparent').lower()
+        if value == 'currentcolor':
+            layer = color
+        elif value in TRANSPARENT_VALUES:
+            return (color, background), True
+        else:
+            layer = parse_color(value)
+        if layer is None:
+            background = None
+        elif layer[3] >= 1.0:
+            background = layer
+        elif background is not None:
+            background = composite(layer, background)
+        return (color, background), True
@@ -0,0 +1,1105 @@
+from bs4 import NavigableString, Tag
+from dataclasses import dataclass
+from typing import Dict, List, Literal, Optional, Sequence, Tuple, Type, Union, get_args
+import re
+from cascade import ColorCascade, screen_media
+from colors import RGBA, contrast_ratios
+from document_text import TermMatcher
+from snippets import SnippetRenderer
+from settings import settings
+from traversal import LANDMARK_TAGS, Visitor, Walk
+
+@dataclass(slots=True)
+class AccessibilityIssue:
+    type: str
+    element: str
+    location: str
+    severity: str
+    impact: str
+    description: str
+    # The offending element itself; serialized by a SnippetRenderer only
+    # when the report is built
+    code_snippet: Union[str, Tag]
+    wcag_criteria: str
+    # Fingerprint of the template subtree the issue was found in, for
+    # issues of local checks shared by every page with that subtree
+    template: Optional[str] = None
+
+    def as_dict(self, snippets: SnippetRenderer) -> Dict[str, str]:
+        issue = {
+            "type": self.type,
+            "element": self.element,
+            "location": self.location,
+            "severity": self.severity,
+            "impact": self.impact,
+            "description": self.description,
+            "code_snippet": snippets.render(self.code_snippet),
+            "wcag_criteria": self.wcag_criteria,
+        }
+        if self.template is not None:
+            issue["template"] = self.template
+        return issue
+
+
+# Bump whenever a check changes what it reports, so cached and stored
+# reports produced by older rules are not served
+RULESET_VERSION = "7"
+
+HEADING_TAGS = ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+FORM_CONTROL_TAGS = ['input', 'select', 'textarea']
+
+def string_matches(element: Tag, pattern: re.Pattern) -> bool:
+    # Same semantics as find_all(string=pattern) for tags
+    string = element.string
+    return string is not None and pattern.search(string) is not None
+
+
+class Check(Visitor):
+    # Rule group reported for the issues, as in WCAGChecker._check_<name>
+    name = ''
+    # Issue types the check can report
+    issue_types: Tuple[str, ...] = ()
+
+    def __init__(self):
+        self.issues: List[AccessibilityIssue] = []
+
+    def finish(self, walk: Walk) -> List[AccessibilityIssue]:
+        return self.issues
+
+    def records(self) -> List[AccessibilityIssue]:
+        return self.issues
+
+    def share(self, records: List[AccessibilityIssue], fingerprint: str) -> None:
+        # Cached issues outlive their document, so they keep a rendered
+        # snippet rather than the element
+        snippets = SnippetRenderer()
+        for issue in records:
+            issue.code_snippet = snippets.render(issue.code_snippet)
+            issue.template = fingerprint
+
+
+class FormScopedCheck(Check):
+    # Base for checks that aggregate per <form>; forms are tracked by id() as
+    # Tag equality is structural
+    def __init__(self):
+        super().__init__()
+        self.forms: List[Tag] = []
+
+    def visit_form(self, form: Tag) -> None:
+        self.forms.append(form)
+
+    def enclosing_forms(self, element: Tag, walk: Walk) -> List[int]:
+        return [id(form) for form in walk.enclosing_forms(element)]
+
+
+class ImagesCheck(Check):
+    name = 'images'
+    issue_types = ('missing_alt_text',)
+    tags = ['img']
+    local = True
+
+    def visit(self, img: Tag, walk: Walk) -> None:
+        if not img.get('alt'):
+            self.issues.append(AccessibilityIssue(
+                type="missing_alt_text",
+                element="img",
+                location=f"Image: {img.get('src', 'unknown')}",
+                severity="serious",
+                impact="Screen readers cannot describe the image content",
+                description="Image missing alternative text",
+                code_snippet=img,
+                wcag_criteria="WCAG 1.1.1 Non-text Content"
+            ))
+
+
+class FormsCheck(Check):
+    name = 'forms'
+    issue_types = ('missing_label',)
+    tags = FORM_CONTROL_TAGS
+
+    def __init__(self):
+        super().__init__()
+        self.controls: List[Tag] = []
+
+    def visit(self, element: Tag, walk: Walk) -> None:
+        self.controls.append(element)
+
+    def finish(self, walk: Walk) -> List[AccessibilityIssue]:
+        for input_el in self.controls:
+            if not input_el.get('id') or not walk.index.label_for(input_el['id']):
+                self.issues.append(AccessibilityIssue(
+                    type="missing_label",
+                    element=input_el.name,
+                    location=f"Form control: {input_el.get('name', 'unknown')}",
+                    severity="critical",
+                    impact="Screen reader users cannot identify form controls",
+                    description="Form control missing associated label",
+                    code_snippet=input_el,
+                    wcag_criteria="WCAG 3.3.2 Labels or Instructions"
+                ))
+        return self.issues
+
+
+class LandmarksCheck(Check):
+    name = 'landmarks'
+    issue_types = ('missing_landmark',)
+    tags = ['header', 'nav', 'main', 'footer', 'article', 'aside', 'section']
+
+    def __init__(self):
+        super().__init__()
+        self.seen = set()
+
+    def visit(self, element: Tag, walk: Walk) -> None:
+        self.seen.add(element.name)
+
+    def finish(self, walk: Walk) -> List[AccessibilityIssue]:
+        for tag in self.tags:
+            if tag not in self.seen:
+                self.issues.append(AccessibilityIssue(
+                    type="missing_landmark",
+                    element=tag,
+                    location="Document structure",
+                    severity="moderate",
+                    impact="Difficult to navigate page structure",
+                    description=f"Missing {tag} landmark",
+                    code_snippet="N/A",
+                    wcag_criteria="WCAG 1.3.1 Info and Relationships"
+                ))
+        return self.issues
+
+
+class HeadingsCheck(Check):
+    name = 'headings'
+    issue_types = ('heading_structure',)
+    tags = HEADING_TAGS
+
+    def __init__(self):
+        super().__init__()
+        self.current_level = 0
+
+    def visit(self, heading: Tag, walk: Walk) -> None:
+        level = int(heading.name[1])
+
+        if level == 1 and self.current_level > 0:
+            self.issues.append(AccessibilityIssue(
+                type="heading_structure",
+                element=heading.name,
+                location=f"Heading: {heading.text.strip()}",
+                severity="moderate",
+                impact="Improper heading structure affects navigation",
+                description="Multiple h1 tags found",
+                code_snippet=heading,
+                wcag_criteria="WCAG 2.4.6 Headings and Labels"
+            ))
+        elif level > self.current_level + 1:
+            self.issues.append(AccessibilityIssue(
+                type="heading_structure",
+                element=heading.name,
+                location=f"Heading: {heading.text.strip()}",
+                severity="moderate",
+                impact="Improper heading structure affects navigation",
+                description=f"Heading level skipped from h{self.current_level} to h{level}",
+                code_snippet=heading,
+                wcag_criteria="WCAG 2.4.6 Headings and Labels"
+            ))
+
+        self.current_level = level
+
+
+class LinksCheck(Check):
+    name = 'links'
+    issue_types = ('missing_href', 'empty_link')
+    tags = ['a']
+    local = True
+
+    def visit(self, link: Tag, walk: Walk) -> None:
+        if not link.get('href'):
+            self.issues.append(AccessibilityIssue(
+                type="missing_href",
+                element="a",
+                location=f"Link text: {link.text.strip()}",
+                severity="serious",
+                impact="Links without href are not accessible",
+                description="Link missing href attribute",
+                code_snippet=link,
+                wcag_criteria="WCAG 2.4.4 Link Purpose (In Context)"
+            ))
+        elif not link.text.strip():
+            self.issues.append(AccessibilityIssue(
+                type="empty_link",
+                element="a",
+                location=f"Link: {link.get('href', 'unknown')}",
+                severity="serious",
+                impact="Empty links are not accessible",
+                description="Link has no text",
+                code_snippet=link,
+                wcag_criteria="WCAG 2.4.4 Link Purpose (In Context)"
+            ))
+
+
+class ContrastCheck(Check):
+    TEXT_TAGS = {'p', 'span', 'div', 'a', 'li', 'button'}
+
+    name = 'contrast'
+    issue_types = ('low_contrast',)
+    # Colors are inherited, so every element is seen
+    tags = None
+
+    def __init__(self):
+        super().__init__()
+        self.elements: List[Tag] = []
+        self.sheets: List[str] = []
+        self.styled = False
+
+    def visit(self, element: Tag, walk: Walk) -> None:
+        self.elements.append(element)
+        if element.name == 'style':
+            media = element.get('media')
+            if not isinstance(media, str) or screen_media(media):
+                self.sheets.append(element.get_text())
+        elif 'style' in element.attrs:
+            self.styled = True
+
+    def finish(self, walk: Walk) -> List[AccessibilityIssue]:
+        if not self.styled and not self.sheets:
+            return self.issues
+        cascade = ColorCascade(self.sheets)
+
+        # An element is evaluated when it holds text of its own, or sets a
+        # color and contains text, unless an evaluated ancestor has the same
+        # colors
+        covered: Dict[int, bool] = {}
+        evaluated: List[Tuple[Tag, RGBA, RGBA]] = []
+        for element, inherited, state, sets_color in cascade.resolve_all(self.elements):
+            is_covered = state == inherited and covered.get(id(element.parent), False)
+            color, background = state
+            if (
+                not is_covered
+                and element.name in self.TEXT_TAGS
+                and color is not None
+                and background is not None
+                and self._shows_text(element, sets_color)
+            ):
+                evaluated.append((element, color, background))
+                is_covered = True
+            covered[id(element)] = is_covered
+
+        # All of the page's ratios in one batch; repeated pairs are computed once
+        ratios = contrast_ratios([(color, background) for _, color, background in evaluated])
+        for (element, _, _), ratio in zip(evaluated, ratios):
+            if ratio < 4.5:
+                self.issues.append(AccessibilityIssue(
+                    type="low_contrast",
+                    element=element.name,
+                    location=f"Element: {element.text.strip()}",
+                    severity="serious",
+                    impact="Low contrast text is hard to read",
+                    description="Text has insufficient color contrast",
+                    code_snippet=element,
+                    wcag_criteria="WCAG 1.4.3 Contrast (Minimum)"
+                ))
+        return self.issues
+
+    @staticmethod
+    def _shows_text(element: Tag, sets_color: bool) -> bool:
+        if sets_color:
+            return any(text.strip() for text in element.strings)
+        return any(type(child) is NavigableString and child.strip() for child in element.contents)
+
+
+class KeyboardNavCheck(Check):
+    name = 'keyboard_nav'
+    issue_types = ('keyboard_navigation',)
+    tags = ['button', 'a', 'input', 'select', 'textarea']
+    local = True
+
+    def visit(self, element: Tag, walk: Walk) -> None:
+        if element.get('tabindex') == '-1' or element.get('disabled'):
+            self.issues.append(AccessibilityIssue(
+                type="keyboard_navigation",
+                element=element.name,
+                location=f"Element: {element.get('id', 'unknown')}",
+                severity="critical",
+                impact="Element cannot be accessed via keyboard",
+                description="Interactive element not keyboard accessible",
+                code_snippet=element,
+                wcag_criteria="WCAG 2.1.1 Keyboard"
+            ))
+
+
+class TablesCheck(Check):
+    name = 'tables'
+    issue_types = ('table_headers',)
+    tags = ['table', 'th']
+
+    def __init__(self):
+        super().__init__()
+        self.tables: List[Tag] = []
+        self.with_headers = set()
+
+    def visit(self, element: Tag, walk: Walk) -> None:
+        if element.name == 'table':
+            self.tables.append(element)
+        else:
+            for table in walk.ancestors('table'):
+                self.with_headers.add(id(table))
+
+    def finish(self, walk: Walk) -> List[AccessibilityIssue]:
+        for table in self.tables:
+            if id(table) not in self.with_headers:
+                self.issues.append(AccessibilityIssue(
+                    type="table_headers",
+                    element="table",
+                    location=f"Table: {table.get('id', 'unknown')}",
+                    severity="serious",
+                    impact="Screen readers cannot identify table structure",
+                    description="Table missing header cells",
+                    code_snippet=table,
+                    wcag_criteria="WCAG 1.3.1 Info and Relationships"
+                ))
+        return self.issues
+
+
+class IframesCheck(Check):
+    name = 'iframes'
+    issue_types = ('iframe_title',)
+    tags = ['iframe']
+    local = True
+
+    def visit(self, iframe: Tag, walk: Walk) -> None:
+        if not iframe.get('title'):
+            self.issues.append(AccessibilityIssue(
+                type="iframe_title",
+                element="iframe",
+                location=f"Iframe: {iframe.get('src', 'unknown')}",
+                severity="serious",
+                impact="Screen readers cannot identify iframe content",
+                description="Iframe missing title attribute",
+                code_snippet=iframe,
+                wcag_criteria="WCAG 4.1.2 Name, Role, Value"
+            ))
+
+
+class VisibilityOfSystemStatusCheck(FormScopedCheck):
+    # The bracketed names are matched literally as tag names, exactly as
+    # find_all() treats them
+    SUBMIT_TAGS = ['button[type="submit"]', 'input[type="submit"]']
+    LOADING_PATTERN = re.compile(r'load(ing|er)|spinner|progress')
+
+    name = 'visibility_of_system_status'
+    issue_types = ('visibility_of_system_status',)
+    tags = ['form'] + SUBMIT_TAGS
+    attrs = ['class']
+
+    def __init__(self):
+        super().__init__()
+        self.has_loading_indicator = False
+        self.submittable = set()
+
+    def visit(self, element: Tag, walk: Walk) -> None:
+        if not self.has_loading_indicator and walk.index.class_matches(element, self.LOADING_PATTERN):
+            self.has_loading_indicator = True
+        if element.name == 'form':
+            self.visit_form(element)
+        elif element.name in self.SUBMIT_TAGS:
+            self.submittable.update(self.enclosing_forms(element, walk))
+
+    def finish(self, walk: Walk) -> List[AccessibilityIssue]:
+        # Check for loading indicators
+        if not self.has_loading_indicator:
+            self.issues.append(AccessibilityIssue(
+                type="visibility_of_system_status",
+                element="page",
+                location="Entire page",
+                severity="moderate",
+                impact="Users may be uncertain about system state during operations",
+                description="No visible loading indicators found",
+                code_snippet="N/A",
+                wcag_criteria="Nielsen's Heuristic 1: Visibility of System Status"
+            ))
+
+        # Check for feedback mechanisms
+        for form in self.forms:
+            if id(form) not in self.submittable:
+                self.issues.append(AccessibilityIssue(
+                    type="visibility_of_system_status",
+                    element="form",
+                    location=f"Form: {form.get('id', 'unknown')}",
+                    severity="moderate",
+                    impact="Users cannot clearly submit form or receive feedback",
+                    description="Form lacks clear submission mechanism",
+                    code_snippet=form,
+                    wcag_criteria="Nielsen's Heuristic 1: Visibility of System Status"
+                ))
+
+        return self.issues
+
+
+class MatchBetweenSystemAndRealWorldCheck(Check):
+    name = 'match_between_system_and_real_world'
+    issue_types = ('match_system_and_real_world',)
+    tags = ['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'label', 'button']
+
+    # Check for technical jargon in text
+    jargon = TermMatcher(term.strip() for term in settings.jargon_terms.split(','))
+
+    def __init__(self):
+        super().__init__()
+        self.elements: List[Tag] = []
+
+    def visit(self, element: Tag, walk: Walk) -> None:
+        self.elements.append(element)
+
+    def finish(self, walk: Walk) -> List[AccessibilityIssue]:
+        if not self.elements:
+            return self.issues
+        text = walk.text
+        occurrences = self.jargon.occurrences(text.text)
+        for element in self.elements:
+            if occurrences.within(text.span(element)) and not walk.annotation(element).preformatted:
+                self.issues.append(AccessibilityIssue(
+                    type="match_system_and_real_world",
+                    element=element.name,
+                    location=f"Text: {text.text_of(element, 30)}...",
+                    severity="minor",
+                    impact="Technical jargon may confuse non-technical users",
+                    description="Content contains technical jargon without explanation",
+                    code_snippet=element,
+                    wcag_criteria="Nielsen's Heuristic 2: Match Between System and Real World"
+                ))
+        return self.issues
+
+
+class UserControlAndFreedomCheck(FormScopedCheck):
+    STEP_PATTERN = re.compile(r'step|page')
+    BACK_PATTERN = re.compile(r'back|previous|cancel', re.IGNORECASE)
+    MODAL_PATTERN = re.compile(r'modal|overlay|dialog|popup', re.IGNORECASE)
+    CLOSE_TEXT_PATTERN = re.compile(r'close|cancel|×|✕|✖', re.IGNORECASE)
+    CLOSE_CLASS_PATTERN = re.compile(r'close|cancel|dismiss', re.IGNORECASE)
+
+    name = 'user_control_and_freedom'
+    issue_types = ('user_control_and_freedom',)
+    tags = ['form', 'fieldset', 'div', 'section', 'button', 'a']
+
+    def __init__(self):
+        super().__init__()
+        self.steps: Dict[int, int] = {}
+        self.with_back = set()
+        self.modals: List[Tag] = []
+        self.modal_ids = set()
+        self.closable = set()
+
+    def visit(self, element: Tag, walk: Walk) -> None:
+        name = element.name
+        if name == 'form':
+            self.visit_form(element)
+        elif name in ('button', 'a'):
+            if string_matches(element, self.BACK_PATTERN):
+                self.with_back.update(self.enclosing_forms(element, walk))
+            if self.modals and (string_matches(element, self.CLOSE_TEXT_PATTERN)
+                                or walk.index.class_matches(element, self.CLOSE_CLASS_PATTERN)):
+                for tag in walk.path:
+                    if id(tag) in self.modal_ids:
+                        self.closable.add(id(tag))
+        else:
+            if name != 'section' and walk.index.class_matches(element, self.STEP_PATTERN):
+                for form_id in self.enclosing_forms(element, walk):
+                    self.steps[form_id] = self.steps.get(form_id, 0) + 1
+            if name != 'fieldset' and walk.index.class_matches(element, self.MODAL_PATTERN):
+                self.modals.append(element)
+                self.modal_ids.add(id(element))
+
+    def finish(self, walk: Walk) -> List[AccessibilityIssue]:
+        # Check for back buttons in multi-step processes
+        for form in self.forms:
+            if self.steps.get(id(form), 0) > 1 and id(form) not in self.with_back:
+                self.issues.append(AccessibilityIssue(
+                    type="user_control_and_freedom",
+                    element="form",
+                    location=f"Multi-step form: {form.get('id', 'unknown')}",
+                    severity="moderate",
+                    impact="Users cannot easily go back or cancel actions in progress",
+                    description="Multi-step form lacks back/cancel options",
+                    code_snippet=form,
+                    wcag_criteria="Nielsen's Heuristic 3: User Control and Freedom"
+                ))
+
+        # Check for exit options in modals/overlays
+        for modal in self.modals:
+            if id(modal) not in self.closable:
+                self.issues.append(AccessibilityIssue(
+                    type="user_control_and_freedom",
+                    element="modal",
+                    location=f"Modal: {modal.get('id', 'unknown')}",
+                    severity="serious",
+                    impact="Users may be trapped in modal dialogs",
+                    description="Modal/overlay lacks close mechanism",
+                    code_snippet=modal,
+                    wcag_criteria="Nielsen's Heuristic 3: User Control and Freedom"
+                ))
+
+        return self.issues
+
+
+class ConsistencyAndStandardsCheck(FormScopedCheck):
+    CUSTOM_CONTROL_PATTERN = re.compile(r'checkbox|radio|select|dropdown', re.IGNORECASE)
+    NATIVE_TAGS = ['input[type="checkbox"]', 'input[type="radio"]', 'select']
+
+    name = 'consistency_and_standards'
+    issue_types = ('consistency_and_standards',)
+    tags = ['button', 'form', 'div', 'span'] + NATIVE_TAGS
+
+    def __init__(self):
+        super().__init__()
+        self.button_count = 0
+        self.button_classes = set()
+        self.first_custom: Dict[int, Tag] = {}
+        self.custom_ids = set()
+        self.with_native = set()
+
+    def visit(self, element: Tag, walk: Walk) -> None:
+        name = element.name
+        if name == 'button':
+            self.button_count += 1
+            if element.get('class'):
+                self.button_classes.update(element.get('class'))
+        elif name == 'form':
+            self.visit_form(element)
+        elif name in ('div', 'span'):
+            if walk.index.class_matches(element, self.CUSTOM_CONTROL_PATTERN):
+                form_ids = self.enclosing_forms(element, walk)
+                if form_ids:
+                    self.custom_ids.add(id(element))
+                for form_id in form_ids:
+                    self.first_custom.setdefault(form_id, element)
+
+        if name in self.NATIVE_TAGS and self.custom_ids:
+            # A native control inside a custom control counts for every form
+            # enclosing that custom control
+            forms_above = []
+            for tag in walk.path:
+                if tag.name == 'form':
+                    forms_above.append(id(tag))
+                elif id(tag) in self.custom_ids:
+                    self.with_native.update(forms_above)
+
+    def finish(self, walk: Walk) -> List[AccessibilityIssue]:
+        # Check for inconsistent button styling
+        if self.button_count > 3 and len(self.button_classes) > self.button_count // 2:
+            self.issues.append(AccessibilityIssue(
+                type="consistency_and_standards",
+                element="button",
+                location="Throughout page",
+                severity="minor",
+                impact="Inconsistent design makes interface less intuitive",
+                description="Buttons have inconsistent styling throughout the page",
+                code_snippet="N/A",
+                wcag_criteria="Nielsen's Heuristic 4: Consistency and Standards"
+            ))
+
+        # Check for non-standard form controls
+        for form in self.forms:
+            custom = self.first_custom.get(id(form))
+            if custom is not None and id(form) not in self.with_native:
+                self.issues.append(AccessibilityIssue(
+                    type="consistency_and_standards",
+                    element="form",
+                    location=f"Form: {form.get('id', 'unknown')}",
+                    severity="moderate",
+                    impact="Custom controls may behave unexpectedly compared to browser defaults",
+                    description="Form uses custom controls instead of native HTML elements",
+                    code_snippet=custom,
+                    wcag_criteria="Nielsen's Heuristic 4: Consistency and Standards"
+                ))
+
+        return self.issues
+
+
+class ErrorPreventionCheck(FormScopedCheck):
+    REQUIRED_PATTERN = re.compile(r'\*|required', re.IGNORECASE)
+    DELETE_PATTERN = re.compile(r'delete|remove|clear all', re.IGNORECASE)
+    CONFIRM_PATTERN = re.compile(r'confirm|warning|alert', re.IGNORECASE)
+
+    name = 'error_prevention'
+    issue_types = ('error_prevention',)
+    tags = ['form', 'button', 'a'] + FORM_CONTROL_TAGS
+
+    def __init__(self):
+        super().__init__()
+        self.required: Dict[int, List[Tag]] = {}
+        self.aria_required: Dict[int, List[Tag]] = {}
+        self.action_issues: List[AccessibilityIssue] = []
+
+    def visit(self, element: Tag, walk: Walk) -> None:
+        name = element.name
+        if name == 'form':
+            self.visit_form(element)
+        elif name in ('button', 'a'):
+            # Check for confirmation on important actions
+            if (string_matches(element, self.DELETE_PATTERN) and not element.get('data-confirm')
+                    and not self.CONFIRM_PATTERN.search(str(element.parent))):
+                self.action_issues.append(AccessibilityIssue(
+                    type="error_prevention",
+                    element=element.name,
+                    location=f"Action: {element.get_text().strip()}",
+                    severity="serious",
+                    impact="Destructive actions without confirmation may lead to unintended data loss",
+                    description="Potentially destructive action lacks confirmation step",
+                    code_snippet=element,
+                    wcag_criteria="Nielsen's Heuristic 5: Error Prevention"
+                ))
+        if name in FORM_CONTROL_TAGS:
+            if element.get('required') is not None:
+                for form_id in self.enclosing_forms(element, walk):
+                    self.required.setdefault(form_id, []).append(element)
+            if element.get('aria-required') == 'true':
+                for form_id in self.enclosing_forms(element, walk):
+                    self.aria_required.setdefault(form_id, []).append(element)
+
+    def finish(self, walk: Walk) -> List[AccessibilityIssue]:
+        # Check for required fields
+        for form in self.forms:
+            required_fields = self.required.get(id(form), []) + self.aria_required.get(id(form), [])
+            for field in required_fields:
+                label = walk.index.label_for(field.get('id', ''))
+                if label and not self.REQUIRED_PATTERN.search(label.get_text()):
+                    self.issues.append(AccessibilityIssue(
+                        type="error_prevention",
+                        element=field.name,
+                        location=f"Field: {field.get('name', 'unknown')}",
+                        severity="moderate",
+                        impact="Users may not realize a field is required until after submission",
+                        description="Required field not visually indicated as required",
+                        code_snippet=field,
+                        wcag_criteria="Nielsen's Heuristic 5: Error Prevention"
+                    ))
+
+        self.issues.extend(self.action_issues)
+        return self.issues
+
+
+class RecognitionOverRecallCheck(Check):
+    COMPLEX_INPUT_TAGS = ['input[type="date"]', 'input[type="datetime-local"]', 'input[type="number"]', 'input[pattern]']
+    HELP_TAGS = ['small', 'span', 'div']
+
+    name = 'recognition_over_recall'
+    issue_types = ('recognition_over_recall',)
+    tags = ['input', 'textarea'] + COMPLEX_INPUT_TAGS
+
+    def __init__(self):
+        super().__init__()
+        self.complex_inputs: List[Tag] = []
+
+    def visit(self, input_el: Tag, walk: Walk) -> None:
+        if input_el.name in self.COMPLEX_INPUT_TAGS:
+            self.complex_inputs.append(input_el)
+            return
+
+        # Check for input placeholders that disappear
+        if input_el.get('placeholder') and not input_el.get('title') and not input_el.get('aria-label'):
+            self.issues.append(AccessibilityIssue(
+                type="recognition_over_recall",
+                element=input_el.name,
+                location=f"Input: {input_el.get('name', 'unknown')}",
+                severity="minor",
+                impact="Users must remember information after it disappears",
+                description="Input relies solely on placeholder text that disappears when typing",
+                code_snippet=input_el,
+                wcag_criteria="Nielsen's Heuristic 6: Recognition Rather Than Recall"
+            ))
+
+    def finish(self, walk: Walk) -> List[AccessibilityIssue]:
+        # Check for help text availability
+        for input_el in self.complex_inputs:
+            help_text: Optional[Tag] = None
+            input_id = input_el.get('id', '')
+            # Check for adjacent help text
+            if input_id:
+                help_text = walk.index.first_with_id_matching(re.compile(f"{input_id}-help|help-{input_id}"), self.HELP_TAGS)
+                if not help_text:
+                    help_text = walk.index.first(walk.index.described_by, input_id, self.HELP_TAGS)
+
+            if not help_text and not input_el.get('title'):
+                self.issues.append(AccessibilityIssue(
+                    type="recognition_over_recall",
+                    element=input_el.name,
+                    location=f"Input: {input_el.get('name', 'unknown')}",
+                    severity="moderate",
+                    impact="Users must recall correct input format without guidance",
+                    description="Complex input lacks helper text or format guidance",
+                    code_snippet=input_el,
+                    wcag_criteria="Nielsen's Heuristic 6: Recognition Rather Than Recall"
+                ))
+
+        return self.issues
+
+
+class FlexibilityAndEfficiencyCheck(Check):
+    PAGINATION_PATTERN = re.compile(r'pagination', re.IGNORECASE)
+
+    name = 'flexibility_and_efficiency'
+    issue_types = ('flexibility_and_efficiency',)
+    tags = ['main', 'body', 'a', 'div', 'nav', 'input', 'select']
+    attrs = ['accesskey']
+
+    def __init__(self):
+        super().__init__()
+        self.main: Optional[Tag] = None
+        self.main_depth = 0
+        self.body: Optional[Tag] = None
+        self.body_depth = 0
+        self.shortcut_in_main = False
+        self.shortcut_in_body = False
+        self.has_skip_links = False
+        self.pagination: Optional[Tag] = None
+        self.pagination_depth = 0
+        self.pagination_has_goto = False
+        self.pagination_links = 0
+
+    def visit(self, element: Tag, walk: Walk) -> None:
+        name = element.name
+        if 'accesskey' in element.attrs:
+            if walk.has_ancestor(self.main, self.main_depth):
+                self.shortcut_in_main = True
+            if walk.has_ancestor(self.body, self.body_depth):
+                self.shortcut_in_body = True
+
+        if name == 'main' and self.main is None:
+            self.main, self.main_depth = element, walk.depth
+        elif name == 'body' and self.body is None:
+            self.body, self.body_depth = element, walk.depth
+        elif name == 'a':
+            if element.get('href') in ('#content', '#main'):
+                self.has_skip_links = True
+            if walk.has_ancestor(self.pagination, self.pagination_depth):
+                self.pagination_links += 1
+        elif name in ('input', 'select'):
+            if walk.has_ancestor(self.pagination, self.pagination_depth):
+                self.pagination_has_goto = True
+        elif name in ('div', 'nav'):
+            if self.pagination is None and walk.index.class_matches(element, self.PAGINATION_PATTERN):
+                self.pagination, self.pagination_depth = element, walk.depth
+
+    def finish(self, walk: Walk) -> List[AccessibilityIssue]:
+        # Check for keyboard shortcuts
+        main_content = self.main or self.body
+        if main_content:
+            has_keyboard_shortcuts = self.shortcut_in_main if self.main else self.shortcut_in_body
+
+            if not has_keyboard_shortcuts:
+                self.issues.append(AccessibilityIssue(
+                    type="flexibility_and_efficiency",
+                    element="page",
+                    location="Entire page",
+                    severity="minor",
+                    impact="Power users cannot use keyboard shortcuts for efficiency",
+                    description="No keyboard shortcuts (accesskey) found for main actions",
+                    code_snippet="N/A",
+                    wcag_criteria="Nielsen's Heuristic 7: Flexibility and Efficiency of Use"
+                ))
+
+            if not self.has_skip_links:
+                self.issues.append(AccessibilityIssue(
+                    type="flexibility_and_efficiency",
+                    element="navigation",
+                    location="Page navigation",
+                    severity="moderate",
+                    impact="Keyboard users must tab through all navigation items on every page",
+                    description="No skip navigation links found",
+                    code_snippet="N/A",
+                    wcag_criteria="Nielsen's Heuristic 7: Flexibility and Efficiency of Use"
+                ))
+
+        # Check for pagination without shortcuts
+        if self.pagination:
+            if not self.pagination_has_goto and self.pagination_links > 5:
+                self.issues.append(AccessibilityIssue(
+                    type="flexibility_and_efficiency",
+                    element="pagination",
+                    location="Pagination controls",
+                    severity="minor",
+                    impact="Users must click through many pages without direct access",
+                    description="Pagination lacks 'go to page' functionality",
+                    code_snippet=self.pagination,
+                    wcag_criteria="Nielsen's Heuristic 7: Flexibility and Efficiency of Use"
+                ))
+
+        return self.issues
+
+
+class AestheticAndMinimalistDesignCheck(Check):
+    MAX_DEPTH = 10
+
+    name = 'aesthetic_and_minimalist_design'
+    issue_types = ('aesthetic_and_minimalist',)
+    tags = None
+
+    def __init__(self):
+        super().__init__()
+        self.long_paragraphs: List[Tag] = []
+        self.deeply_nested: Optional[Tag] = None
+
+    def visit(self, element: Tag, walk: Walk) -> None:
+        if element.name == 'p' and walk.text.length(element) > 500:
+            self.long_paragraphs.append(element)
+        if self.deeply_nested is None and walk.depth > self.MAX_DEPTH:
+            self.deeply_nested = element
+
+    def finish(self, walk: Walk) -> List[AccessibilityIssue]:
+        # Check for excessive text
+        if self.long_paragraphs:
+            self.issues.append(AccessibilityIssue(
+                type="aesthetic_and_minimalist",
+                element="p",
+                location=f"{len(self.long_paragraphs)} paragraphs",
+                severity="minor",
+                impact="Excessive text creates cognitive load and reduces readability",
+                description="Multiple long paragraphs of text found",
+                code_snippet=self.long_paragraphs[0],
+                wcag_criteria="Nielsen's Heuristic 8: Aesthetic and Minimalist Design"
+            ))
+
+        # Check for excessive nesting
+        if self.deeply_nested is not None:
+            self.issues.append(AccessibilityIssue(
+                type="aesthetic_and_minimalist",
+                element="structure",
+                location="Document structure",
+                severity="moderate",
+                impact="Overly complex DOM structure impacts performance and maintainability",
+                description="Excessively deep HTML nesting detected",
+                code_snippet=self.deeply_nested,
+                wcag_criteria="Nielsen's Heuristic 8: Aesthetic and Minimalist Design"
+            ))
+
+        return self.issues
+
+
+class HelpUsersWithErrorsCheck(FormScopedCheck):
+    ERROR_CONTAINER_PATTERN = re.compile(r'error|invalid|alert', re.IGNORECASE)
+
+    name = 'help_users_with_errors'
+    issue_types = ('help_users_with_errors',)
+    tags = ['form', 'div', 'span', 'input', 'textarea', 'select']
+
+    def __init__(self):
+        super().__init__()
+        self.with_error_container = set()
+        self.input_issues: List[AccessibilityIssue] = []
+
+    def visit(self, element: Tag, walk: Walk) -> None:
+        name = element.name
+        if name == 'form':
+            self.visit_form(element)
+        elif name in ('div', 'span'):
+            if walk.index.class_matches(element, self.ERROR_CONTAINER_PATTERN):
+                self.with_error_container.update(self.enclosing_forms(element, walk))
+        else:
+            # Check for inline validation attributes
+            input_el = element
+            if input_el.get('pattern') or input_el.get('min') or input_el.get('max') or input_el.get('required'):
+                if not input_el.get('title') and not (input_el.get('aria-describedby')):
+                    self.input_issues.append(AccessibilityIssue(
+                        type="help_users_with_errors",
+                        element=input_el.name,
+                        location=f"Input: {input_el.get('name', 'unknown')}",
+                        severity="moderate",
+                        impact="Users not informed about validation requirements",
+                        description="Input with validation constraints lacks error explanation",
+                        code_snippet=input_el,
+                        wcag_criteria="Nielsen's Heuristic 9: Help Users Recognize, Diagnose, and Recover from Errors"
+                    ))
+
+    def finish(self, walk: Walk) -> List[AccessibilityIssue]:
+        # Check for error message containers
+        for form in self.forms:
+            if id(form) not in self.with_error_container:
+                self.issues.append(AccessibilityIssue(
+                    type="help_users_with_errors",
+                    element="form",
+                    location=f"Form: {form.get('id', 'unknown')}",
+                    severity="serious",
+                    impact="Users cannot identify or fix form submission errors",
+                    description="Form lacks error message containers",
+                    code_snippet=form,
+                    wcag_criteria="Nielsen's Heuristic 9: Help Users Recognize, Diagnose, and Recover from Errors"
+                ))
+
+        self.issues.extend(self.input_issues)
+        return self.issues
+
+
+class HelpAndDocumentationCheck(Check):
+    HELP_PATTERN = re.compile(r'help|support|documentation|faq|guide', re.IGNORECASE)
+    COMPLEX_TAGS = ['[role="application"]', '[role="dialog"]', '[data-toggle="tooltip"]']
+
+    name = 'help_and_documentation'
+    issue_types = ('help_and_documentation',)
+    tags = ['a', 'button'] + COMPLEX_TAGS
+
+    def __init__(self):
+        super().__init__()
+        self.has_help_links = False
+        self.element_issues: List[AccessibilityIssue] = []
+
+    def visit(self, element: Tag, walk: Walk) -> None:
+        if element.name in ('a', 'button'):
+            if not self.has_help_links and string_matches(element, self.HELP_PATTERN):
+                self.has_help_links = True
+            return
+
+        # Check for tooltips on complex elements
+        has_tooltip = element.get('title') or element.get('aria-describedby')
+        if not has_tooltip:
+            self.element_issues.append(AccessibilityIssue(
+                type="help_and_documentation",
+                element=element.name,
+                location=f"Element: {element.get('id', 'unknown')}",
+                severity="minor",
+                impact="Users lack contextual help for complex interface elements",
+                description="Complex UI element lacks tooltip or description",
+                code_snippet=element,
+                wcag_criteria="Nielsen's Heuristic 10: Help and Documentation"
+            ))
+
+    def finish(self, walk: Walk) -> List[AccessibilityIssue]:
+        # Check for help/documentation links
+        if not self.has_help_links:
+            self.issues.append(AccessibilityIssue(
+                type="help_and_documentation",
+                element="page",
+                location="Entire page",
+                severity="minor",
+                impact="Users cannot find help when needed",
+                description="No help or documentation links found",
+                code_snippet="N/A",
+                wcag_criteria="Nielsen's Heuristic 10: Help and Documentation"
+            ))
+
+        self.issues.extend(self.element_issues)
+        return self.issues
+
+
+class ElementStats(Visitor):
+    # Element counts and coverage figures for _calculate_metrics, gathered in
+    # the same walk as the checks
+    INTERACTIVE_TAGS = {'a', 'button', 'input', 'select', 'textarea'}
+
+    tags = None
+
+    def __init__(self):
+        self.total = 0
+        self.interactive = 0
+        self.images = 0
+        self.images_with_alt = 0
+        self.forms = 0
+        self.headings = 0
+        self.landmarks = 0
+        self.form_controls: List[Tag] = []
+        self.labeled_controls = 0
+        # Elements per depth, top-level elements first
+        self.depth_counts: List[int] = []
+
+    def visit(self, element: Tag, walk: Walk) -> None:
+        name = element.name
+        self.total += 1
+        if walk.depth > len(self.depth_counts):
+            self.depth_counts.append(0)
+        self.depth_counts[walk.depth - 1] += 1
+        if name in self.INTERACTIVE_TAGS:
+            self.interactive += 1
+        if name in FORM_CONTROL_TAGS:
+            self.form_controls.append(element)
+        elif name == 'img':
+            self.images += 1
+            if element.get('alt'):
+                self.images_with_alt += 1
+        elif name == 'form':
+            self.forms += 1
+        elif name in HEADING_TAGS:
+            self.headings += 1
+        elif name in LANDMARK_TAGS:
+            self.landmarks += 1
+
+    def finish(self, walk: Walk) -> 'ElementStats':
+        self.labeled_controls = len([
+            ctrl for ctrl in self.form_controls
+            if ctrl.get('id') and walk.index.label_for(ctrl.get('id'))
+        ])
+        return self
+
+
+# Check visitors in the order their issues appear in a report
+WCAG_CHECKS = [
+    ImagesCheck,
+    FormsCheck,
+    LandmarksCheck,
+    HeadingsCheck,
+    LinksCheck,
+    ContrastCheck,
+    KeyboardNavCheck,
+    TablesCheck,
+    IframesCheck,
+]
+
+HEURISTIC_CHECKS = [
+    VisibilityOfSystemStatusCheck,
+    MatchBetweenSystemAndRealWorldCheck,
+    UserControlAndFreedomCheck,
+    ConsistencyAndStandardsCheck,
+    ErrorPreventionCheck,
+    RecognitionOverRecallCheck,
+    FlexibilityAndEfficiencyCheck,
+    AestheticAndMinimalistDesignCheck,
+    HelpUsersWithErrorsCheck,
+    HelpAndDocumentationCheck,
+]
+
+# Rule registry: every check by name, and the profiles a request can select
+RULES: Dict[str, Type[Check]] = {check.name: check for check in WCAG_CHECKS + HEURISTIC_CHECKS}
+PROFILES: Dict[str, List[Type[Check]]] = {
+    'wcag': WCAG_CHECKS,
+    'heuristics': HEURISTIC_CHECKS,
+    'all': WCAG_CHECKS + HEURISTIC_CHECKS,
+}
+ProfileName = Literal['wcag', 'heuristics', 'all']
+RuleName = Literal[
+    'images', 'forms', 'landmarks', 'headings', 'links', 'contrast', 'keyboard_nav', 'tables', 'iframes',
+    'visibility_of_system_status', 'match_between_system_and_real_world', 'user_control_and_freedom',
+    'consistency_and_standards', 'error_prevention', 'recognition_over_recall', 'flexibility_and_efficiency',
+    'aesthetic_and_minimalist_design', 'help_users_with_errors', 'help_and_documentation',
+]
+# Spelled out for type checkers; must list exactly the registered rules
+assert set(get_args(RuleName)) == set(RULES), "RuleName is out of date with RULES"
+assert set(get_args(ProfileName)) == set(PROFILES), "ProfileName is out of date with PROFILES"
+# A profile name or a list of rule names
+RuleSelection = Union[str, Sequence[str], None]
+
+
+class UnknownRuleError(ValueError):
+    pass
+
+
+def select_checks(rules: RuleSelection = None) -> List[Type[Check]]:
+    # Selected checks in report order; None runs the server's default profile
+    if rules is None:
+        rules = settings.rules
+    if isinstance(rules, str):
+        if rules not in PROFILES:
+            raise UnknownRuleError(f"Unknown rule profile '{rules}'; expected one of {', '.join(PROFILES)}")
+        return PROFILES[rules]
+    unknown = [name for name in rules if name not in RULES]
+    if unknown:
+        raise UnknownRuleError(f"Unknown rules: {', '.join(unknown)}")
+    if not rules:
+        raise UnknownRuleError("No rules selected")
+    return [check for check in PROFILES['all'] if check.name in rules]
+
+
+def selection_key(checks: List[Type[Check]]) -> str:
+    # Stable name of a selection, for cache keys: the profile it matches or
+    # its rule names in report order
+    for name, profile in PROFILES.items():
+        if checks == profile:
+            return name
+    return ','.join(check.name for check in checks)
@@ -0,0 +1,170 @@
+import colorsys
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy
+except ImportError:
+    numpy = None  # type: ignore[assignment]
+
+# CSS colors normalized to (r, g, b, alpha) with every channel in 0..1.
+# Parsed colors, luminances and contrast ratios are memoized in bounded
+# caches, since pages repeat the same few color pairs many times.
+
+RGBA = Tuple[float, float, float, float]
+
+COLOR_CACHE_SIZE = 4096
+PAIR_CACHE_SIZE = 16384
+# Below this many distinct pairs the cached scalar path is faster than NumPy
+NUMPY_MIN_PAIRS = 64
+WHITE: RGBA = (1.0, 1.0, 1.0, 1.0)
+BLACK: RGBA = (0.0, 0.0, 0.0, 1.0)
+
+NAMED_COLORS: Dict[str, str] = dict(item.split(":") for item in """
+aliceblue:f0f8ff antiquewhite:faebd7 aqua:00ffff aquamarine:7fffd4 azure:f0ffff beige:f5f5dc bisque:ffe4c4
+black:000000 blanchedalmond:ffebcd blue:0000ff blueviolet:8a2be2 brown:a52a2a burlywood:deb887
+cadetblue:5f9ea0 chartreuse:7fff00 chocolate:d2691e coral:ff7f50 cornflowerblue:6495ed cornsilk:fff8dc
+crimson:dc143c cyan:00ffff darkblue:00008b darkcyan:008b8b darkgoldenrod:b8860b darkgray:a9a9a9
+darkgreen:006400 darkgrey:a9a9a9 darkkhaki:bdb76b darkmagenta:8b008b darkolivegreen:556b2f
+darkorange:ff8c00 darkorchid:9932cc darkred:8b0000 darksalmon:e9967a darkseagreen:8fbc8f
+darkslateblue:483d8b darkslategray:2f4f4f darkslategrey:2f4f4f darkturquoise:00ced1 darkviolet:9400d3
+deeppink:ff1493 deepskyblue:00bfff dimgray:696969 dimgrey:696969 dodgerblue:1e90ff firebrick:b22222
+floralwhite:fffaf0 forestgreen:228b22 fuchsia:ff00ff gainsboro:dcdcdc ghostwhite:f8f8ff gold:ffd700
+goldenrod:daa520 gray:808080 green:008000 greenyellow:adff2f grey:808080 honeydew:f0fff0 hotpink:ff69b4
+indianred:cd5c5c indigo:4b0082 ivory:fffff0 khaki:f0e68c lavender:e6e6fa lavenderblush:fff0f5
+lawngreen:7cfc00 lemonchiffon:fffacd lightblue:add8e6 lightcoral:f08080 lightcyan:e0ffff
+lightgoldenrodyellow:fafad2 lightgray:d3d3d3 lightgreen:90ee90 lightgrey:d3d3d3 lightpink:ffb6c1
+lightsalmon:ffa07a lightseagreen:20b2aa lightskyblue:87cefa lightslategray:778899 lightslategrey:778899
+lightsteelblue:b0c4de lightyellow:ffffe0 lime:00ff00 limegreen:32cd32 linen:faf0e6 magenta:ff00ff
+maroon:800000 mediumaquamarine:66cdaa mediumblue:0000cd mediumorchid:ba55d3 mediumpurple:9370db
+mediumseagreen:3cb371 mediumslateblue:7b68ee mediumspringgreen:00fa9a mediumturquoise:48d1cc
+mediumvioletred:c71585 midnightblue:191970 mintcream:f5fffa mistyrose:ffe4e1 moccasin:ffe4b5
+navajowhite:ffdead navy:000080 oldlace:fdf5e6 olive:808000 olivedrab:6b8e23 orange:ffa500
+orangered:ff4500 orchid:da70d6 palegoldenrod:eee8aa palegreen:98fb98 paleturquoise:afeeee
+palevioletred:db7093 papayawhip:ffefd5 peachpuff:ffdab9 peru:cd853f pink:ffc0cb plum:dda0dd
+powderblue:b0e0e6 purple:800080 rebeccapurple:663399 red:ff0000 rosybrown:bc8f8f royalblue:4169e1
+saddlebrown:8b4513 salmon:fa8072 sandybrown:f4a460 seagreen:2e8b57 seashell:fff5ee sienna:a0522d
+silver:c0c0c0 skyblue:87ceeb slateblue:6a5acd slategray:708090 slategrey:708090 snow:fffafa
+springgreen:00ff7f steelblue:4682b4 tan:d2b48c teal:008080 thistle:d8bfd8 tomato:ff6347
+turquoise:40e0d0 violet:ee82ee wheat:f5deb3 white:ffffff whitesmoke:f5f5f5 yellow:ffff00
+yellowgreen:9acd32 transparent:00000000
+""".split())
+
+FUNCTION_PATTERN = re.compile(r'^(rgba?|hsla?)\((.*)\)$')
+ARGUMENT_SPLIT = re.compile(r'\s*[,/]\s*|\s+')
+IMPORTANT_PATTERN = re.compile(r'!\s*important\s*$', re.IGNORECASE)
+
+def _channel(value: str, scale: float) -> float:
+    if value.endswith('%'):
+        return min(1.0, max(0.0, float(value[:-1]) / 100))
+    return min(1.0, max(0.0, float(value) / scale))
+
+def _hue(value: str) -> float:
+    for unit, turn in (('deg', 360.0), ('grad', 400.0), ('rad', 6.283185307179586), ('turn', 1.0)):
+        if value.endswith(unit):
+            return float(value[:-len(unit)]) / turn % 1.0
+    return float(value) / 360.0 % 1.0
+
+def _hex(value: str) -> Optional[RGBA]:
+    if len(value) in (3, 4):
+        value = ''.join(digit * 2 for digit in value)
+    if len(value) not in (6, 8):
+        return None
+    try:
+        channels = [int(value[i:i + 2], 16) / 255 for i in range(0, len(value), 2)]
+    except ValueError:
+        return None
+    return (channels[0], channels[1], channels[2], channels[3] if len(channels) == 4 else 1.0)
+
+@lru_cache(maxsize=COLOR_CACHE_SIZE)
+def parse_color(value: str) -> Optional[RGBA]:
+    # Hex, rgb()/rgba(), hsl()/hsla() (comma or space syntax) and named
+    # colors. None for anything that cannot be resolved statically, such as
+    # var(), currentColor or inherit.
+    value = value.replace('!important', '').strip().lower()
+    if value.startswith('#'):
+        return _hex(value[1:])
+    if value in NAMED_COLORS:
+        return _hex(NAMED_COLORS[value])
+
+    match = FUNCTION_PATTERN.match(value)
+    if match is None:
+        return None
+    function, arguments = match.groups()
+    parts = [part for part in ARGUMENT_SPLIT.split(arguments.strip()) if part]
+    if len(parts) not in (3, 4):
+        return None
+    try:
+        alpha = _channel(parts[3], 1.0) if len(parts) == 4 else 1.0
+        if function.startswith('rgb'):
+            return (_channel(parts[0], 255), _channel(parts[1], 255), _channel(parts[2], 255), alpha)
+        red, green, blue = colorsys.hls_to_rgb(_hue(parts[0]), _channel(parts[2], 100), _channel(parts[1], 100))
+    except ValueError:
+        return None
+    return (red, green, blue, alpha)
+
+@lru_cache(maxsize=COLOR_CACHE_SIZE)
+def parse_declarations(block: str) -> Tuple[Tuple[str, str, bool], ...]:
+    # (property, value, important) for each declaration of a style attribute
+    # or rule block, in source order
+    declarations = []
+    for declaration in block.split(';'):
+        name, colon, value = declaration.partition(':')
+        if colon:
+            value, important = IMPORTANT_PATTERN.subn('', value)
+            declarations.append((name.strip().lower(), value.strip(), bool(important)))
+    return tuple(declarations)
+
+def _linear(channel: float) -> float:
+    return channel / 12.92 if channel <= 0.03928 else ((channel + 0.055) / 1.055) ** 2.4
+
+@lru_cache(maxsize=COLOR_CACHE_SIZE)
+def relative_luminance(color: Tuple[float, float, float]) -> float:
+    red, green, blue = color
+    return 0.2126 * _linear(red) + 0.7152 * _linear(green) + 0.0722 * _linear(blue)
+
+def _composite(color: RGBA, backdrop: Tuple[float, float, float]) -> Tuple[float, float, float]:
+    red, green, blue, alpha = color
+    return (
+        red * alpha + backdrop[0] * (1 - alpha),
+        green * alpha + backdrop[1] * (1 - alpha),
+        blue * alpha + backdrop[2] * (1 - alpha),
+    )
+
+def composite(color: RGBA, backdrop: RGBA) -> RGBA:
+    # `color` painted over an opaque `backdrop`
+    if color[3] >= 1.0:
+        return color
+    return (*_composite(color, backdrop[:3]), 1.0)
+
+@lru_cache(maxsize=PAIR_CACHE_SIZE)
+def contrast_ratio(foreground: RGBA, background: RGBA) -> float:
+    # Translucent backgrounds are assumed to sit on white and translucent
+    # text is blended onto its background
+    backdrop = _composite(background, WHITE[:3])
+    lighter, darker = sorted((relative_luminance(_composite(foreground, backdrop)), relative_luminance(backdrop)), reverse=True)
+    return (lighter + 0.05) / (darker + 0.05)
+
+def _numpy_ratios(pairs: Sequence[Tuple[RGBA, RGBA]]) -> List[float]:
+    colors = numpy.array(pairs, dtype=float)
+    foreground, background = colors[:, 0], colors[:, 1]
+    backdrop = background[:, :3] * background[:, 3:] + (1 - background[:, 3:])
+    text = foreground[:, :3] * foreground[:, 3:] + backdrop * (1 - foreground[:, 3:])
+
+    def luminance(rgb):
+        linear = numpy.where(rgb <= 0.03928, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+        return linear @ numpy.array([0.2126, 0.7152, 0.0722])
+
+    first, second = luminance(text), luminance(backdrop)
+    return ((numpy.maximum(first, second) + 0.05) / (numpy.minimum(first, second) + 0.05)).tolist()
+
+def contrast_ratios(pairs: Sequence[Tuple[RGBA, RGBA]]) -> List[float]:
+    # Ratios for many (foreground, background) pairs at once; each distinct
+    # pair is computed once, in a single NumPy batch when there are enough
+    unique = list(dict.fromkeys(pairs))
+    if numpy is not None and len(unique) >= NUMPY_MIN_PAIRS:
+        ratios = dict(zip(unique, _numpy_ratios(unique)))
+    else:
+        ratios = {pair: contrast_ratio(*pair) for pair in unique}
+    return [ratios[pair] for pair in pairs]
@@ -0,0 +1,250 @@
+import asyncio
+import hashlib
+from itertools import zip_longest
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import urljoin, urlsplit
+from urllib.robotparser import RobotFileParser
+from batch import error_detail
+from bs4 import Tag
+from checks import RuleSelection
+from parsers import parse_html
+from report_cache import normalize_url
+from templates import SiteIssues
+from traversal import Visitor, Walk
+from wcag_checker import WCAGChecker
+
+ROBOTS_USER_AGENT = "WebLens"
+CRAWLED_SCHEMES = ("http", "https")
+# Links to these are never HTML pages, so they are not fetched at all
+SKIPPED_EXTENSIONS = (
+    ".pdf", ".zip", ".gz", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".ico",
+    ".mp3", ".mp4", ".webm", ".css", ".js", ".json", ".xml", ".txt",
+)
+# Metrics sections added up across pages; the others are averaged
+SUMMED_METRICS = {"element_counts"}
+
+
+class LinkCollector(Visitor):
+    tags = ['a']
+
+    def __init__(self):
+        self.hrefs: List[str] = []
+
+    def visit(self, link: Tag, walk: Walk) -> None:
+        href = link.get('href')
+        if isinstance(href, str) and href:
+            self.hrefs.append(href)
+
+
+def analyze_html_with_links(
+    html_content: str, url: str, parser: Optional[str] = None, rules: RuleSelection = None
+) -> Tuple[Dict[str, Any], List[str]]:
+    # Collects the page's links on the same walk as the checks; module-level
+    # so it can run in the analysis pool
+    links = LinkCollector()
+    report = WCAGChecker(parser=parser, rules=rules).analyze_soup(parse_html(html_content, parser), url, [links])
+    return report, links.hrefs
+
+def origin(url: str) -> Tuple[str, str]:
+    parts = urlsplit(url)
+    return parts.scheme, parts.netloc
+
+def canonicalize(href: str, base: str) -> Optional[str]:
+    # Absolute, normalized URL without fragment, or None when it is not a
+    # crawlable page
+    try:
+        url = normalize_url(urljoin(base, href.strip()))
+    except ValueError:
+        return None
+    parts = urlsplit(url)
+    if parts.scheme not in CRAWLED_SCHEMES or not parts.netloc:
+        return None
+    if parts.path.lower().endswith(SKIPPED_EXTENSIONS):
+        return None
+    return url
+
+
+class SeenSet:
+    # Keeps an 8-byte digest per URL instead of the URL itself
+    def __init__(self):
+        self._digests: Set[bytes] = set()
+
+    def add(self, url: str) -> bool:
+        digest = hashlib.blake2b(url.encode(), digest_size=8).digest()
+        if digest in self._digests:
+            return False
+        self._digests.add(digest)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._digests)
+
+
+class SiteRollup:
+    # Site totals, added to as each page's report comes in so the crawl
+    # does not have to keep the reports
+    def __init__(self):
+        self.pages = 0
+        self.score = 0.0
+        self.summary: Dict[str, int] = {}
+        self.metrics: Dict[str, Dict[str, Any]] = {}
+        self.depth_histogram: List[int] = []
+        self.site_issues = SiteIssues()
+
+    def add(self, report: Dict[str, Any]) -> None:
+        self.pages += 1
+        self.score += report["compliance_score"]
+        for key, count in report["summary"].items():
+            self.summary[key] = self.summary.get(key, 0) + count
+        for section, values in report["metrics"].items():
+            totals = self.metrics.setdefault(section, {})
+            if section == "structure":
+                # Elements per depth over all pages
+                histogram = zip_longest(self.depth_histogram, values["depth_histogram"], fillvalue=0)
+                self.depth_histogram = [sum(counts) for counts in histogram]
+                continue
+            for key, value in values.items():
+                totals[key] = totals.get(key, 0) + value
+        self.site_issues.add_report(report)
+
+    def as_dict(self) -> Dict[str, Any]:
+        if not self.pages:
+            return {"pages": 0, "compliance_score": None, "summary": {}, "site_summary": {}, "metrics": {}}
+        metrics = {}
+        for section, totals in self.metrics.items():
+            if section == "structure":
+                metrics[section] = {"max_depth": len(self.depth_histogram), "depth_histogram": self.depth_histogram}
+            elif section in SUMMED_METRICS:
+                metrics[section] = totals
+            else:
+                metrics[section] = {key: round(total / self.pages, 1) for key, total in totals.items()}
+        return {
+            "pages": self.pages,
+            "compliance_score": round(self.score / self.pages, 1),
+            "summary": self.summary,
+            # Issues of shared templates counted once for the site
+            "site_summary": self.site_issues.as_dict(),
+            "metrics": metrics,
+        }
+
+
+class SiteCrawler:
+    # Breadth-first crawl of the seed's origin. Only the frontier, a digest
+    # per seen URL, a summary per page and the running rollup are held; each
+    # page's full report is dropped once it is added to the rollup.
+    def __init__(self, checker: WCAGChecker, max_depth: int, max_pages: int, concurrency: int):
+        self.checker = checker
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.concurrency = concurrency
+
+    async def _robots(self, seed: str) -> RobotFileParser:
+        robots = RobotFileParser()
+        scheme, netloc = origin(seed)
+        try:
+            result = await self.checker.fetch(f"{scheme}://{netloc}/robots.txt")
+        except Exception:
+            robots.parse([])
+            return robots
+        if result.status_code in (401, 403) or result.status_code >= 500:
+            robots.parse(["User-agent: *", "Disallow: /"])
+        elif not result.is_success:
+            robots.parse([])
+        else:
+            robots.parse(result.text.splitlines())
+        return robots
+
+    async def _visit(
+        self, url: str, depth: int, seen: SeenSet
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]], List[str]]:
+        # Returns the page summary, its report and its links. The page is
+        # None when it redirected to a URL that was already seen, such as
+        # /index.html to /.
+        page: Dict[str, Any] = {"url": url, "depth": depth, "compliance_score": None, "summary": None, "error": None}
+        try:
+            result = await self.checker.fetch(url)
+            if not result.is_success:
+                page["error"] = {"message": f"HTTP {result.status_code}", "type": "HTTPStatusError"}
+                return page, None, []
+            final_url = normalize_url(result.url)
+            if origin(final_url) != self._origin:
+                page["error"] = {"message": f"Redirected off-site to {result.url}", "type": "OffOriginRedirect"}
+                return page, None, []
+            if final_url != url:
+                if not seen.add(final_url):
+                    return None, None, []
+                page["url"] = final_url
+            report, hrefs = await self.checker.run_analysis(analyze_html_with_links, result.text, final_url)
+        except Exception as e:
+            page["error"] = error_detail(e)
+            return page, None, []
+
+        page["compliance_score"] = report["compliance_score"]
+        page["summary"] = report["summary"]
+        links = []
+        for href in hrefs:
+            link = canonicalize(href, result.url)
+            if link is not None and origin(link) == self._origin:
+                links.append(link)
+        return page, report, links
+
+    async def crawl(self, seed: str) -> Dict[str, Any]:
+        seed = normalize_url(seed)
+        self._origin = origin(seed)
+        robots = await self._robots(seed)
+        seen = SeenSet()
+        seen.add(seed)
+        frontier: "asyncio.Queue[Tuple[str, int]]" = asyncio.Queue()
+        pages: List[Dict[str, Any]] = []
+        site = SiteRollup()
+        stats = {"scheduled": 0, "blocked_by_robots": 0, "duplicates": 0}
+
+        def schedule(url: str, depth: int) -> None:
+            if not robots.can_fetch(ROBOTS_USER_AGENT, url):
+                stats["blocked_by_robots"] += 1
+                return
+            stats["scheduled"] += 1
+            frontier.put_nowait((url, depth))
+
+        async def worker() -> None:
+            while True:
+                url, depth = await frontier.get()
+                try:
+                    page, report, links = await self._visit(url, depth, seen)
+                    if page is None:
+                        stats["duplicates"] += 1
+                        continue
+                    pages.append(page)
+                    if report is not None:
+                        site.add(report)
+                    if depth < self.max_depth:
+                        for link in links:
+                            if stats["scheduled"] >= self.max_pages:
+                                break
+                            if seen.add(link):
+                                schedule(link, depth + 1)
+                finally:
+                    frontier.task_done()
+
+        schedule(seed, 0)
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        try:
+            await frontier.join()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        pages.sort(key=lambda page: (page["depth"], page["url"]))
+        return {
+            "seed": seed,
+            "pages": pages,
+            "rollup": site.as_dict(),
+            "crawl": {
+                "pages_fetched": len(pages),
+                "failed": sum(1 for page in pages if page["error"] is not None),
+                "blocked_by_robots": stats["blocked_by_robots"],
+                "duplicates": stats["duplicates"],
+                "urls_seen": len(seen),
+            },
+        }
@@ -0,0 +1,132 @@
+from bisect import bisect_left
+from bs4 import BeautifulSoup, CData, NavigableString, Tag
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Tuple
+import re
+
+# The document's text, extracted once. Every element's get_text() is a slice
+# of it, so checks can look at the text of nested elements without
+# re-extracting it for each one.
+
+# The strings get_text() includes for ordinary elements (see
+# Tag.MAIN_CONTENT_STRING_TYPES); script, style and template strings and
+# comments are left out
+TEXT_TYPES = (NavigableString, CData)
+WORD_CHAR = re.compile(r'\w')
+
+
+class DocumentText:
+    def __init__(self, soup: BeautifulSoup):
+        parts: List[str] = []
+        length = 0
+        self.spans: Dict[int, Tuple[int, int]] = {}
+
+        open_tags: List[Tuple[Tag, int]] = []
+        # A Tag or a string, told apart by the exact type checks below
+        node: Any
+        for node in soup.descendants:
+            node_type = type(node)
+            if node_type is not Tag and node_type not in TEXT_TYPES:
+                continue
+            parent = node.parent
+            while open_tags and open_tags[-1][0] is not parent:
+                element, start = open_tags.pop()
+                self.spans[id(element)] = (start, length)
+            if node_type is Tag:
+                open_tags.append((node, length))
+            else:
+                parts.append(node)
+                length += len(node)
+        for element, start in open_tags:
+            self.spans[id(element)] = (start, length)
+        self.text = ''.join(parts)
+
+    def span(self, element: Tag) -> Tuple[int, int]:
+        return self.spans[id(element)]
+
+    def text_of(self, element: Tag, limit: int = -1) -> str:
+        start, end = self.spans[id(element)]
+        return self.text[start:end if limit < 0 else min(end, start + limit)]
+
+    def length(self, element: Tag) -> int:
+        start, end = self.spans[id(element)]
+        return end - start
+
+
+class TermMatcher:
+    # Whole-word, case-insensitive search for any of `terms`, with the same
+    # result as re.search(r'\b(term|...)\b', text, re.IGNORECASE) on each
+    # element's own text. The document is scanned once with a single
+    # combined pattern; each element is then answered from the occurrences
+    # inside its span.
+    def __init__(self, terms: Iterable[str]):
+        terms = sorted({term for term in terms if term}, key=len, reverse=True)
+        alternation = '|'.join(re.escape(term) for term in terms)
+        self.starts = re.compile(f'(?=(?:{alternation}))', re.IGNORECASE) if terms else None
+        self.term = re.compile(f'(?:{alternation})', re.IGNORECASE)
+        self.lengths = sorted({len(term) for term in terms})
+
+    def occurrences(self, text: str) -> 'TermOccurrences':
+        return TermOccurrences(self, text)
+
+
+class TermOccurrences:
+    def __init__(self, matcher: TermMatcher, text: str):
+        self.text = text
+        # Occurrences whose word boundaries hold without help from the
+        # element edges, by start with the running minimum end from the right
+        self.inner_starts: List[int] = []
+        self.inner_min_ends: List[int] = []
+        # Occurrences by start and by end, for elements whose text begins or
+        # ends exactly at an occurrence
+        self.by_start: Dict[int, List[int]] = defaultdict(list)
+        self.by_end: Dict[int, List[int]] = defaultdict(list)
+        if matcher.starts is None:
+            return
+
+        inner_ends = []
+        for match in matcher.starts.finditer(text):
+            start = match.start()
+            for size in matcher.lengths:
+                end = start + size
+                if end > len(text) or not matcher.term.fullmatch(text, start, end):
+                    continue
+                self.by_start[start].append(end)
+                self.by_end[end].append(start)
+                if self._left_inner(start) and self._right_inner(end):
+                    self.inner_starts.append(start)
+                    inner_ends.append(end)
+        running = len(text) + 1
+        self.inner_min_ends = [0] * len(inner_ends)
+        for position in range(len(inner_ends) - 1, -1, -1):
+            running = min(running, inner_ends[position])
+            self.inner_min_ends[position] = running
+
+    def _word(self, position: int) -> bool:
+        return 0 <= position < len(self.text) and WORD_CHAR.match(self.text, position) is not None
+
+    def _left_inner(self, start: int) -> bool:
+        return self._word(start - 1) != self._word(start)
+
+    def _right_inner(self, end: int) -> bool:
+        return self._word(end - 1) != self._word(end)
+
+    def within(self, span: Tuple[int, int]) -> bool:
+        # Whether the text of the element spanning `span` contains a term
+        start, end = span
+        # Occurrences touching neither edge of the span
+        position = bisect_left(self.inner_starts, start + 1)
+        if position < len(self.inner_min_ends) and self.inner_min_ends[position] < end:
+            return True
+        # An element edge counts as a non-word character
+        if self._word(start):
+            for occurrence_end in self.by_start.get(start, ()):
+                if occurrence_end < end and self._right_inner(occurrence_end):
+                    return True
+                if occurrence_end == end and self._word(end - 1):
+                    return True
+        if self._word(end - 1):
+            for occurrence_start in self.by_end.get(end, ()):
+                if occurrence_start > start and self._left_inner(occurrence_start):
+                    return True
+        return False
@@ -0,0 +1,86 @@
+from bs4 import Tag
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Union
+import re
+
+# What Tag.get() returns: a list for multi-valued attributes such as class
+AttributeValue = Union[str, List[str], None]
+
+
+class DocumentIndex:
+    # Inverted indexes over the attributes the checks look elements up by.
+    # Filled in during the traversal, so every lookup made from a visitor's
+    # finish() sees the whole document; lists are in document order.
+    def __init__(self):
+        self.ids: Dict[str, List[Tag]] = defaultdict(list)
+        self.with_id: List[Tag] = []
+        self.labels_for: Dict[str, List[Tag]] = defaultdict(list)
+        self.class_tokens: Dict[str, List[Tag]] = defaultdict(list)
+        self.roles: Dict[str, List[Tag]] = defaultdict(list)
+        self.described_by: Dict[str, List[Tag]] = defaultdict(list)
+        self._token_matches: Dict[re.Pattern, Dict[str, bool]] = {}
+
+    def add(self, element: Tag) -> None:
+        attrs = element.attrs
+        if not attrs:
+            return
+
+        value = attrs.get('id')
+        if isinstance(value, str):
+            self.ids[value].append(element)
+            self.with_id.append(element)
+        if element.name == 'label':
+            value = attrs.get('for')
+            if isinstance(value, str):
+                self.labels_for[value].append(element)
+        value = attrs.get('class')
+        if value:
+            for token in value if isinstance(value, list) else [value]:
+                self.class_tokens[token].append(element)
+        value = attrs.get('role')
+        if isinstance(value, str):
+            self.roles[value].append(element)
+        value = attrs.get('aria-describedby')
+        if isinstance(value, str):
+            self.described_by[value].append(element)
+
+    def label_for(self, target: AttributeValue) -> Optional[Tag]:
+        labels = self.labels_for.get(target) if isinstance(target, str) else None
+        return labels[0] if labels else None
+
+    def first(self, index: Dict[str, List[Tag]], key: AttributeValue, names: Iterable[str]) -> Optional[Tag]:
+        if not isinstance(key, str):
+            return None
+        for element in index.get(key, ()):
+            if element.name in names:
+                return element
+        return None
+
+    def first_with_id_matching(self, pattern: re.Pattern, names: Iterable[str]) -> Optional[Tag]:
+        for element in self.with_id:
+            if element.name in names and pattern.search(element['id']):
+                return element
+        return None
+
+    def class_matches(self, element: Tag, pattern: re.Pattern) -> bool:
+        # Same result as find_all(class_=pattern), with the regex evaluated
+        # once per distinct class token. The check patterns never match
+        # whitespace, so testing tokens alone is exact for multi-class values.
+        value = element.get('class')
+        if value is None:
+            return False
+        if not isinstance(value, list):
+            return pattern.search(value) is not None
+        if not value:
+            return pattern.search('') is not None
+
+        results = self._token_matches.get(pattern)
+        if results is None:
+            results = self._token_matches[pattern] = {}
+        for token in value:
+            matched = results.get(token)
+            if matched is None:
+                matched = results[token] = pattern.search(token) is not None
+            if matched:
+                return True
+        return False
@@ -0,0 +1,185 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+from checks import RULESET_VERSION
+from report_cache import normalize_url
+from settings import settings
+
+# Each distinct (url, content hash, report variant) is stored once in
+# `reports`, compressed; every audit adds a small row to `audits`. Score
+# history reads the covering index on audits and looks up each audit's
+# report row by id for its variant and content hash, never the report
+# itself, so it stays fast however large the reports are.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL,
+    content_hash BLOB NOT NULL,
+    variant TEXT NOT NULL,
+    report BLOB NOT NULL,
+    UNIQUE (url, content_hash, variant)
+);
+CREATE TABLE IF NOT EXISTS audits (
+    url TEXT NOT NULL,
+    checked_at REAL NOT NULL,
+    report_id INTEGER NOT NULL REFERENCES reports (id),
+    compliance_score REAL NOT NULL,
+    total_issues INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS audits_by_url
+    ON audits (url, checked_at, compliance_score, total_issues, report_id);
+"""
+
+def content_hash(html_content: str) -> bytes:
+    return hashlib.blake2b(html_content.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+def report_variant(parser: str, rules: str) -> str:
+    # Everything besides the page itself that changes the report
+    vocabulary = hashlib.blake2b(settings.jargon_terms.encode("utf-8"), digest_size=4).hexdigest()
+    return f"{RULESET_VERSION}:{parser}:{rules}:{settings.snippet_mode}:{settings.snippet_max_length}:{vocabulary}"
+
+def pack_report(report: Dict[str, Any]) -> bytes:
+    return zlib.compress(json.dumps(report, separators=(",", ":")).encode("utf-8"))
+
+def unpack_report(blob: bytes) -> Dict[str, Any]:
+    return json.loads(zlib.decompress(blob))
+
+def _issue_keys(report: Dict[str, Any]) -> List[Tuple[str, Tuple]]:
+    # A template's fingerprint changes with any of its content, so it is not
+    # part of an issue's identity
+    return [
+        (issue_type, tuple(item for item in issue.items() if item[0] != "template"))
+        for issue_type, issues in report["issues_by_type"].items()
+        for issue in issues
+    ]
+
+def _subtract(keys: List[Tuple[str, Tuple]], other: List[Tuple[str, Tuple]]) -> List[Dict[str, str]]:
+    # Multiset difference that keeps the order of `keys`
+    remaining = Counter(other)
+    result = []
+    for key in keys:
+        if remaining[key]:
+            remaining[key] -= 1
+        else:
+            issue_type, items = key
+            result.append({"type": issue_type, **dict(items)})
+    return result
+
+def diff_reports(previous: Optional[Dict[str, Any]], report: Dict[str, Any], digest: bytes) -> Dict[str, Any]:
+    current_keys = _issue_keys(report)
+    previous_keys = _issue_keys(previous["report"]) if previous else []
+    return {
+        "url": report["url"],
+        "content_changed": previous is None or previous["content_hash"] != digest,
+        "previous_checked_at": previous["checked_at"] if previous else None,
+        "compliance_score": report["compliance_score"],
+        "score_delta": report["compliance_score"] - previous["report"]["compliance_score"] if previous else None,
+        "summary": report["summary"],
+        "added": _subtract(current_keys, previous_keys),
+        "resolved": _subtract(previous_keys, current_keys),
+    }
+
+
+class ReportHistory:
+    def __init__(self, path: str):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _find(self, url: str, digest: bytes, variant: str) -> Optional[Tuple[int, Dict[str, Any]]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, report FROM reports WHERE url = ? AND content_hash = ? AND variant = ?",
+                (url, digest, variant),
+            ).fetchone()
+        return (row[0], unpack_report(row[1])) if row else None
+
+    def _record(self, url: str, digest: bytes, variant: str, report: Dict[str, Any], report_id: Optional[int] = None) -> None:
+        with self._lock, self._db:
+            if report_id is None:
+                # Another request may have stored the same content meanwhile
+                self._db.execute(
+                    "INSERT OR IGNORE INTO reports (url, content_hash, variant, report) VALUES (?, ?, ?, ?)",
+                    (url, digest, variant, pack_report(report)),
+                )
+                report_id = self._db.execute(
+                    "SELECT id FROM reports WHERE url = ? AND content_hash = ? AND variant = ?",
+                    (url, digest, variant),
+                ).fetchone()[0]
+            self._db.execute(
+                "INSERT INTO audits (url, checked_at, report_id, compliance_score, total_issues) VALUES (?, ?, ?, ?, ?)",
+                (url, time.time(), report_id, report["compliance_score"], report["summary"]["total_issues"]),
+            )
+
+    def _latest(self, url: str, variant: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT a.checked_at, r.content_hash, r.report FROM audits a JOIN reports r ON r.id = a.report_id "
+                "WHERE a.url = ? AND r.variant = ? ORDER BY a.checked_at DESC LIMIT 1",
+                (url, variant),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"checked_at": row[0], "content_hash": row[1], "report": unpack_report(row[2])}
+
+    def _scores(self, url: str, variant: str, limit: int, before: Optional[float]) -> List[Dict[str, Any]]:
+        # Newest first. One extra row tells whether the oldest returned
+        # audit saw different content than the audit before it.
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT a.checked_at, a.compliance_score, a.total_issues, r.content_hash "
+                "FROM audits a JOIN reports r ON r.id = a.report_id "
+                "WHERE a.url = ? AND r.variant = ? AND a.checked_at < ? ORDER BY a.checked_at DESC LIMIT ?",
+                (url, variant, before if before is not None else float("inf"), limit + 1),
+            ).fetchall()
+        return [
+            {
+                "checked_at": checked_at,
+                "compliance_score": score,
+                "total_issues": total,
+                "content_changed": position + 1 >= len(rows) or rows[position + 1][3] != digest,
+            }
+            for position, (checked_at, score, total, digest) in enumerate(rows[:limit])
+        ]
+
+    async def analyze(self, checker: Any, html_content: str, url: str) -> Tuple[Dict[str, Any], bytes]:
+        # Reuses the stored report when this exact content was audited
+        # before, otherwise analyzes and stores it. Returns the report and
+        # the content hash.
+        key = normalize_url(url)
+        digest = content_hash(html_content)
+        variant = report_variant(checker.parser_name, checker.rules_name)
+        found = await asyncio.to_thread(self._find, key, digest, variant)
+        if found is not None:
+            report_id, report = found
+            await asyncio.to_thread(self._record, key, digest, variant, report, report_id)
+            return {**report, "url": url}, digest
+
+        report = await checker.analyze_fresh(html_content, url)
+        await asyncio.to_thread(self._record, key, digest, variant, report)
+        return report, digest
+
+    async def diff(self, checker: Any, url: str) -> Dict[str, Any]:
+        variant = report_variant(checker.parser_name, checker.rules_name)
+        previous = await asyncio.to_thread(self._latest, normalize_url(url), variant)
+        result = await checker.fetch(url)
+        report, digest = await self.analyze(checker, result.text, url)
+        return diff_reports(previous, report, digest)
+
+    async def scores(self, checker: Any, url: str, limit: int, before: Optional[float] = None) -> List[Dict[str, Any]]:
+        # Audits run with the checker's parser and rules; other variants of
+        # the report score differently, so they are a separate series
+        variant = report_variant(checker.parser_name, checker.rules_name)
+        return await asyncio.to_thread(self._scores, normalize_url(url), variant, limit, before)
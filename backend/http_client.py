@@ -0,0 +1,242 @@
+import codecs
+import httpx
+import re
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from settings import settings
+from telemetry import FETCH_BYTES, FETCH_SECONDS
+from time import perf_counter
+
+FETCH_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# httpcore trace callback: (event name, info) for every step of a request
+Tracer = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+# httpcore trace events marking a request being sent and a new connection
+# being opened; a request without a connect event reused a pooled connection
+REQUEST_EVENTS = ("http11.send_request_headers.started", "http2.send_request_headers.started")
+CONNECT_EVENT = "connection.connect_tcp.started"
+
+
+class PoolStats:
+    def __init__(self):
+        self.requests = 0
+        self.connections_opened = 0
+
+    async def trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        if event_name in REQUEST_EVENTS:
+            self.requests += 1
+        elif event_name == CONNECT_EVENT:
+            self.connections_opened += 1
+
+    async def attach(self, request: httpx.Request) -> None:
+        # Keeps a tracer the request already has, such as FetchTimings
+        other = request.extensions.get("trace")
+        if other is None:
+            request.extensions["trace"] = self.trace
+            return
+
+        async def trace(event_name: str, info: Dict[str, Any]) -> None:
+            await self.trace(event_name, info)
+            await other(event_name, info)
+        request.extensions["trace"] = trace
+
+    @property
+    def hits(self) -> int:
+        return max(0, self.requests - self.connections_opened)
+
+    @property
+    def misses(self) -> int:
+        return self.connections_opened
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "requests": self.requests,
+            "pool_hits": self.hits,
+            "pool_misses": self.misses,
+        }
+
+
+class FetchTimings:
+    # Phases of one fetch in seconds, from httpcore trace events. Connection
+    # phases stay at zero when a pooled connection is reused and add up over
+    # the hops of a redirect. httpcore resolves the host inside connect_tcp,
+    # so `connect` includes the DNS lookup; `ttfb` runs from sending the
+    # request to receiving the response headers.
+    PHASES = {"connect_tcp": "connect", "start_tls": "tls", "receive_response_body": "download"}
+
+    def __init__(self):
+        self.seconds = {"connect": 0.0, "tls": 0.0, "ttfb": 0.0, "download": 0.0}
+        self._started: Dict[str, float] = {}
+
+    async def trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        now = perf_counter()
+        name, _, stage = event_name.partition(".")[2].rpartition(".")
+        if stage == "started":
+            self._started[name] = now
+            return
+        if stage not in ("complete", "failed"):
+            return
+        if name in self.PHASES and name in self._started:
+            self.seconds[self.PHASES[name]] += now - self._started.pop(name)
+        elif name == "receive_response_headers" and "send_request_headers" in self._started:
+            self.seconds["ttfb"] += now - self._started.pop("send_request_headers")
+
+
+def http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def create_http_client(stats: Optional[PoolStats] = None) -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive_connections,
+        keepalive_expiry=settings.http_keepalive_expiry,
+    )
+    event_hooks = {"request": [stats.attach]} if stats is not None else None
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(settings.fetch_timeout),
+        limits=limits,
+        http2=settings.http2 and http2_available(),
+        follow_redirects=True,
+        headers=FETCH_HEADERS,
+        event_hooks=event_hooks,
+    )
+
+
+HTML_MEDIA_TYPES = {"text/html", "application/xhtml+xml"}
+# Served for HTML often enough that the body is sniffed instead of rejected
+SNIFFED_MEDIA_TYPES = {"", "text/plain", "application/octet-stream"}
+BINARY_SIGNATURES = (b"%PDF", b"\x89PNG", b"GIF8", b"\xff\xd8\xff", b"PK\x03\x04", b"\x1f\x8b", b"ID3", b"OggS", b"RIFF")
+META_CHARSET_PATTERN = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([a-zA-Z0-9_:.-]+)', re.IGNORECASE)
+# Bytes buffered before choosing an encoding, as in the HTML prescan
+SNIFF_BYTES = 1024
+# Compression ratios are only judged once this much has been decoded
+BOMB_MIN_BYTES = 1024 * 1024
+
+
+class FetchError(Exception):
+    # A fetch rejected before analysis; `status_code` is the HTTP status the
+    # API answers with
+    def __init__(self, reason: str, message: str, status_code: int):
+        super().__init__(message)
+        self.reason = reason
+        self.status_code = status_code
+
+    def as_dict(self) -> Dict[str, str]:
+        return {"message": str(self), "type": type(self).__name__, "reason": self.reason}
+
+
+@dataclass
+class FetchResult:
+    url: str
+    status_code: int
+    headers: httpx.Headers
+    text: str
+
+    @property
+    def is_success(self) -> bool:
+        return 200 <= self.status_code < 300
+
+
+def _media_type(headers: httpx.Headers) -> str:
+    return headers.get("content-type", "").split(";")[0].strip().lower()
+
+def _sniff(head: bytes, media_type: str) -> None:
+    if media_type in HTML_MEDIA_TYPES:
+        return
+    if head.startswith(BINARY_SIGNATURES) or b"\x00" in head[:512]:
+        raise FetchError("not_html", f"Expected an HTML page but the body looks binary ({media_type or 'no content type'})", 415)
+
+def _encoding(charset: Optional[str], head: bytes) -> str:
+    candidates = [charset]
+    if head.startswith(codecs.BOM_UTF8):
+        candidates.insert(0, "utf-8-sig")
+    elif head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        candidates.insert(0, "utf-16")
+    match = META_CHARSET_PATTERN.search(head[:SNIFF_BYTES])
+    if match:
+        candidates.append(match.group(1).decode("ascii"))
+    for candidate in candidates:
+        if not candidate:
+            continue
+        try:
+            return codecs.lookup(candidate).name
+        except LookupError:
+            continue
+    return "utf-8"
+
+def decode_html(data: bytes, charset: Optional[str] = None) -> str:
+    # Decodes a whole page read from disk or an archive the way fetched
+    # pages are: BOM, then the declared charset, then a <meta> charset
+    return data.decode(_encoding(charset, data[:SNIFF_BYTES]), errors="replace")
+
+async def fetch_html(
+    client: httpx.AsyncClient, url: str, headers: Optional[Dict[str, str]] = None, trace: Optional[Tracer] = None
+) -> FetchResult:
+    start = perf_counter()
+    outcome = "error"
+    try:
+        result = await _fetch_html(client, url, headers, trace)
+        outcome = "not_modified" if result.status_code == 304 else "ok"
+        return result
+    except FetchError:
+        outcome = "rejected"
+        raise
+    finally:
+        FETCH_SECONDS.observe(perf_counter() - start, outcome)
+
+async def _fetch_html(
+    client: httpx.AsyncClient, url: str, headers: Optional[Dict[str, str]], trace: Optional[Tracer]
+) -> FetchResult:
+    # Streams the body so memory per fetch is bounded by settings.fetch_max_bytes
+    # of decoded content, rejecting non-HTML bodies as early as possible
+    max_bytes = settings.fetch_max_bytes
+    extensions = {"trace": trace} if trace is not None else None
+    async with client.stream("GET", url, headers=headers, extensions=extensions) as response:
+        result = FetchResult(str(response.url), response.status_code, response.headers, "")
+        if response.status_code == 304:
+            return result
+
+        media_type = _media_type(response.headers)
+        if media_type not in HTML_MEDIA_TYPES and media_type not in SNIFFED_MEDIA_TYPES:
+            raise FetchError("not_html", f"Expected an HTML page but got {media_type}", 415)
+        length = response.headers.get("content-length", "")
+        if length.isdigit() and int(length) > max_bytes:
+            raise FetchError("too_large", f"Page is {length} bytes, the limit is {max_bytes}", 413)
+
+        decoder = None
+        head = b""
+        parts: List[str] = []
+        decoded_bytes = 0
+        async for chunk in response.aiter_bytes():
+            decoded_bytes += len(chunk)
+            if decoded_bytes > max_bytes:
+                raise FetchError("too_large", f"Page exceeds the limit of {max_bytes} bytes", 413)
+            if decoded_bytes > BOMB_MIN_BYTES and decoded_bytes > settings.fetch_max_compression_ratio * max(1, response.num_bytes_downloaded):
+                raise FetchError("decompression_bomb", "Compressed page expands beyond the allowed ratio", 413)
+
+            if decoder is None:
+                head += chunk
+                if len(head) < SNIFF_BYTES:
+                    continue
+                _sniff(head, media_type)
+                decoder = codecs.getincrementaldecoder(_encoding(response.charset_encoding, head))(errors="replace")
+                parts.append(decoder.decode(head))
+            else:
+                parts.append(decoder.decode(chunk))
+
+        if decoder is None:
+            _sniff(head, media_type)
+            decoder = codecs.getincrementaldecoder(_encoding(response.charset_encoding, head))(errors="replace")
+            parts.append(decoder.decode(head))
+        parts.append(decoder.decode(b"", final=True))
+        FETCH_BYTES.observe(decoded_bytes)
+
+    result.text = "".join(parts)
+    return result
@@ -0,0 +1,268 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from batch import error_detail
+from checks import RuleSelection
+from history import pack_report, unpack_report
+
+# Audits queued by POST /jobs and run in the background, so the request
+# returns before the page is fetched. Jobs live in SQLite; a job that was
+# queued or in progress when the server stopped is queued again at startup.
+# The database is created with the first job, so a server that never
+# queues one writes nothing.
+# Async fetch workers download pages and hand them to analysis workers
+# through a small queue, so downloads wait while analysis is behind.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    seq INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    url TEXT NOT NULL,
+    parser TEXT,
+    rules TEXT,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    report BLOB,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, seq);
+CREATE INDEX IF NOT EXISTS jobs_by_finish ON jobs (finished_at);
+"""
+
+# Job statuses, in order
+QUEUED = "queued"
+FETCHING = "fetching"
+FETCHED = "fetched"
+ANALYZING = "analyzing"
+DONE = "done"
+FAILED = "failed"
+PROGRESS = {QUEUED: 0.0, FETCHING: 0.25, FETCHED: 0.5, ANALYZING: 0.75, DONE: 1.0, FAILED: 1.0}
+UNFINISHED = (FETCHING, FETCHED, ANALYZING)
+# Path that keeps the queue in memory only, for tests
+IN_MEMORY = ":memory:"
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFullError(RuntimeError):
+    pass
+
+
+class JobQueue:
+    # `checker_factory(parser, rules)` builds the WCAGChecker for a job, with
+    # the application's HTTP client, analysis pool and history.
+    def __init__(
+        self,
+        path: str,
+        checker_factory: Callable[[Optional[str], RuleSelection], Any],
+        fetch_workers: int,
+        analysis_workers: int,
+        max_queued: int,
+        retention: float,
+    ):
+        self.path = path or IN_MEMORY
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.checker_factory = checker_factory
+        self.fetch_workers = fetch_workers
+        self.analysis_workers = analysis_workers
+        self.max_queued = max_queued
+        self.retention = retention
+        self._queued: "asyncio.Queue[str]" = asyncio.Queue()
+        self._fetched: "asyncio.Queue[Tuple[str, Any, str, str]]" = asyncio.Queue(maxsize=analysis_workers)
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        for job_id in await asyncio.to_thread(self._recover):
+            self._queued.put_nowait(job_id)
+        self._tasks = [asyncio.create_task(self._fetch_worker()) for _ in range(self.fetch_workers)]
+        self._tasks += [asyncio.create_task(self._analysis_worker()) for _ in range(self.analysis_workers)]
+
+    async def stop(self) -> None:
+        # Jobs cut short here are queued again by the next start
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opens the database on first use; called with the lock held
+        if self._db is None:
+            directory = os.path.dirname(self.path) if self.path != IN_MEMORY else ""
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            if self.path != IN_MEMORY:
+                db.execute("PRAGMA journal_mode=WAL")
+                db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript(SCHEMA)
+            self._db = db
+        return self._db
+
+    def _stored(self) -> Optional[sqlite3.Connection]:
+        # The database, or None while it has not been created, so there is
+        # no job; called with the lock held
+        if self._db is None and (self.path == IN_MEMORY or not os.path.exists(self.path)):
+            return None
+        return self._connect()
+
+    def _recover(self) -> List[str]:
+        # Fetched pages are not stored, so interrupted jobs start over
+        with self._lock:
+            db = self._stored()
+            if db is None:
+                return []
+            with db:
+                db.execute(
+                    f"UPDATE jobs SET status = ?, started_at = NULL WHERE status IN ({', '.join('?' * len(UNFINISHED))})",
+                    (QUEUED, *UNFINISHED),
+                )
+                db.execute("DELETE FROM jobs WHERE finished_at < ?", (time.time() - self.retention,))
+                rows = db.execute("SELECT id FROM jobs WHERE status = ? ORDER BY seq", (QUEUED,)).fetchall()
+        return [row[0] for row in rows]
+
+    def _insert(self, url: str, parser: Optional[str], rules: RuleSelection) -> Dict[str, Any]:
+        job_id = uuid.uuid4().hex
+        created_at = time.time()
+        with self._lock, self._connect() as db:
+            queued = db.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (QUEUED,)).fetchone()[0]
+            if queued >= self.max_queued:
+                raise JobQueueFullError(f"Job queue is full ({self.max_queued} jobs queued)")
+            db.execute(
+                "INSERT INTO jobs (id, url, parser, rules, status, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, url, parser, json.dumps(rules), QUEUED, created_at),
+            )
+        return {"id": job_id, "url": url, "status": QUEUED, "queue_position": queued, "created_at": created_at}
+
+    def _claim(self, job_id: str) -> Optional[Tuple[str, Optional[str], RuleSelection]]:
+        with self._lock, self._connect() as db:
+            row = db.execute("SELECT url, parser, rules FROM jobs WHERE id = ? AND status = ?", (job_id, QUEUED)).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE jobs SET status = ?, started_at = ? WHERE id = ?", (FETCHING, time.time(), job_id))
+        return row[0], row[1], json.loads(row[2])
+
+    def _set_status(self, job_id: str, status: str) -> None:
+        with self._lock, self._connect() as db:
+            db.execute("UPDATE jobs SET status = ? WHERE id = ?", (status, job_id))
+
+    def _finish(self, job_id: str, report: Optional[Dict[str, Any]], error: Optional[Dict[str, str]]) -> None:
+        now = time.time()
+        with self._lock, self._connect() as db:
+            db.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, report = ?, error = ? WHERE id = ?",
+                (
+                    DONE if error is None else FAILED,
+                    now,
+                    pack_report(report) if report is not None else None,
+                    json.dumps(error) if error is not None else None,
+                    job_id,
+                ),
+            )
+            db.execute("DELETE FROM jobs WHERE finished_at < ?", (now - self.retention,))
+
+    def _get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            db = self._stored()
+            if db is None:
+                return None
+            row = db.execute(
+                "SELECT seq, url, status, created_at, started_at, finished_at, report, error FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            seq, url, status, created_at, started_at, finished_at, report, error = row
+            position = None
+            if status == QUEUED:
+                position = db.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = ? AND seq < ?", (QUEUED, seq)
+                ).fetchone()[0]
+        return {
+            "id": job_id,
+            "url": url,
+            "status": status,
+            "progress": PROGRESS[status],
+            "queue_position": position,
+            "created_at": created_at,
+            "started_at": started_at,
+            "finished_at": finished_at,
+            "report": unpack_report(report) if report is not None else None,
+            "error": json.loads(error) if error is not None else None,
+        }
+
+    async def submit(self, url: str, parser: Optional[str] = None, rules: RuleSelection = None) -> Dict[str, Any]:
+        # Invalid parser or rule names fail here rather than in the job
+        self.checker_factory(parser, rules)
+        job = await asyncio.to_thread(self._insert, url, parser, rules)
+        self._queued.put_nowait(job["id"])
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._get, job_id)
+
+    async def _fetch_worker(self) -> None:
+        while True:
+            job_id = await self._queued.get()
+            try:
+                await self._fetch_job(job_id)
+            except Exception as e:
+                await self._fail(job_id, e)
+
+    async def _analysis_worker(self) -> None:
+        while True:
+            job_id, checker, html_content, url = await self._fetched.get()
+            try:
+                await self._analyze_job(job_id, checker, html_content, url)
+            except Exception as e:
+                await self._fail(job_id, e)
+
+    async def _fetch_job(self, job_id: str) -> None:
+        claimed = await asyncio.to_thread(self._claim, job_id)
+        if claimed is None:
+            return
+        url, parser, rules = claimed
+        try:
+            checker = self.checker_factory(parser, rules)
+            result = await checker.fetch(url)
+        except Exception as e:
+            await asyncio.to_thread(self._finish, job_id, None, error_detail(e))
+            return
+        await asyncio.to_thread(self._set_status, job_id, FETCHED)
+        await self._fetched.put((job_id, checker, result.text, url))
+
+    async def _analyze_job(self, job_id: str, checker: Any, html_content: str, url: str) -> None:
+        await asyncio.to_thread(self._set_status, job_id, ANALYZING)
+        try:
+            report = await checker.analyze_page(html_content, url)
+        except Exception as e:
+            await asyncio.to_thread(self._finish, job_id, None, error_detail(e))
+            return
+        await asyncio.to_thread(self._finish, job_id, report, None)
+
+    async def _fail(self, job_id: str, e: Exception) -> None:
+        # An error outside the audit itself, such as a database error; the
+        # worker carries on with the next job
+        logger.exception("Job %s failed", job_id, exc_info=e)
+        try:
+            await asyncio.to_thread(self._finish, job_id, None, error_detail(e))
+        except Exception:
+            logger.exception("Could not record the failure of job %s", job_id)
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "fetch_workers": self.fetch_workers,
+            "analysis_workers": self.analysis_workers,
+            "waiting": self._queued.qsize(),
+            "fetched": self._fetched.qsize(),
+        }
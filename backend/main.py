@@ -1,10 +1,29 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, HttpUrl
+from pydantic import BaseModel, Field, HttpUrl
 import httpx
-from typing import List, Dict, Any
+from typing import Annotated, List, Dict, Any, Optional, Union
 import asyncio
+import secrets
+from time import perf_counter
+from contextlib import asynccontextmanager
 from wcag_checker import WCAGChecker
+from analysis_pool import AnalysisPool, AnalysisQueueFullError
+from checks import PROFILES, ProfileName, RuleName, UnknownRuleError
+from parsers import ParserName, ParserUnavailableError
+from batch import BatchRunner, audit_url
+from crawler import SiteCrawler
+from streaming import event_encoder, stream_check
+from http_client import FetchError, PoolStats, create_http_client
+from report_cache import CACHE_STATUSES, ReportCache
+from singleflight import SingleFlight
+from history import ReportHistory
+from jobs import JobQueue, JobQueueFullError
+from profiling import profiled_check, timed_check
+from responses import fast_response, report_response
+from settings import settings
+import telemetry
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
@@ -16,11 +35,113 @@ def get_allowed_origins():
     ports = range(5170, 5180)  # Vite uses ports in this range
     return [f"{base}:{port}" for base in base_urls for port in ports]
 
-app = FastAPI(title="WCAG Compliance Checker API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled HTTP client for the whole application, so repeated checks
+    # of the same hosts reuse open connections
+    app.state.pool_stats = PoolStats()
+    app.state.http_client = create_http_client(app.state.pool_stats)
+    app.state.report_cache = (
+        ReportCache(settings.cache_ttl, settings.cache_max_bytes) if settings.cache_max_bytes > 0 else None
+    )
+    app.state.analysis_pool = None
+    if settings.analysis_workers > 0:
+        app.state.analysis_pool = AnalysisPool(
+            settings.analysis_workers, settings.analysis_max_tasks_per_child, settings.analysis_max_queue
+        )
+        await app.state.analysis_pool.start()
+    # Concurrent audits of the same page share one fetch and analysis
+    app.state.single_flight = SingleFlight()
+    app.state.batch_runner = BatchRunner(settings.batch_concurrency, settings.batch_per_host, app.state.single_flight)
+    app.state.report_history = ReportHistory(settings.history_path) if settings.history_path else None
+    app.state.job_queue = JobQueue(
+        settings.jobs_path,
+        lambda parser, rules: WCAGChecker(
+            parser=parser,
+            rules=rules,
+            client=app.state.http_client,
+            pool=app.state.analysis_pool,
+            host_limiter=app.state.batch_runner.hosts,
+            history=app.state.report_history,
+        ),
+        settings.jobs_fetch_workers,
+        settings.jobs_analysis_workers,
+        settings.jobs_max_queued,
+        settings.jobs_retention,
+    )
+    await app.state.job_queue.start()
+    collect_state_metrics(app)
+    yield
+    await app.state.job_queue.stop()
+    await app.state.http_client.aclose()
+    if app.state.report_history is not None:
+        app.state.report_history.close()
+    if app.state.analysis_pool is not None:
+        app.state.analysis_pool.shutdown()
+
+def collect_state_metrics(app: FastAPI) -> None:
+    # Connection pool, analysis pool and report cache statistics, read from
+    # their owners whenever /metrics is scraped
+    state = app.state
+
+    def connections():
+        return {("reused",): state.pool_stats.hits, ("new",): state.pool_stats.misses}
+
+    def pool_pending():
+        return {(): state.analysis_pool.pending} if state.analysis_pool is not None else {}
+
+    def pool_tasks():
+        pool = state.analysis_pool
+        return {("completed",): pool.completed, ("rejected",): pool.rejected} if pool is not None else {}
+
+    def cache_lookups():
+        cache = state.report_cache
+        return {(status,): cache.stats[status] for status in CACHE_STATUSES} if cache is not None else {}
+
+    def cache_evictions():
+        return {(): state.report_cache.stats["evictions"]} if state.report_cache is not None else {}
+
+    telemetry.Collected(
+        "weblens_http_requests_total", "counter",
+        "Page requests sent, by whether they reused a pooled connection", connections, ["connection"]
+    )
+    telemetry.Collected("weblens_analysis_pool_pending", "gauge", "Analyses waiting or running in the worker pool", pool_pending)
+    telemetry.Collected(
+        "weblens_analysis_pool_tasks_total", "counter", "Analyses completed or rejected by the worker pool", pool_tasks, ["result"]
+    )
+    telemetry.Collected(
+        "weblens_coalesced_requests_total", "counter",
+        "Audits that waited for a concurrent audit of the same page instead of running their own",
+        lambda: {(): state.single_flight.coalesced}
+    )
+    telemetry.Collected("weblens_report_cache_lookups_total", "counter", "Report cache lookups, by outcome", cache_lookups, ["status"])
+    telemetry.Collected("weblens_report_cache_evictions_total", "counter", "Reports evicted from the cache", cache_evictions)
+
+app = FastAPI(title="WCAG Compliance Checker API", lifespan=lifespan)
+
+def rate_limit_exceeded(request: Request, exc: RateLimitExceeded) -> Response:
+    route = request.scope.get("route")
+    telemetry.RATE_LIMITED.inc(getattr(route, "path", request.url.path))
+    return _rate_limit_exceeded_handler(request, exc)
 
 # Configure rate limiting
 app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded)
+
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    # Streamed responses are timed until their headers are sent
+    start = perf_counter()
+    status = "500"
+    try:
+        response = await call_next(request)
+        status = str(response.status_code)
+        return response
+    finally:
+        route = request.scope.get("route")
+        telemetry.REQUEST_SECONDS.observe(
+            perf_counter() - start, request.method, getattr(route, "path", "unmatched"), status
+        )
 
 # Configure CORS
 app.add_middleware(
@@ -31,8 +152,27 @@ app.add_middleware(
     allow_headers=["Content-Type", "Accept", "Origin"],
 )
 
+# A rule profile, or the names of the rules to run; defaults to the
+# server's WEBLENS_RULES setting
+RuleSelection = Optional[Union[ProfileName, Annotated[List[RuleName], Field(min_length=1)]]]
+
 class URLInput(BaseModel):
     url: HttpUrl
+    # HTML parser backend; defaults to the server's WEBLENS_PARSER setting
+    parser: Optional[ParserName] = None
+    rules: RuleSelection = None
+
+class BatchInput(BaseModel):
+    urls: List[HttpUrl] = Field(..., min_length=1, max_length=settings.batch_max_urls)
+    parser: Optional[ParserName] = None
+    rules: RuleSelection = None
+
+class CrawlInput(BaseModel):
+    url: HttpUrl
+    max_depth: int = Field(2, ge=0, le=settings.crawl_max_depth)
+    max_pages: int = Field(50, ge=1, le=settings.crawl_max_pages)
+    parser: Optional[ParserName] = None
+    rules: RuleSelection = None
 
 class ComplianceReport(BaseModel):
     url: str
@@ -42,22 +182,253 @@ class ComplianceReport(BaseModel):
     recommendations: List[Dict[str, str]]
     metrics: Dict[str, Dict[str, Any]]
 
+def check_error(e: Exception) -> HTTPException:
+    if isinstance(e, FetchError):
+        return HTTPException(status_code=e.status_code, detail=e.as_dict())
+    if isinstance(e, (AnalysisQueueFullError, JobQueueFullError)):
+        status_code = 503
+    elif isinstance(e, (ParserUnavailableError, UnknownRuleError)):
+        status_code = 400
+    else:
+        status_code = 500
+    return HTTPException(
+        status_code=status_code,
+        detail={"message": str(e), "type": type(e).__name__}
+    )
+
+def report_history(request: Request):
+    history = request.app.state.report_history
+    if history is None:
+        raise HTTPException(
+            status_code=404,
+            detail={"message": "Report history is disabled; set WEBLENS_HISTORY_PATH", "type": "HistoryDisabled"}
+        )
+    return history
+
 @app.post("/check", response_model=ComplianceReport)
 @limiter.limit("10/minute")
-async def check_compliance(url_input: URLInput, request: Request):
+async def check_compliance(url_input: URLInput, request: Request, response: Response, debug: bool = False):
     try:
-        checker = WCAGChecker()
-        results = await checker.analyze_url(str(url_input.url))
-        return results
+        checker = WCAGChecker(
+            parser=url_input.parser,
+            rules=url_input.rules,
+            client=request.app.state.http_client,
+            pool=request.app.state.analysis_pool,
+            history=request.app.state.report_history,
+        )
+        if debug:
+            # A fresh fetch and analysis with a `timings` section, which the
+            # response model would drop
+            results = await timed_check(checker, str(url_input.url))
+            return fast_response(request, results, {"X-Report-Cache": "bypass"})
+        results, cache_status = await audit_url(
+            checker, str(url_input.url), request.app.state.report_cache, request.app.state.single_flight
+        )
+        if cache_status is None:
+            return report_response(request, results, response)
+        return report_response(request, results, response, {"X-Report-Cache": cache_status})
     except Exception as e:
+        raise check_error(e)
+
+class DiffReport(BaseModel):
+    url: str
+    content_changed: bool
+    previous_checked_at: Optional[float]
+    compliance_score: float
+    score_delta: Optional[float]
+    summary: Dict[str, int]
+    added: List[Dict[str, str]]
+    resolved: List[Dict[str, str]]
+
+@app.post("/check/diff", response_model=DiffReport)
+@limiter.limit("10/minute")
+async def check_diff(url_input: URLInput, request: Request):
+    # Issues added and resolved since the last stored audit of the URL
+    history = report_history(request)
+    try:
+        checker = WCAGChecker(
+            parser=url_input.parser,
+            rules=url_input.rules,
+            client=request.app.state.http_client,
+            pool=request.app.state.analysis_pool,
+            history=history,
+        )
+        return await history.diff(checker, str(url_input.url))
+    except Exception as e:
+        raise check_error(e)
+
+class JobAccepted(BaseModel):
+    id: str
+    url: str
+    status: str
+    queue_position: int
+    created_at: float
+
+class JobStatus(BaseModel):
+    id: str
+    url: str
+    # queued, fetching, fetched, analyzing, done or failed
+    status: str
+    progress: float
+    queue_position: Optional[int]
+    created_at: float
+    started_at: Optional[float]
+    finished_at: Optional[float]
+    report: Optional[ComplianceReport]
+    error: Optional[Dict[str, str]]
+
+@app.post("/jobs", response_model=JobAccepted, status_code=202)
+@limiter.limit("30/minute")
+async def submit_job(url_input: URLInput, request: Request, response: Response):
+    # Queues the audit and answers at once; poll GET /jobs/{id} for the report
+    try:
+        job = await request.app.state.job_queue.submit(str(url_input.url), url_input.parser, url_input.rules)
+    except Exception as e:
+        raise check_error(e)
+    response.headers["Location"] = f"/jobs/{job['id']}"
+    return job
+
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+async def job_status(job_id: str, request: Request, response: Response):
+    job = await request.app.state.job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail={"message": f"Unknown job '{job_id}'", "type": "JobNotFound"})
+    return report_response(request, job, response)
+
+@app.post("/check/profile", response_class=PlainTextResponse)
+@limiter.limit("2/minute")
+async def check_profile(url_input: URLInput, request: Request, x_admin_token: str = Header("")):
+    # Collapsed stacks sampled while the page is parsed and analyzed, for
+    # flamegraph.pl or speedscope
+    if not settings.admin_token:
         raise HTTPException(
-            status_code=500, 
-            detail={"message": str(e), "type": type(e).__name__}
+            status_code=404,
+            detail={"message": "Profiling is disabled; set WEBLENS_ADMIN_TOKEN", "type": "ProfilingDisabled"}
         )
+    if not secrets.compare_digest(x_admin_token.encode(), settings.admin_token.encode()):
+        raise HTTPException(status_code=403, detail={"message": "Invalid admin token", "type": "Forbidden"})
+    try:
+        checker = WCAGChecker(
+            parser=url_input.parser,
+            rules=url_input.rules,
+            client=request.app.state.http_client,
+            pool=request.app.state.analysis_pool,
+        )
+        stacks = await profiled_check(checker, str(url_input.url))
+    except Exception as e:
+        raise check_error(e)
+    return PlainTextResponse(stacks, headers={"Content-Disposition": 'attachment; filename="weblens-profile.folded"'})
+
+@app.get("/history")
+async def score_history(
+    request: Request,
+    url: HttpUrl,
+    limit: int = Query(100, ge=1, le=1000),
+    before: Optional[float] = None,
+    parser: Optional[ParserName] = None,
+    # A profile name or repeated rule names, as in /check
+    rules: Optional[List[str]] = Query(None),
+):
+    # Newest first; pass the oldest checked_at as `before` for the next page.
+    # Only audits run with the same parser and rules are in one history.
+    history = report_history(request)
+    selection = rules[0] if rules is not None and len(rules) == 1 and rules[0] in PROFILES else rules
+    try:
+        checker = WCAGChecker(parser=parser, rules=selection)
+    except Exception as e:
+        raise check_error(e)
+    return {
+        "url": str(url),
+        "parser": checker.parser_name,
+        "rules": checker.rules_name,
+        "audits": await history.scores(checker, str(url), limit, before),
+    }
+
+@app.post("/check/stream")
+@limiter.limit("10/minute")
+async def check_compliance_stream(url_input: URLInput, request: Request):
+    # Server-sent events when the client accepts text/event-stream,
+    # newline-delimited JSON otherwise
+    checker = WCAGChecker(
+        parser=url_input.parser,
+        rules=url_input.rules,
+        client=request.app.state.http_client,
+        pool=request.app.state.analysis_pool,
+    )
+    encode, media_type = event_encoder(request.headers.get("accept", ""))
+    return StreamingResponse(stream_check(checker, str(url_input.url), encode), media_type=media_type)
+
+class BatchResult(BaseModel):
+    url: str
+    report: Optional[ComplianceReport]
+    error: Optional[Dict[str, str]]
+    cache: Optional[str]
+
+class BatchReport(BaseModel):
+    results: List[BatchResult]
+    summary: Dict[str, int]
+
+@app.post("/check/batch", response_model=BatchReport)
+@limiter.limit("5/minute")
+async def check_batch(batch_input: BatchInput, request: Request, response: Response):
+    # Failures are reported per URL, so one bad page does not fail the batch
+    runner = request.app.state.batch_runner
+    checker = WCAGChecker(
+        parser=batch_input.parser,
+        rules=batch_input.rules,
+        client=request.app.state.http_client,
+        pool=request.app.state.analysis_pool,
+        host_limiter=runner.hosts,
+        history=request.app.state.report_history,
+    )
+    urls = [str(url) for url in batch_input.urls]
+    results = await runner.run(checker, urls, request.app.state.report_cache)
+    return report_response(request, results, response)
+
+class CrawlPage(BaseModel):
+    url: str
+    depth: int
+    compliance_score: Optional[float]
+    summary: Optional[Dict[str, int]]
+    error: Optional[Dict[str, str]]
+
+class CrawlReport(BaseModel):
+    seed: str
+    pages: List[CrawlPage]
+    rollup: Dict[str, Any]
+    crawl: Dict[str, int]
+
+@app.post("/crawl", response_model=CrawlReport)
+@limiter.limit("2/minute")
+async def crawl_site(crawl_input: CrawlInput, request: Request, response: Response):
+    checker = WCAGChecker(
+        parser=crawl_input.parser,
+        rules=crawl_input.rules,
+        client=request.app.state.http_client,
+        pool=request.app.state.analysis_pool,
+        host_limiter=request.app.state.batch_runner.hosts,
+    )
+    crawler = SiteCrawler(checker, crawl_input.max_depth, crawl_input.max_pages, settings.crawl_concurrency)
+    results = await crawler.crawl(str(crawl_input.url))
+    return report_response(request, results, response)
 
 @app.get("/health")
-def health_check():
-    return {"status": "healthy"}
+def health_check(request: Request):
+    cache = request.app.state.report_cache
+    pool = request.app.state.analysis_pool
+    return {
+        "status": "healthy",
+        "http_pool": request.app.state.pool_stats.as_dict(),
+        "analysis_pool": pool.as_dict() if pool is not None else None,
+        "jobs": request.app.state.job_queue.as_dict(),
+        "single_flight": request.app.state.single_flight.as_dict(),
+        "report_cache": cache.as_dict() if cache is not None else None
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(telemetry.exposition(), media_type=telemetry.CONTENT_TYPE)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,367 @@
+import argparse
+import gzip
+import heapq
+import io
+import os
+import sys
+import tarfile
+import time
+import zlib
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from typing import Any, BinaryIO, Deque, Dict, Iterator, List, Optional, Tuple
+from batch import error_detail
+from checks import PROFILES, RuleSelection
+from http_client import HTML_MEDIA_TYPES, FetchError, decode_html
+from responses import JSON_MEDIA_TYPE, encode_payload
+from settings import settings
+from templates import SiteIssues, issue_counts
+from wcag_checker import WCAGChecker
+
+# Audits saved HTML without a network or a server: a static site build
+# directory, a tar archive of one, or a WARC capture. Pages are read lazily
+# and sent to worker processes in chunks, with a bounded number of chunks in
+# flight, so memory stays flat however many files there are. Writes one JSON
+# line per page, in input order, then a line with the aggregate summary.
+#
+#   python offline_audit.py SOURCE [--base-url URL] [--workers N] [--chunk-size N]
+#                           [--parser NAME] [--rules PROFILE] [--output FILE] [--min-score N]
+#                           [--allow-failures]
+
+HTML_SUFFIXES = (".html", ".htm", ".xhtml")
+DEFAULT_CHUNK_SIZE = 16
+# Chunks queued per worker; enough to keep workers busy while one is written
+CHUNKS_PER_WORKER = 2
+# Lowest-scoring pages listed in the summary
+WORST_PAGES = 10
+# Room for the HTTP headers around a page stored in a WARC record
+WARC_HEADER_ALLOWANCE = 64 * 1024
+
+
+@dataclass
+class Page:
+    # Pages from a directory are read by the worker from `path`; pages from
+    # archives carry their bytes. Neither is set when `size` is over the limit.
+    name: str
+    url: Optional[str]
+    size: int
+    path: Optional[str] = None
+    data: Optional[bytes] = None
+    charset: Optional[str] = None
+
+
+def _page_url(base_url: Optional[str], name: str) -> Optional[str]:
+    if base_url is None:
+        return None
+    return base_url.rstrip("/") + "/" + name.lstrip("/")
+
+def directory_pages(root: Path, base_url: Optional[str]) -> Iterator[Page]:
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories.sort()
+        for file_name in sorted(files):
+            if not file_name.lower().endswith(HTML_SUFFIXES):
+                continue
+            path = os.path.join(directory, file_name)
+            name = Path(path).relative_to(root).as_posix()
+            yield Page(name, _page_url(base_url, name), os.path.getsize(path), path=path)
+
+def tar_pages(path: Path, base_url: Optional[str]) -> Iterator[Page]:
+    # Read as a stream, so compressed archives are decompressed once, in order
+    with tarfile.open(path, "r|*") as archive:
+        for member in archive:
+            if not member.isfile() or not member.name.lower().endswith(HTML_SUFFIXES):
+                continue
+            name = member.name[2:] if member.name.startswith("./") else member.name
+            page = Page(name, _page_url(base_url, name), member.size)
+            if member.size <= settings.fetch_max_bytes:
+                extracted = archive.extractfile(member)
+                if extracted is not None:
+                    page.data = extracted.read()
+            yield page
+
+def _warc_records(stream: io.BufferedIOBase) -> Iterator[Tuple[Dict[str, str], int, Optional[bytes]]]:
+    # Yields each record's headers, block length and block; blocks too big to
+    # hold a page within the limit are skipped unread
+    while True:
+        line = stream.readline()
+        if not line:
+            return
+        if not line.strip():
+            continue
+        if not line.startswith(b"WARC/"):
+            raise ValueError(f"Not a WARC record: {line[:40]!r}")
+        headers = {}
+        for line in iter(stream.readline, b""):
+            if not line.strip():
+                break
+            name, _, value = line.decode("utf-8", "replace").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", "0"))
+        if length > settings.fetch_max_bytes + WARC_HEADER_ALLOWANCE:
+            remaining = length
+            while remaining > 0:
+                skipped = stream.read(min(remaining, 1024 * 1024))
+                if not skipped:
+                    break
+                remaining -= len(skipped)
+            yield headers, length, None
+        else:
+            yield headers, length, stream.read(length)
+
+def _dechunk(body: bytes) -> bytes:
+    parts = []
+    position = 0
+    while True:
+        end = body.find(b"\r\n", position)
+        if end < 0:
+            break
+        size = int(body[position:end].split(b";")[0] or b"0", 16)
+        if not size:
+            break
+        parts.append(body[end + 2:end + 2 + size])
+        position = end + 2 + size + 2
+    return b"".join(parts)
+
+def _http_payload(block: bytes) -> Optional[Tuple[bytes, Optional[str]]]:
+    # The body and charset of a stored successful HTML response, or None
+    head, _, body = block.partition(b"\r\n\r\n")
+    lines = head.decode("iso-8859-1").split("\r\n")
+    status = lines[0].split(" ")
+    if len(status) < 2 or not status[1].startswith("2"):
+        return None
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    media_type, _, params = headers.get("content-type", "").partition(";")
+    if media_type.strip().lower() not in HTML_MEDIA_TYPES:
+        return None
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        body = _dechunk(body)
+    encoding = headers.get("content-encoding", "").lower()
+    if encoding in ("gzip", "x-gzip", "deflate"):
+        # wbits 47 accepts gzip and zlib headers alike; output past the size
+        # limit is not decompressed, the page is reported as too large
+        try:
+            body = zlib.decompressobj(47).decompress(body, settings.fetch_max_bytes + 1)
+        except zlib.error:
+            return None
+    elif encoding not in ("", "identity"):
+        return None
+    charset = params.partition("charset=")[2].strip().strip("\"'") or None
+    return body, charset
+
+def warc_pages(path: Path) -> Iterator[Page]:
+    # Successful HTML responses, and HTML resource records; the page name and
+    # url are the record's target URI
+    with open(path, "rb") as raw:
+        gzipped = raw.read(2) == b"\x1f\x8b"
+    with (gzip.open(path, "rb") if gzipped else open(path, "rb")) as stream:
+        for headers, length, block in _warc_records(stream):
+            record_type = headers.get("warc-type")
+            url = headers.get("warc-target-uri", "").strip("<>")
+            if record_type == "response" and headers.get("content-type", "").startswith("application/http"):
+                if block is None:
+                    yield Page(url, url, length)
+                    continue
+                payload = _http_payload(block)
+                if payload is not None:
+                    yield Page(url, url, len(payload[0]), data=payload[0], charset=payload[1])
+            elif record_type == "resource" and headers.get("content-type", "").split(";")[0].strip() in HTML_MEDIA_TYPES:
+                yield Page(url, url, length, data=block)
+
+def source_pages(source: Path, base_url: Optional[str]) -> Iterator[Page]:
+    if source.is_dir():
+        return directory_pages(source, base_url)
+    name = source.name.lower()
+    if name.endswith((".warc", ".warc.gz")):
+        return warc_pages(source)
+    if tarfile.is_tarfile(source):
+        return tar_pages(source, base_url)
+    raise ValueError(f"{source} is not a directory, a tar archive or a WARC file")
+
+
+def _summary(page: Page, report: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if report is None:
+        return {"name": page.name, "score": None}
+    own, templates = issue_counts(report)
+    return {
+        "name": page.name,
+        "score": report["compliance_score"],
+        "severity": {severity: report["summary"][severity] for severity in ("critical", "serious", "moderate", "minor")},
+        "types": {issue_type: len(issues) for issue_type, issues in report["issues_by_type"].items()},
+        "own": own,
+        "templates": templates,
+    }
+
+def audit_pages(pages: List[Page], parser: Optional[str], rules: RuleSelection) -> List[Tuple[bytes, Dict[str, Any]]]:
+    # Module-level so it can run in the worker processes. Returns each page's
+    # JSON line, already encoded, with the figures the summary needs.
+    checker = WCAGChecker(parser=parser, rules=rules)
+    results = []
+    for page in pages:
+        report = None
+        error = None
+        try:
+            if page.size > settings.fetch_max_bytes:
+                raise FetchError("too_large", f"Page is {page.size} bytes, the limit is {settings.fetch_max_bytes}", 413)
+            data = page.data
+            if data is None:
+                if page.path is None:
+                    raise FetchError("unreadable", f"Could not read {page.name} from the archive", 422)
+                with open(page.path, "rb") as file:
+                    data = file.read()
+            report = checker.analyze_html(decode_html(data, page.charset), page.url)
+        except Exception as e:
+            error = error_detail(e)
+        line, _ = encode_payload({"path": page.name, "url": page.url, "report": report, "error": error}, JSON_MEDIA_TYPE)
+        results.append((line + b"\n", _summary(page, report)))
+    return results
+
+
+class Aggregate:
+    def __init__(self):
+        self.pages = 0
+        self.failed = 0
+        self.score_total = 0.0
+        self.severity: Counter = Counter()
+        self.types: Counter = Counter()
+        self.site_issues = SiteIssues()
+        # The lowest-scoring pages, as a heapq min-heap on the negated score:
+        # its root is the highest score kept, the first to be replaced
+        self._worst: List[Tuple[float, str]] = []
+
+    def add(self, summary: Dict[str, Any]) -> None:
+        self.pages += 1
+        if summary["score"] is None:
+            self.failed += 1
+            return
+        self.score_total += summary["score"]
+        self.severity.update(summary["severity"])
+        self.types.update(summary["types"])
+        self.site_issues.add(summary["own"], summary["templates"])
+        entry = (-summary["score"], summary["name"])
+        if len(self._worst) < WORST_PAGES:
+            heapq.heappush(self._worst, entry)
+        elif entry > self._worst[0]:
+            heapq.heapreplace(self._worst, entry)
+
+    @property
+    def lowest_score(self) -> Optional[float]:
+        return -max(self._worst)[0] if self._worst else None
+
+    def as_dict(self, seconds: float) -> Dict[str, Any]:
+        analyzed = self.pages - self.failed
+        return {
+            "pages": self.pages,
+            "analyzed": analyzed,
+            "failed": self.failed,
+            "average_score": round(self.score_total / analyzed, 2) if analyzed else None,
+            "lowest_score": self.lowest_score,
+            "issues": {
+                "total": sum(self.severity.values()),
+                **{severity: self.severity[severity] for severity in ("critical", "serious", "moderate", "minor")},
+            },
+            "issues_by_type": dict(self.types.most_common()),
+            # Issues of templates shared by several pages counted once
+            "site_issues": self.site_issues.as_dict(),
+            "worst_pages": [{"path": name, "score": -score} for score, name in sorted(self._worst, reverse=True)],
+            "seconds": round(seconds, 3),
+            "pages_per_second": round(self.pages / seconds, 2) if seconds else None,
+        }
+
+
+def _chunks(pages: Iterator[Page], size: int) -> Iterator[List[Page]]:
+    while True:
+        chunk = list(islice(pages, size))
+        if not chunk:
+            return
+        yield chunk
+
+def run(
+    pages: Iterator[Page], output: BinaryIO, workers: int, chunk_size: int, parser: Optional[str], rules: RuleSelection
+) -> Aggregate:
+    aggregate = Aggregate()
+
+    def write(results: List[Tuple[bytes, Dict[str, Any]]]) -> None:
+        for line, summary in results:
+            output.write(line)
+            aggregate.add(summary)
+
+    if workers <= 1:
+        for chunk in _chunks(pages, chunk_size):
+            write(audit_pages(chunk, parser, rules))
+        return aggregate
+
+    # Chunks are written in submission order; at most CHUNKS_PER_WORKER per
+    # worker are read ahead, so a slow page holds back reading, not memory
+    in_flight: Deque[Future] = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk in _chunks(pages, chunk_size):
+            in_flight.append(executor.submit(audit_pages, chunk, parser, rules))
+            if len(in_flight) >= workers * CHUNKS_PER_WORKER:
+                write(in_flight.popleft().result())
+        while in_flight:
+            write(in_flight.popleft().result())
+    return aggregate
+
+def main() -> int:
+    arg_parser = argparse.ArgumentParser(description="Audit saved HTML pages without a server")
+    arg_parser.add_argument("source", help="directory, tar archive (optionally compressed) or WARC file")
+    arg_parser.add_argument("--base-url", help="URL the directory or archive is served from, for the reports")
+    arg_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes; 1 runs inline")
+    arg_parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="pages sent to a worker at once")
+    arg_parser.add_argument("--parser", default=None)
+    arg_parser.add_argument("--rules", default=None, help="rule profile or comma-separated rule names")
+    arg_parser.add_argument("--output", "-o", help="JSONL file to write; standard output by default")
+    arg_parser.add_argument("--min-score", type=float, help="exit non-zero when any page scores lower or fails")
+    arg_parser.add_argument(
+        "--allow-failures", action="store_true", help="with --min-score, do not fail on pages that could not be analyzed"
+    )
+    args = arg_parser.parse_args()
+
+    rules = args.rules if args.rules is None or args.rules in PROFILES else args.rules.split(",")
+    try:
+        # Fails on unknown parser or rule names before any worker starts
+        WCAGChecker(parser=args.parser, rules=rules).analyze_html("<html></html>")
+        pages = source_pages(Path(args.source), args.base_url)
+    except (ValueError, OSError) as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    start = time.perf_counter()
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        aggregate = run(pages, output, max(1, args.workers), max(1, args.chunk_size), args.parser, rules)
+        summary = aggregate.as_dict(time.perf_counter() - start)
+        line, _ = encode_payload({"summary": summary}, JSON_MEDIA_TYPE)
+        output.write(line + b"\n")
+    finally:
+        if args.output:
+            output.close()
+
+    print(
+        f"{summary['pages']} pages, {summary['failed']} failed, average score {summary['average_score']}, "
+        f"{summary['pages_per_second']} pages/s",
+        file=sys.stderr,
+    )
+    if args.min_score is None:
+        return 0
+    # A page that could not be analyzed has no score, so it fails the gate
+    # unless failures are allowed, as does a source with no pages at all
+    if not aggregate.pages:
+        print(f"No pages found in {args.source}", file=sys.stderr)
+        return 1
+    if aggregate.failed and not args.allow_failures:
+        print(f"{aggregate.failed} of {aggregate.pages} pages could not be analyzed", file=sys.stderr)
+        return 1
+    if aggregate.lowest_score is not None and aggregate.lowest_score < args.min_score:
+        print(f"Lowest score {aggregate.lowest_score} is under {args.min_score:g}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+from bs4 import BeautifulSoup, Comment, Doctype
+from bs4.builder import builder_registry, ParserRejectedMarkup
+from bs4.builder._htmlparser import HTMLParserTreeBuilder
+from functools import lru_cache
+from time import perf_counter
+from typing import Any, Dict, List, Literal, Optional, Type, Union
+import re
+from settings import settings
+from telemetry import PARSE_SECONDS
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+    lexbor_parser: Optional[Type[LexborHTMLParser]] = LexborHTMLParser
+except ImportError:
+    lexbor_parser = None
+
+ParserName = Literal["html.parser", "lxml", "html5lib", "selectolax"]
+
+
+class ParserUnavailableError(ValueError):
+    pass
+
+
+class SelectolaxTreeBuilder(HTMLParserTreeBuilder):
+    # Parses with lexbor (through selectolax) and replays the resulting tree
+    # into Beautiful Soup, so the checks keep working on regular Tag objects.
+    # Markup decoding is inherited from the html.parser builder.
+    NAME = "selectolax"
+    ALTERNATE_NAMES = ["lexbor"]
+    features = [NAME, "html", "fast"]
+
+    DOCTYPE_PATTERN = re.compile(r'^<!DOCTYPE\s+(.*)>$', re.IGNORECASE | re.DOTALL)
+
+    def feed(self, markup: Union[str, bytes], _parser_class: Any = None) -> None:
+        # `_parser_class` only keeps the signature of the inherited feed()
+        if lexbor_parser is None:
+            raise ParserUnavailableError("Parser 'selectolax' is not installed")
+        try:
+            tree = lexbor_parser(markup)
+        except Exception as e:
+            raise ParserRejectedMarkup(e)
+        document = tree.root.parent if tree.root is not None else None
+        if document is not None:
+            self._replay(document)
+
+    def _replay(self, document: Any) -> None:
+        soup = self.soup
+        # Set by BeautifulSoup before it calls feed()
+        assert soup is not None
+        node = document.child
+        while node is not None:
+            if node.is_element_node:
+                attrs = {key: '' if value is None else value for key, value in node.attributes.items()}
+                soup.endData()
+                soup.handle_starttag(node.tag, None, None, attrs)
+                if node.child is not None:
+                    node = node.child
+                    continue
+                soup.endData()
+                soup.handle_endtag(node.tag)
+            elif node.is_text_node:
+                soup.handle_data(node.text_content)
+            elif node.is_comment_node:
+                soup.endData()
+                soup.handle_data(node.comment_content)
+                soup.endData(Comment)
+            elif node.tag == '-doctype':
+                match = self.DOCTYPE_PATTERN.match(node.html or '')
+                soup.endData()
+                soup.handle_data(match.group(1) if match else 'html')
+                soup.endData(Doctype)
+
+            # Close finished elements on the way back up to the next sibling
+            while node.next is None:
+                node = node.parent
+                if node is None or node.is_document_node:
+                    return
+                soup.endData()
+                soup.handle_endtag(node.tag)
+            node = node.next
+
+
+# Parser name -> Beautiful Soup feature string or tree builder class
+PARSERS: Dict[str, Union[str, Type[HTMLParserTreeBuilder]]] = {
+    "html.parser": "html.parser",
+    "lxml": "lxml",
+    "html5lib": "html5lib",
+    "selectolax": SelectolaxTreeBuilder,
+}
+
+@lru_cache(maxsize=None)
+def available_parsers() -> List[str]:
+    available = []
+    for name, features in PARSERS.items():
+        if isinstance(features, str):
+            if builder_registry.lookup(features) is not None:
+                available.append(name)
+        elif lexbor_parser is not None:
+            available.append(name)
+    return available
+
+def parse_html(html: Union[str, bytes], parser: Optional[str] = None) -> BeautifulSoup:
+    name = parser or settings.parser
+    if name not in PARSERS:
+        raise ParserUnavailableError(f"Unknown parser '{name}'")
+    if name not in available_parsers():
+        raise ParserUnavailableError(f"Parser '{name}' is not installed")
+
+    features = PARSERS[name]
+    start = perf_counter()
+    if isinstance(features, str):
+        soup = BeautifulSoup(html, features)
+    else:
+        soup = BeautifulSoup(html, builder=features())
+    PARSE_SECONDS.observe(perf_counter() - start, name)
+    return soup
@@ -0,0 +1,101 @@
+import os
+import sys
+import threading
+from collections import Counter
+from time import perf_counter
+from typing import Any, Dict, Optional, Tuple
+from checks import RuleSelection
+from http_client import FetchTimings
+from parsers import parse_html
+from telemetry import Stopwatch
+from wcag_checker import WCAGChecker
+
+# Debug views of a single /check: a breakdown of where its time went, and a
+# sampled profile of its analysis as collapsed stacks ("frame;frame;frame
+# count" per line), the input format of flamegraph.pl and speedscope.
+
+# Seconds between stack samples; the interpreter switches threads every 5 ms
+# by default, so shorter intervals mostly add overhead
+PROFILE_INTERVAL = 0.005
+
+
+def _milliseconds(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: _milliseconds(item) for key, item in value.items()}
+    return round(value * 1000, 3)
+
+def analyze_html_timed(
+    html_content: str, url: str, parser: Optional[str] = None, rules: RuleSelection = None
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    # Module-level so it can run in the analysis pool. Returns the report and
+    # the seconds spent parsing, in each check and in each report stage.
+    timings: Dict[str, Any] = {}
+    stopwatch = Stopwatch(timings)
+    with stopwatch.stage("analysis"):
+        with stopwatch.stage("parse"):
+            soup = parse_html(html_content, parser)
+        report = WCAGChecker(parser=parser, rules=rules).analyze_soup(soup, url, timings=timings)
+    return report, timings
+
+async def timed_check(checker: WCAGChecker, url: str) -> Dict[str, Any]:
+    # Fetches and analyzes `url` afresh, bypassing the report cache and the
+    # history, and adds a `timings` section in milliseconds. `analysis` is
+    # measured where it runs; `total` also counts any wait for a worker.
+    start = perf_counter()
+    fetch_timings = FetchTimings()
+    result = await checker.fetch(url, trace=fetch_timings.trace)
+    report, timings = await checker.run_analysis(analyze_html_timed, result.text, url)
+    timings = {"fetch": fetch_timings.seconds, **timings, "total": perf_counter() - start}
+    return {**report, "timings": _milliseconds(timings)}
+
+
+class StackSampler:
+    # Records the stack of the thread that created it every `interval`
+    # seconds from a background thread. Sampling costs nothing on the
+    # profiled thread besides sharing the interpreter lock.
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        # Stacks are cut at the frame that created the sampler, so they
+        # start at the code being profiled
+        self._root = sys._getframe(1)
+
+    def __enter__(self) -> "StackSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[self._collapse(frame)] += 1
+
+    def _collapse(self, frame: Any) -> str:
+        names = []
+        while frame is not None and frame is not self._root:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":"))
+            frame = frame.f_back
+        names.reverse()
+        return ";".join(names)
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+def profile_html(html_content: str, url: str, parser: Optional[str] = None, rules: RuleSelection = None) -> str:
+    # Module-level so it can run in the analysis pool; samples parsing and
+    # the analysis, not the fetch
+    with StackSampler() as sampler:
+        WCAGChecker(parser=parser, rules=rules).analyze_html(html_content, url)
+    return sampler.collapsed()
+
+async def profiled_check(checker: WCAGChecker, url: str) -> str:
+    result = await checker.fetch(url)
+    return await checker.run_analysis(profile_html, result.text, url)
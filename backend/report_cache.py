@@ -0,0 +1,114 @@
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+from checks import RULESET_VERSION
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Values of the cache status reported with each /check response
+HIT = "hit"
+REVALIDATED = "revalidated"
+MISS = "miss"
+CACHE_STATUSES = (HIT, REVALIDATED, MISS)
+
+def normalize_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    return urlunsplit((scheme, host, parts.path or "/", parts.query, ""))
+
+
+@dataclass
+class CacheEntry:
+    report: Dict[str, Any]
+    etag: Optional[str]
+    last_modified: Optional[str]
+    stored_at: float
+    size: int
+
+    def validators(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ReportCache:
+    # LRU of finished reports bounded by their approximate serialized size.
+    # Entries older than `ttl` seconds stay in the LRU so they can be
+    # revalidated against the origin with their ETag/Last-Modified.
+    def __init__(self, ttl: float, max_bytes: int):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: "OrderedDict[Tuple, CacheEntry]" = OrderedDict()
+        self.stats = {HIT: 0, REVALIDATED: 0, MISS: 0, "evictions": 0}
+
+    def key(self, url: str, *options: Any) -> Tuple:
+        return (normalize_url(url), RULESET_VERSION) + options
+
+    def get(self, key: Tuple) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return time.monotonic() - entry.stored_at < self.ttl
+
+    def put(self, key: Tuple, report: Dict[str, Any], headers: Any) -> None:
+        size = len(json.dumps(report, separators=(",", ":")))
+        if size > self.max_bytes:
+            return
+        self._remove(key)
+        self._entries[key] = CacheEntry(
+            report=report,
+            etag=headers.get("etag"),
+            last_modified=headers.get("last-modified"),
+            stored_at=time.monotonic(),
+            size=size,
+        )
+        self.total_bytes += size
+        while self.total_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.total_bytes -= evicted.size
+            self.stats["evictions"] += 1
+
+    def touch(self, entry: CacheEntry) -> None:
+        # The origin confirmed the entry is still current
+        entry.stored_at = time.monotonic()
+
+    def _remove(self, key: Tuple) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry.size
+
+    def as_dict(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "bytes": self.total_bytes, **self.stats}
+
+    async def analyze(self, checker: Any, url: str) -> Tuple[Dict[str, Any], str]:
+        key = self.key(url, checker.parser_name, checker.rules_name)
+        entry = self.get(key)
+        if entry is not None and self.is_fresh(entry):
+            self.stats[HIT] += 1
+            return {**entry.report, "url": url}, HIT
+
+        headers = entry.validators() if entry is not None else {}
+        response = await checker.fetch(url, headers=headers)
+        if entry is not None and headers and response.status_code == 304:
+            self.touch(entry)
+            self.stats[REVALIDATED] += 1
+            return {**entry.report, "url": url}, REVALIDATED
+
+        report = await checker.analyze_page(response.text, url)
+        if response.is_success:
+            self.put(key, report, response.headers)
+        self.stats[MISS] += 1
+        return report, MISS
@@ -0,0 +1,76 @@
+import gzip
+import json
+from fastapi import Request, Response
+from typing import Any, Dict, Optional, Set, Tuple
+from settings import settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Fast path for report responses, enabled with WEBLENS_FAST_RESPONSES. The
+# payload is already in its final form, so it is encoded as-is instead of
+# being revalidated against the response model first.
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+# Smaller bodies are not worth compressing
+COMPRESSION_MIN_BYTES = 1024
+# Brotli's default quality 11 is meant for static assets
+BROTLI_QUALITY = 4
+GZIP_LEVEL = 6
+
+def encode_payload(payload: Any, accept: str) -> Tuple[bytes, str]:
+    if msgpack is not None and any(media_type in accept for media_type in MSGPACK_MEDIA_TYPES):
+        return msgpack.packb(payload), MSGPACK_MEDIA_TYPES[0]
+    if orjson is not None:
+        return orjson.dumps(payload), JSON_MEDIA_TYPE
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), JSON_MEDIA_TYPE
+
+def accepted_encodings(accept_encoding: str) -> Set[str]:
+    encodings = set()
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        encodings.add(name.strip().lower())
+    return encodings
+
+def compress(body: bytes, accept_encoding: str) -> Tuple[bytes, Optional[str]]:
+    if len(body) < COMPRESSION_MIN_BYTES:
+        return body, None
+    encodings = accepted_encodings(accept_encoding)
+    if brotli is not None and "br" in encodings:
+        return brotli.compress(body, quality=BROTLI_QUALITY), "br"
+    if "gzip" in encodings:
+        return gzip.compress(body, compresslevel=GZIP_LEVEL), "gzip"
+    return body, None
+
+def fast_response(request: Request, payload: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+    body, media_type = encode_payload(payload, request.headers.get("accept", ""))
+    body, encoding = compress(body, request.headers.get("accept-encoding", ""))
+    response = Response(content=body, media_type=media_type, headers=headers)
+    response.headers["Vary"] = "Accept, Accept-Encoding"
+    if encoding is not None:
+        response.headers["Content-Encoding"] = encoding
+    return response
+
+def report_response(request: Request, payload: Any, response: Response, headers: Optional[Dict[str, str]] = None) -> Any:
+    # Returns `payload` for FastAPI to validate and encode as usual, or an
+    # encoded response when the fast path is enabled
+    if settings.fast_responses:
+        return fast_response(request, payload, headers)
+    if headers:
+        response.headers.update(headers)
+    return payload
@@ -0,0 +1,102 @@
+import os
+from dataclasses import dataclass, field
+
+# Server configuration, read from WEBLENS_* environment variables at startup
+
+def _env_str(name: str, default: str):
+    return field(default_factory=lambda: os.getenv(name, default))
+
+def _env_int(name: str, default: int):
+    return field(default_factory=lambda: int(os.getenv(name, default)))
+
+def _env_float(name: str, default: float):
+    return field(default_factory=lambda: float(os.getenv(name, default)))
+
+def _env_bool(name: str, default: bool):
+    return field(default_factory=lambda: os.getenv(name, str(default)).lower() in ("1", "true", "yes", "on"))
+
+def _state_file(name: str) -> str:
+    # Under $XDG_STATE_HOME (~/.local/state by default), outside the source tree
+    state_home = os.getenv("XDG_STATE_HOME") or os.path.join(os.path.expanduser("~"), ".local", "state")
+    return os.path.join(state_home, "weblens", name)
+
+@dataclass
+class Settings:
+    # Default HTML parser backend, see parsers.PARSERS
+    parser: str = _env_str("WEBLENS_PARSER", "html.parser")
+
+    # Rule profile run when a request does not choose one: "wcag",
+    # "heuristics" or "all"
+    rules: str = _env_str("WEBLENS_RULES", "all")
+
+    # Issue code snippets: "full" or "opening_tag", cut after this many
+    # characters (0 keeps them whole)
+    snippet_mode: str = _env_str("WEBLENS_SNIPPET_MODE", "full")
+    snippet_max_length: int = _env_int("WEBLENS_SNIPPET_MAX_LENGTH", 1000)
+
+    # Comma-separated words the plain-language rule reports as jargon
+    jargon_terms: str = _env_str(
+        "WEBLENS_JARGON_TERMS",
+        "backend,frontend,API,middleware,runtime,syntax,compiler,regex,"
+        "execution,interface,protocol,parameter,function,variable,iterator",
+    )
+
+    # Encode report responses directly with orjson/msgpack, compressed with
+    # brotli or gzip, instead of revalidating them against the response model
+    fast_responses: bool = _env_bool("WEBLENS_FAST_RESPONSES", False)
+
+    # Fraction of analyses that time each rule for /metrics; timing every
+    # rule of every analysis costs a few percent, 0 turns it off
+    metrics_rule_sample_rate: float = _env_float("WEBLENS_METRICS_RULE_SAMPLE_RATE", 0.1)
+
+    # Token sent as X-Admin-Token to use the sampling profiler of
+    # /check/profile; empty disables the endpoint
+    admin_token: str = _env_str("WEBLENS_ADMIN_TOKEN", "")
+
+    # Shared HTTP client used to fetch pages
+    fetch_timeout: float = _env_float("WEBLENS_FETCH_TIMEOUT", 30.0)
+    fetch_max_bytes: int = _env_int("WEBLENS_FETCH_MAX_BYTES", 10 * 1024 * 1024)
+    fetch_max_compression_ratio: float = _env_float("WEBLENS_FETCH_MAX_COMPRESSION_RATIO", 100.0)
+    http_max_connections: int = _env_int("WEBLENS_HTTP_MAX_CONNECTIONS", 100)
+    http_max_keepalive_connections: int = _env_int("WEBLENS_HTTP_MAX_KEEPALIVE", 20)
+    http_keepalive_expiry: float = _env_float("WEBLENS_HTTP_KEEPALIVE_EXPIRY", 30.0)
+    http2: bool = _env_bool("WEBLENS_HTTP2", False)
+
+    # Worker processes running parse-and-check; 0 runs it on the event loop
+    analysis_workers: int = _env_int("WEBLENS_ANALYSIS_WORKERS", os.cpu_count() or 1)
+    analysis_max_tasks_per_child: int = _env_int("WEBLENS_ANALYSIS_MAX_TASKS_PER_CHILD", 200)
+    analysis_max_queue: int = _env_int("WEBLENS_ANALYSIS_MAX_QUEUE", 64)
+
+    # /check/batch: URLs per request, pages in flight and fetches per host
+    batch_max_urls: int = _env_int("WEBLENS_BATCH_MAX_URLS", 500)
+    batch_concurrency: int = _env_int("WEBLENS_BATCH_CONCURRENCY", 16)
+    batch_per_host: int = _env_int("WEBLENS_BATCH_PER_HOST", 4)
+
+    # /crawl limits and concurrent page fetches per crawl
+    crawl_max_depth: int = _env_int("WEBLENS_CRAWL_MAX_DEPTH", 5)
+    crawl_max_pages: int = _env_int("WEBLENS_CRAWL_MAX_PAGES", 500)
+    crawl_concurrency: int = _env_int("WEBLENS_CRAWL_CONCURRENCY", 4)
+
+    # SQLite file keeping past reports by content hash; empty disables it
+    history_path: str = _env_str("WEBLENS_HISTORY_PATH", "")
+
+    # Background audits of POST /jobs: SQLite file keeping the queue across
+    # restarts, created with the first job (":memory:" keeps it in memory
+    # only), concurrent fetches, concurrent analyses, most jobs waiting at
+    # once and seconds finished jobs are kept
+    jobs_path: str = _env_str("WEBLENS_JOBS_PATH", _state_file("jobs.sqlite3"))
+    jobs_fetch_workers: int = _env_int("WEBLENS_JOBS_FETCH_WORKERS", 8)
+    jobs_analysis_workers: int = _env_int("WEBLENS_JOBS_ANALYSIS_WORKERS", os.cpu_count() or 1)
+    jobs_max_queued: int = _env_int("WEBLENS_JOBS_MAX_QUEUED", 1000)
+    jobs_retention: float = _env_float("WEBLENS_JOBS_RETENTION", 86400.0)
+
+    # In-memory report cache for /check; a size of 0 disables it
+    cache_ttl: float = _env_float("WEBLENS_CACHE_TTL", 300.0)
+    cache_max_bytes: int = _env_int("WEBLENS_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+
+    # Issues found in template subtrees (header, nav, footer, aside, dialog)
+    # kept per analysis process, by subtree fingerprint, so pages sharing a
+    # template reuse them; 0 turns the reuse off
+    template_cache_entries: int = _env_int("WEBLENS_TEMPLATE_CACHE_ENTRIES", 1000)
+
+settings = Settings()
@@ -0,0 +1,57 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Future[Any]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    # Runs at most one call per key at a time; callers that arrive while it
+    # is running await the same result or exception instead of starting
+    # their own. The call runs in a task of its own, so one caller being
+    # cancelled does not cancel it for the others; it is cancelled once
+    # every caller has gone. Nothing is kept after the call finishes or is
+    # abandoned.
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def run(self, key: Hashable, function: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        # Returns the result and whether it came from another caller's call
+        flight = self._flights.get(key)
+        shared = flight is not None
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(function()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda task: self._land(key, flight))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task), shared
+        finally:
+            flight.waiters -= 1
+            if not flight.waiters and not flight.task.done():
+                # The cancelled call may still take a while to finish, so
+                # callers from now on start a new one instead of joining it
+                flight.task.cancel()
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+
+    def _land(self, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # Marks the exception as retrieved when every caller had gone
+        if not flight.task.cancelled():
+            flight.task.exception()
+
+    def as_dict(self) -> Dict[str, int]:
+        return {"in_flight": len(self._flights), "leaders": self.leaders, "coalesced": self.coalesced}
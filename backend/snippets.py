@@ -0,0 +1,91 @@
+from bs4 import NavigableString, Tag
+from bs4.formatter import Formatter
+from typing import Dict, Optional, Union
+from settings import settings
+
+SNIPPET_MODES = ("full", "opening_tag")
+TRUNCATION_MARK = "…"
+# Incremental serialization needs the event stream added in beautifulsoup4
+# 4.13; older releases render the whole element and truncate afterwards
+_EVENT_STREAM = all(
+    hasattr(Tag, name)
+    for name in ("_event_stream", "START_ELEMENT_EVENT", "END_ELEMENT_EVENT", "EMPTY_ELEMENT_EVENT")
+)
+
+
+def _qualified_name(tag: Tag) -> str:
+    return f"{tag.prefix}:{tag.name}" if tag.prefix else tag.name
+
+
+def _start_tag(tag: Tag, formatter: Formatter) -> str:
+    if tag.hidden:
+        return ""
+    attrs = []
+    for key, value in formatter.attributes(tag):
+        if value is None:
+            attrs.append(key)
+            continue
+        if isinstance(value, (list, tuple)):
+            value = " ".join(value)
+        text = formatter.attribute_value(str(value))
+        attrs.append(f"{key}={formatter.quoted_attribute_value(text)}")
+    attribute_string = " " + " ".join(attrs) if attrs else ""
+    closing_slash = (formatter.void_element_close_prefix or "") if tag.is_empty_element else ""
+    return f"<{_qualified_name(tag)}{attribute_string}{closing_slash}>"
+
+
+def _end_tag(tag: Tag) -> str:
+    return "" if tag.hidden else f"</{_qualified_name(tag)}>"
+
+
+class SnippetRenderer:
+    # Turns the elements stored on issues into code snippets while a report
+    # is built. Each element is serialized at most once per report and only
+    # as far as `max_length` (0 for no limit); "opening_tag" mode renders
+    # just the element's start tag. Elements are keyed by id(), so one
+    # renderer must not outlive the document it renders.
+    def __init__(self, mode: Optional[str] = None, max_length: Optional[int] = None):
+        self.mode = mode or settings.snippet_mode
+        if self.mode not in SNIPPET_MODES:
+            raise ValueError(f"Unknown snippet mode '{self.mode}'")
+        self.max_length = settings.snippet_max_length if max_length is None else max_length
+        self._rendered: Dict[int, str] = {}
+
+    def render(self, snippet: Union[str, Tag]) -> str:
+        if not isinstance(snippet, Tag):
+            return snippet
+        key = id(snippet)
+        rendered = self._rendered.get(key)
+        if rendered is None:
+            rendered = self._rendered[key] = self._truncate(self._serialize(snippet))
+        return rendered
+
+    def _serialize(self, tag: Tag) -> str:
+        formatter = tag.formatter_for_name("minimal")
+        if self.mode == "opening_tag":
+            return _start_tag(tag, formatter)
+        if not _EVENT_STREAM:
+            return tag.decode(formatter=formatter)
+
+        # Same pieces as Tag.decode(), but stops once the limit is passed
+        pieces = []
+        length = 0
+        for event, element in tag._event_stream():
+            if isinstance(element, NavigableString):
+                piece = element.output_ready(formatter)
+            elif not isinstance(element, Tag):
+                continue
+            elif event is Tag.END_ELEMENT_EVENT:
+                piece = _end_tag(element)
+            else:
+                piece = _start_tag(element, formatter)
+            pieces.append(piece)
+            length += len(piece)
+            if self.max_length and length > self.max_length:
+                break
+        return "".join(pieces)
+
+    def _truncate(self, text: str) -> str:
+        if self.max_length and len(text) > self.max_length:
+            return text[:self.max_length] + TRUNCATION_MARK
+        return text
@@ -0,0 +1,55 @@
+import json
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from batch import error_detail
+from checks import RuleSelection
+from parsers import parse_html
+from wcag_checker import WCAGChecker
+
+# Streamed /check results. Events, in order:
+#   fetched  {url, final_url, status_code, bytes}
+#   check    {check, issues} once per selected rule group, in report order
+#   summary  the report without issues_by_type; grouping the issues of all
+#            check events by `type` gives issues_by_type
+#   error    {message, type[, reason]}, ends the stream early
+
+SSE_MEDIA_TYPE = "text/event-stream"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def analyze_html_by_check(
+    html_content: str, url: str, parser: Optional[str] = None, rules: RuleSelection = None
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    # Module-level so it can run in the analysis pool
+    groups, report = WCAGChecker(parser=parser, rules=rules).analyze_soup_by_check(parse_html(html_content, parser), url)
+    checks = [{"check": name, "issues": issues} for name, issues in groups]
+    return checks, report
+
+def ndjson_event(event: str, data: Dict[str, Any]) -> str:
+    return json.dumps({"event": event, "data": data}) + "\n"
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def event_encoder(accept: str) -> Tuple[Callable[[str, Dict[str, Any]], str], str]:
+    if SSE_MEDIA_TYPE in accept:
+        return sse_event, SSE_MEDIA_TYPE
+    return ndjson_event, NDJSON_MEDIA_TYPE
+
+async def stream_check(checker: WCAGChecker, url: str, encode: Callable[[str, Dict[str, Any]], str]) -> AsyncIterator[str]:
+    # The rule groups share one tree walk, so their events follow each other
+    # as soon as the analysis is done; `fetched` is sent before it starts
+    try:
+        result = await checker.fetch(url)
+        yield encode("fetched", {
+            "url": url,
+            "final_url": result.url,
+            "status_code": result.status_code,
+            "bytes": len(result.text),
+        })
+
+        checks, report = await checker.run_analysis(analyze_html_by_check, result.text, url)
+        for check in checks:
+            yield encode("check", check)
+        yield encode("summary", {key: value for key, value in report.items() if key != "issues_by_type"})
+    except Exception as e:
+        yield encode("error", error_detail(e))
@@ -0,0 +1,190 @@
+import random
+import time
+from bisect import bisect_left
+from collections import Counter as Tally
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from settings import settings
+
+# Counters and histograms for GET /metrics, in the Prometheus text
+# exposition format. Analysis worker processes have registries of their own,
+# so while a pooled analysis runs its observations are buffered and shipped
+# back with the result, then replayed into the server's registry (see
+# analysis_pool.AnalysisPool.run).
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6, 1e7)
+
+Labels = Tuple[str, ...]
+# (metric name, label values, value) recorded inside a worker
+Observation = Tuple[str, Labels, float]
+
+REGISTRY: Dict[str, "Metric"] = {}
+_recording: Optional[List[Observation]] = None
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _label_text(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, description: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        REGISTRY[name] = self
+
+    def record(self, labels: Labels, value: float) -> None:
+        if _recording is not None:
+            _recording.append((self.name, labels, value))
+        else:
+            self.add(labels, value)
+
+    def add(self, labels: Labels, value: float) -> None:
+        raise NotImplementedError
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def exposition(self) -> List[str]:
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, label_names: Sequence[str] = ()):
+        super().__init__(name, description, label_names)
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self.record(labels, amount)
+
+    def add(self, labels: Labels, value: float) -> None:
+        self.values[labels] = self.values.get(labels, 0.0) + value
+
+    def samples(self) -> Iterator[str]:
+        for labels, value in sorted(self.values.items()):
+            yield f"{self.name}{_label_text(self.label_names, labels)} {_number(value)}"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, buckets: Sequence[float], label_names: Sequence[str] = ()):
+        super().__init__(name, description, label_names)
+        self.buckets = tuple(buckets)
+        # Per label set: observations per bucket (the last one is +Inf),
+        # not yet cumulative, and their sum
+        self.counts: Dict[Labels, List[int]] = {}
+        self.sums: Dict[Labels, float] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        self.record(labels, value)
+
+    def add(self, labels: Labels, value: float) -> None:
+        counts = self.counts.get(labels)
+        if counts is None:
+            counts = self.counts[labels] = [0] * (len(self.buckets) + 1)
+            self.sums[labels] = 0.0
+        counts[bisect_left(self.buckets, value)] += 1
+        self.sums[labels] += value
+
+    def samples(self) -> Iterator[str]:
+        for labels, counts in sorted(self.counts.items()):
+            total = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                total += count
+                le = f'le="{_number(bound)}"'
+                yield f"{self.name}_bucket{_label_text(self.label_names, labels, le)} {total}"
+            label_text = _label_text(self.label_names, labels)
+            yield f"{self.name}_sum{label_text} {_number(self.sums[labels])}"
+            yield f"{self.name}_count{label_text} {total}"
+
+
+class Collected(Metric):
+    # Values kept by another object (pool and cache statistics), read when
+    # the metrics are scraped
+    def __init__(self, name: str, kind: str, description: str, read: Callable[[], Dict[Labels, float]], label_names: Sequence[str] = ()):
+        super().__init__(name, description, label_names)
+        self.kind = kind
+        self.read = read
+
+    def samples(self) -> Iterator[str]:
+        for labels, value in sorted(self.read().items()):
+            yield f"{self.name}{_label_text(self.label_names, labels)} {_number(value)}"
+
+
+class Stopwatch:
+    # Adds up the seconds spent in each named stage
+    def __init__(self, seconds: Optional[Dict[str, float]] = None):
+        self.seconds = seconds if seconds is not None else {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] = self.seconds.get(name, 0.0) + time.perf_counter() - start
+
+
+FETCH_SECONDS = Histogram("weblens_fetch_seconds", "Time to fetch a page from its site", LATENCY_BUCKETS, ["outcome"])
+FETCH_BYTES = Histogram("weblens_fetch_response_bytes", "Decoded size of fetched pages", SIZE_BUCKETS)
+PARSE_SECONDS = Histogram("weblens_parse_seconds", "Time to parse a page", LATENCY_BUCKETS, ["parser"])
+RULE_SECONDS = Histogram(
+    "weblens_rule_seconds", "Time spent in each rule, for a sample of analyses", LATENCY_BUCKETS, ["rule"]
+)
+REQUEST_SECONDS = Histogram(
+    "weblens_request_seconds", "Time to answer an API request", LATENCY_BUCKETS, ["method", "route", "status"]
+)
+ISSUES = Counter("weblens_issues_total", "Issues reported by fresh analyses", ["type"])
+RATE_LIMITED = Counter("weblens_rate_limited_total", "Requests rejected by the rate limiter", ["route"])
+TEMPLATE_LOOKUPS = Counter(
+    "weblens_template_cache_lookups_total", "Template subtrees looked up in the template cache", ["result"]
+)
+
+
+def sample_rules() -> bool:
+    # Whether this analysis times each rule; timing every visit costs a few
+    # percent, so only a fraction of analyses pay it
+    rate = settings.metrics_rule_sample_rate
+    return rate > 0 and (rate >= 1 or random.random() < rate)
+
+def count_issues(issue_types: Sequence[str]) -> None:
+    for issue_type, count in Tally(issue_types).items():
+        ISSUES.inc(issue_type, amount=count)
+
+@contextmanager
+def recording() -> Iterator[List[Observation]]:
+    # Buffers observations instead of adding them to this process's registry
+    global _recording
+    previous, _recording = _recording, []
+    try:
+        yield _recording
+    finally:
+        _recording = previous
+
+def replay(observations: Sequence[Observation]) -> None:
+    for name, labels, value in observations:
+        REGISTRY[name].record(labels, value)
+
+def exposition() -> str:
+    lines = []
+    for metric in REGISTRY.values():
+        lines.extend(metric.exposition())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,98 @@
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from checks import RULESET_VERSION
+from settings import settings
+from telemetry import TEMPLATE_LOOKUPS
+
+# Pages of a site repeat the same header, navigation, footer and modals.
+# The walk fingerprints each such template subtree (traversal.TemplateSubtree)
+# and the checks whose issues depend only on the subtree (Check.local) are
+# run on it once per process; later pages with the same subtree are given
+# the cached issues. Issues from template subtrees carry the fingerprint as
+# `template`, so site-wide summaries can count them once.
+
+SEVERITIES = ("critical", "serious", "moderate", "minor")
+
+
+class TemplateCache:
+    # LRU of the issues each local check found in a template subtree, by
+    # fingerprint; the issues' snippets are already rendered
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Dict[str, List[Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, fingerprint: str) -> Tuple:
+        # Snippets are rendered before caching, so their settings are part
+        # of the key
+        return (RULESET_VERSION, settings.snippet_mode, settings.snippet_max_length, fingerprint)
+
+    def get(self, fingerprint: str, names: List[str]) -> Optional[List[List[Any]]]:
+        entry = self._entries.get(self._key(fingerprint))
+        if entry is None or any(name not in entry for name in names):
+            self.misses += 1
+            TEMPLATE_LOOKUPS.inc("miss")
+            return None
+        self._entries.move_to_end(self._key(fingerprint))
+        self.hits += 1
+        TEMPLATE_LOOKUPS.inc("hit")
+        return [entry[name] for name in names]
+
+    def put(self, fingerprint: str, names: List[str], records: List[List[Any]]) -> None:
+        if self.max_entries <= 0:
+            return
+        key = self._key(fingerprint)
+        entry = self._entries.setdefault(key, {})
+        entry.update(zip(names, records))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def as_dict(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# One per process: analysis workers each learn a site's templates from the
+# first of its pages they analyze
+TEMPLATE_CACHE = TemplateCache(settings.template_cache_entries)
+
+
+def issue_counts(report: Dict[str, Any]) -> Tuple[Dict[str, int], Dict[str, Dict[str, int]]]:
+    # Issues by severity: those outside template subtrees, and those of each
+    # template subtree by fingerprint
+    own: Counter = Counter()
+    templates: Dict[str, Counter] = {}
+    for issues in report["issues_by_type"].values():
+        for issue in issues:
+            template = issue.get("template")
+            if template is None:
+                own[issue["severity"]] += 1
+            else:
+                templates.setdefault(template, Counter())[issue["severity"]] += 1
+    return dict(own), {template: dict(counts) for template, counts in templates.items()}
+
+
+class SiteIssues:
+    # Issue counts over the pages of a site, with each template subtree's
+    # issues counted once rather than once per page it appears on
+    def __init__(self):
+        self.counts: Counter = Counter()
+        self.pages_by_template: Counter = Counter()
+
+    def add(self, own: Dict[str, int], templates: Dict[str, Dict[str, int]]) -> None:
+        self.counts.update(own)
+        for template, counts in templates.items():
+            if template not in self.pages_by_template:
+                self.counts.update(counts)
+            self.pages_by_template[template] += 1
+
+    def add_report(self, report: Dict[str, Any]) -> None:
+        self.add(*issue_counts(report))
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "total_issues": sum(self.counts.values()),
+            **{severity: self.counts[severity] for severity in SEVERITIES},
+            "shared_templates": sum(1 for pages in self.pages_by_template.values() if pages > 1),
+        }
@@ -0,0 +1,57 @@
+import os
+from pathlib import Path
+
+# Settings are read once at import, so the test environment is set before
+# any backend module loads: analysis inline, no history and an in-memory
+# job queue
+os.environ.setdefault("WEBLENS_ANALYSIS_WORKERS", "0")
+os.environ.setdefault("WEBLENS_HISTORY_PATH", "")
+os.environ.setdefault("WEBLENS_JOBS_PATH", ":memory:")
+
+import httpx
+import pytest
+from typing import Dict, Optional
+
+FIXTURES_DIR = Path(__file__).parent.parent / "fixtures"
+FIXTURE_PAGES = sorted(FIXTURES_DIR.glob("*.html"))
+
+
+def site_transport(pages: Dict[str, str], redirects: Optional[Dict[str, str]] = None) -> httpx.MockTransport:
+    # Serves `pages` by path, answering 404 for anything else
+    redirects = redirects or {}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if path in redirects:
+            return httpx.Response(301, headers={"location": redirects[path]})
+        if path not in pages:
+            return httpx.Response(404, headers={"content-type": "text/html"}, text="<h1>Not found</h1>")
+        return httpx.Response(200, headers={"content-type": "text/html; charset=utf-8"}, text=pages[path])
+    return httpx.MockTransport(handler)
+
+
+def fixture_transport() -> httpx.MockTransport:
+    return site_transport({f"/{page.name}": page.read_text(encoding="utf-8") for page in FIXTURE_PAGES})
+
+
+@pytest.fixture
+def fixture_pages():
+    return FIXTURE_PAGES
+
+
+@pytest.fixture
+def client():
+    # The application with its lifespan running, fetching pages from the
+    # fixtures and without rate limits
+    from fastapi.testclient import TestClient
+    from main import app
+
+    with TestClient(app) as client:
+        default_client = app.state.http_client
+        app.state.http_client = httpx.AsyncClient(transport=fixture_transport())
+        app.state.limiter.enabled = False
+        try:
+            yield client
+        finally:
+            app.state.limiter.enabled = True
+            app.state.http_client = default_client
@@ -0,0 +1,50 @@
+import asyncio
+from batch import BatchRunner, HostLimiter
+from http_client import FetchError
+
+
+async def test_host_limiter_bounds_fetches_per_host():
+    limiter = HostLimiter(per_host=2)
+    active = {"a.test": 0, "b.test": 0}
+    peak = {"a.test": 0, "b.test": 0}
+
+    async def fetch(url, host):
+        async with limiter.acquire(url):
+            active[host] += 1
+            peak[host] = max(peak[host], active[host])
+            await asyncio.sleep(0.01)
+            active[host] -= 1
+
+    await asyncio.gather(
+        *[fetch(f"https://a.test/{index}", "a.test") for index in range(6)],
+        *[fetch(f"https://B.TEST/{index}", "b.test") for index in range(6)],
+    )
+    assert peak == {"a.test": 2, "b.test": 2}
+
+
+async def test_host_limiter_drops_idle_hosts():
+    limiter = HostLimiter(per_host=1)
+    async with limiter.acquire("https://a.test/"):
+        assert list(limiter._semaphores) == ["a.test"]
+    assert limiter._semaphores == {}
+    assert limiter._users == {}
+
+
+class FakeChecker:
+    parser_name = "html.parser"
+    rules_name = "all"
+
+    async def analyze_url(self, url):
+        if url.endswith("/missing"):
+            raise FetchError("not_html", "Expected an HTML page", 415)
+        return {"url": url, "compliance_score": 100.0}
+
+
+async def test_batch_reports_each_url_and_its_failures():
+    runner = BatchRunner(concurrency=2, per_host=1)
+    result = await runner.run(FakeChecker(), ["https://a.test/", "https://a.test/missing"])
+    assert result["summary"] == {"total": 2, "succeeded": 1, "failed": 1}
+    ok, failed = result["results"]
+    assert ok["report"] == {"url": "https://a.test/", "compliance_score": 100.0}
+    assert failed["report"] is None
+    assert failed["error"]["reason"] == "not_html"
@@ -0,0 +1,49 @@
+import json
+import sys
+import benchmark
+from benchmark import NOISE_FLOOR, regressions, synthetic_page
+
+
+def test_synthetic_pages_are_deterministic():
+    for kind in benchmark.KINDS:
+        page = synthetic_page(kind, 10_000)
+        assert page == synthetic_page(kind, 10_000)
+        assert len(page) >= 10_000
+    assert synthetic_page("mixed", 10_000) != synthetic_page("mixed", 10_000, seed=1)
+
+
+def test_regressions_flags_timings_past_the_threshold():
+    baseline = {"page/parse": 0.010, "page/rule:images": 0.010, "page/rule:links": 0.010}
+    timings = {"page/parse": 0.014, "page/rule:images": 0.016, "page/rule:links": 0.009, "page/new": 1.0}
+    assert regressions(timings, baseline, 1.5) == [("page/rule:images", 0.010, 0.016)]
+
+
+def test_regressions_ignores_slowdowns_below_the_noise_floor():
+    baseline = {"page/rule:tables": NOISE_FLOOR / 10}
+    timings = {"page/rule:tables": NOISE_FLOOR / 2}
+    assert regressions(timings, baseline, 1.5) == []
+
+
+def run_main(monkeypatch, tmp_path, *args):
+    argv = ["benchmark.py", "--sizes", "10k", "--kinds", "forms", "--rounds", "1", "--fixtures", str(tmp_path), *args]
+    monkeypatch.setattr(sys, "argv", argv)
+    return benchmark.main()
+
+
+def test_baseline_round_trip_and_threshold_gate(monkeypatch, tmp_path):
+    baseline_path = tmp_path / "baseline.json"
+    assert run_main(monkeypatch, tmp_path, "--save", str(baseline_path)) == 0
+    saved = json.loads(baseline_path.read_text())
+    assert "forms-10k/parse" in saved["timings"]
+    assert "forms-10k/rule:forms" in saved["timings"]
+    assert "forms-10k/serialize:fast" in saved["timings"]
+
+    # Every stage takes far longer than a baseline of ten microseconds
+    saved["timings"] = {key: 0.00001 for key in saved["timings"]}
+    baseline_path.write_text(json.dumps(saved))
+    assert run_main(monkeypatch, tmp_path, "--baseline", str(baseline_path)) == 1
+
+    # and far less than a baseline of a minute
+    saved["timings"] = {key: 60.0 for key in saved["timings"]}
+    baseline_path.write_text(json.dumps(saved))
+    assert run_main(monkeypatch, tmp_path, "--baseline", str(baseline_path)) == 0
@@ -0,0 +1,104 @@
+import httpx
+import pytest
+from conftest import site_transport
+from crawler import SeenSet, SiteCrawler, canonicalize
+from wcag_checker import WCAGChecker
+
+PAGE = "<html lang='en'><head><title>{0}</title></head><body><main><h1>{0}</h1>{1}</main></body></html>"
+
+
+def page(title, *links):
+    return PAGE.format(title, "".join(f"<a href='{link}'>{link}</a>" for link in links))
+
+
+def test_seen_set_keeps_each_url_once():
+    seen = SeenSet()
+    assert seen.add("https://a.test/")
+    assert seen.add("https://a.test/about")
+    assert not seen.add("https://a.test/")
+    assert len(seen) == 2
+
+
+def test_canonicalize():
+    base = "https://a.test/docs/"
+    assert canonicalize("intro#top", base) == "https://a.test/docs/intro"
+    assert canonicalize("HTTPS://A.test:443", base) == "https://a.test/"
+    assert canonicalize("/guide.pdf", base) is None
+    assert canonicalize("mailto:team@a.test", base) is None
+    assert canonicalize("http://[broken", base) is None
+
+
+async def crawl(pages, robots_status=None, max_depth=3, max_pages=50, redirects=None):
+    transport = site_transport(pages, redirects)
+    if robots_status is not None:
+        handler = transport.handler
+
+        def robots_handler(request):
+            if request.url.path == "/robots.txt":
+                return httpx.Response(robots_status)
+            return handler(request)
+        transport = httpx.MockTransport(robots_handler)
+
+    async with httpx.AsyncClient(transport=transport, follow_redirects=True) as client:
+        checker = WCAGChecker(client=client, rules="wcag")
+        return await SiteCrawler(checker, max_depth, max_pages, concurrency=2).crawl("https://a.test/")
+
+
+SITE = {
+    "/": page("Home", "/about", "/docs", "https://elsewhere.test/", "/logo.png"),
+    "/about": page("About", "/", "/docs"),
+    "/docs": page("Docs", "/docs/private"),
+    "/docs/private": page("Private"),
+}
+
+
+async def test_crawl_visits_each_same_origin_page_once():
+    result = await crawl(SITE)
+    assert [page["url"] for page in result["pages"]] == [
+        "https://a.test/", "https://a.test/about", "https://a.test/docs", "https://a.test/docs/private",
+    ]
+    assert result["crawl"] == {
+        "pages_fetched": 4, "failed": 0, "blocked_by_robots": 0, "duplicates": 0, "urls_seen": 4
+    }
+    assert result["rollup"]["pages"] == 4
+
+
+async def test_crawl_returns_page_summaries_and_rolls_up_the_reports():
+    result = await crawl(SITE)
+    page = result["pages"][0]
+    assert set(page) == {"url", "depth", "compliance_score", "summary", "error"}
+    assert result["rollup"]["summary"]["total_issues"] == sum(
+        page["summary"]["total_issues"] for page in result["pages"]
+    )
+    scores = [page["compliance_score"] for page in result["pages"]]
+    assert result["rollup"]["compliance_score"] == round(sum(scores) / len(scores), 1)
+
+
+async def test_a_redirect_to_a_crawled_page_is_not_audited_again():
+    site = {**SITE, "/": page("Home", "/index.html", "/about", "/old-docs"), "/about": page("About", "/")}
+    result = await crawl(site, redirects={"/index.html": "/", "/old-docs": "/docs"})
+    assert [page["url"] for page in result["pages"]] == [
+        "https://a.test/", "https://a.test/about", "https://a.test/docs", "https://a.test/docs/private",
+    ]
+    assert result["crawl"]["duplicates"] == 1
+    assert result["rollup"]["pages"] == 4
+
+
+async def test_crawl_stops_at_max_depth_and_max_pages():
+    assert [page["url"] for page in (await crawl(SITE, max_depth=0))["pages"]] == ["https://a.test/"]
+    assert len((await crawl(SITE, max_pages=2))["pages"]) == 2
+
+
+async def test_robots_txt_rules_are_followed():
+    site = {**SITE, "/robots.txt": "User-agent: *\nDisallow: /docs/"}
+    result = await crawl(site)
+    assert "https://a.test/docs/private" not in [page["url"] for page in result["pages"]]
+    assert result["crawl"]["blocked_by_robots"] == 1
+
+
+@pytest.mark.parametrize("status, fetched", [(404, 4), (403, 0), (503, 0)])
+async def test_robots_txt_errors(status, fetched):
+    # A missing robots.txt allows everything, a forbidden or failing one
+    # nothing
+    result = await crawl(SITE, robots_status=status)
+    assert result["crawl"]["pages_fetched"] == fetched
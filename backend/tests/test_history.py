@@ -0,0 +1,60 @@
+import pytest
+from history import ReportHistory, diff_reports
+from wcag_checker import WCAGChecker
+
+URL = "https://a.test/"
+PAGE = "<html lang='en'><head><title>Home</title></head><body><main><h1>Home</h1>{}</main></body></html>"
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = ReportHistory(str(tmp_path / "history.sqlite3"))
+    yield history
+    history.close()
+
+
+async def audit(history, html, rules="wcag"):
+    checker = WCAGChecker(rules=rules, history=history)
+    return await checker.analyze_page(html, URL)
+
+
+async def test_unchanged_pages_reuse_the_stored_report(history):
+    first = await audit(history, PAGE.format("<img src='a.png'>"))
+    second = await audit(history, PAGE.format("<img src='a.png'>"))
+    assert second == first
+    assert len(await history.scores(WCAGChecker(rules="wcag"), URL, 10)) == 2
+
+
+async def test_content_changed_follows_the_page_not_the_rules(history):
+    await audit(history, PAGE.format(""), rules="wcag")
+    await audit(history, PAGE.format(""), rules="all")
+    await audit(history, PAGE.format(""), rules="wcag")
+    await audit(history, PAGE.format("<img src='a.png'>"), rules="wcag")
+
+    wcag = await history.scores(WCAGChecker(rules="wcag"), URL, 10)
+    assert [audit["content_changed"] for audit in wcag] == [True, False, True]
+    everything = await history.scores(WCAGChecker(rules="all"), URL, 10)
+    assert len(everything) == 1
+    assert everything[0]["compliance_score"] != wcag[1]["compliance_score"]
+
+
+async def test_scores_are_paged_newest_first(history):
+    for index in range(5):
+        await audit(history, PAGE.format("<img src='a.png'>" * index))
+    checker = WCAGChecker(rules="wcag")
+    first_page = await history.scores(checker, URL, 2)
+    second_page = await history.scores(checker, URL, 2, before=first_page[-1]["checked_at"])
+    totals = [audit["total_issues"] for audit in first_page + second_page]
+    # One missing alt text per image
+    assert totals == [totals[0], totals[0] - 1, totals[0] - 2, totals[0] - 3]
+    assert all(audit["content_changed"] for audit in first_page + second_page)
+
+
+async def test_diff_lists_added_and_resolved_issues():
+    checker = WCAGChecker(rules="wcag")
+    before = checker.analyze_html(PAGE.format("<img src='a.png'><a href='/'></a>"), URL)
+    after = checker.analyze_html(PAGE.format("<img src='a.png'><iframe src='/x'></iframe>"), URL)
+    diff = diff_reports({"report": before, "content_hash": b"old", "checked_at": 1.0}, after, b"new")
+    assert diff["content_changed"]
+    assert [issue["type"] for issue in diff["added"]] == ["iframe_title"]
+    assert [issue["type"] for issue in diff["resolved"]] == ["empty_link"]
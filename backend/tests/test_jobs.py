@@ -0,0 +1,139 @@
+import asyncio
+import sqlite3
+import httpx
+import pytest
+from http_client import FetchError, FetchResult
+from jobs import DONE, FAILED, FETCHING, QUEUED, JobQueue, JobQueueFullError
+
+
+class FakeChecker:
+    def __init__(self, parser, rules):
+        self.parser = parser
+        self.rules = rules
+
+    async def fetch(self, url):
+        if "missing" in url:
+            raise FetchError("not_html", "Expected an HTML page", 415)
+        return FetchResult(url, 200, httpx.Headers(), "<html></html>")
+
+    async def analyze_page(self, html_content, url):
+        return {"url": url, "rules": self.rules, "compliance_score": 100.0}
+
+
+def job_queue(path, **options):
+    settings = {"fetch_workers": 2, "analysis_workers": 1, "max_queued": 100, "retention": 3600}
+    settings.update(options)
+    return JobQueue(str(path), FakeChecker, **settings)
+
+
+async def finished(queue, job_id, timeout=5.0):
+    async def poll():
+        while True:
+            job = await queue.get(job_id)
+            if job["status"] in (DONE, FAILED):
+                return job
+            await asyncio.sleep(0.01)
+    return await asyncio.wait_for(poll(), timeout)
+
+
+async def test_jobs_run_to_completion(tmp_path):
+    queue = job_queue(tmp_path / "jobs.sqlite3")
+    await queue.start()
+    try:
+        job = await queue.submit("https://example.com/", rules="wcag")
+        assert job["status"] == QUEUED
+        done = await finished(queue, job["id"])
+        failed = await finished(queue, (await queue.submit("https://example.com/missing"))["id"])
+    finally:
+        await queue.stop()
+
+    assert done["status"] == DONE
+    assert done["progress"] == 1.0
+    assert done["report"] == {"url": "https://example.com/", "rules": "wcag", "compliance_score": 100.0}
+    assert failed["status"] == FAILED
+    assert failed["error"]["reason"] == "not_html"
+
+
+async def test_unknown_jobs_are_none():
+    queue = job_queue(":memory:")
+    assert await queue.get("nope") is None
+    await queue.stop()
+
+
+async def test_submit_fails_when_the_queue_is_full():
+    # Without workers nothing leaves the queue
+    queue = job_queue(":memory:", max_queued=1)
+    await queue.submit("https://example.com/a")
+    with pytest.raises(JobQueueFullError):
+        await queue.submit("https://example.com/b")
+    await queue.stop()
+
+
+async def test_interrupted_jobs_are_queued_again_at_startup(tmp_path):
+    path = tmp_path / "jobs.sqlite3"
+    queue = job_queue(path)
+    queued = await queue.submit("https://example.com/queued")
+    interrupted = await queue.submit("https://example.com/interrupted")
+    await queue.stop()
+    with sqlite3.connect(path) as db:
+        db.execute("UPDATE jobs SET status = ?, started_at = 1 WHERE id = ?", (FETCHING, interrupted["id"]))
+    db.close()
+
+    restarted = job_queue(path)
+    await restarted.start()
+    try:
+        for job in (queued, interrupted):
+            assert (await finished(restarted, job["id"]))["status"] == DONE
+    finally:
+        await restarted.stop()
+
+
+async def test_workers_survive_database_errors():
+    queue = job_queue(":memory:", fetch_workers=1)
+    claim = queue._claim
+    calls = 0
+
+    def flaky_claim(job_id):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return claim(job_id)
+
+    queue._claim = flaky_claim
+    await queue.start()
+    try:
+        first = await queue.submit("https://example.com/a")
+        second = await queue.submit("https://example.com/b")
+        failed = await finished(queue, first["id"])
+        done = await finished(queue, second["id"])
+    finally:
+        await queue.stop()
+
+    assert failed["status"] == FAILED
+    assert failed["error"] == {"message": "database is locked", "type": "OperationalError"}
+    assert done["status"] == DONE
+
+
+async def test_database_is_created_with_the_first_job(tmp_path):
+    path = tmp_path / "state" / "jobs.sqlite3"
+    queue = job_queue(path)
+    await queue.start()
+    try:
+        assert await queue.get("nope") is None
+        assert not path.parent.exists()
+        job = await queue.submit("https://example.com/")
+        assert path.exists()
+        assert (await finished(queue, job["id"]))["status"] == DONE
+    finally:
+        await queue.stop()
+
+
+def test_default_path_is_in_the_state_directory(monkeypatch, tmp_path):
+    from settings import _state_file
+
+    monkeypatch.setenv("XDG_STATE_HOME", str(tmp_path))
+    assert _state_file("jobs.sqlite3") == str(tmp_path / "weblens" / "jobs.sqlite3")
+    monkeypatch.delenv("XDG_STATE_HOME")
+    monkeypatch.setenv("HOME", str(tmp_path))
+    assert _state_file("jobs.sqlite3") == str(tmp_path / ".local" / "state" / "weblens" / "jobs.sqlite3")
@@ -0,0 +1,34 @@
+import pytest
+from bs4 import Comment, Doctype
+from conftest import FIXTURE_PAGES
+from parsers import PARSERS, ParserUnavailableError, available_parsers, parse_html
+from wcag_checker import WCAGChecker
+
+REFERENCE_PARSER = "html.parser"
+
+
+@pytest.mark.parametrize("fixture", FIXTURE_PAGES, ids=lambda fixture: fixture.name)
+@pytest.mark.parametrize("parser", [name for name in PARSERS if name != REFERENCE_PARSER])
+def test_backend_reports_match_html_parser(parser, fixture):
+    if parser not in available_parsers():
+        pytest.skip(f"Parser '{parser}' is not installed")
+    html = fixture.read_text(encoding="utf-8")
+    checker = WCAGChecker()
+    expected = checker.analyze_soup(parse_html(html, REFERENCE_PARSER), fixture.name)
+    assert checker.analyze_soup(parse_html(html, parser), fixture.name) == expected
+
+
+@pytest.mark.parametrize("parser", list(PARSERS))
+def test_backends_keep_comments_doctype_and_bytes_input(parser):
+    if parser not in available_parsers():
+        pytest.skip(f"Parser '{parser}' is not installed")
+    markup = "<!DOCTYPE html><html><head><meta charset=utf-8></head><body><!-- note --><p id=a>café</p></body></html>"
+    soup = parse_html(markup.encode("utf-8"), parser)
+    assert soup.find("p", id="a").get_text() == "café"
+    assert any(isinstance(node, Comment) for node in soup.descendants)
+    assert any(isinstance(node, Doctype) for node in soup.contents)
+
+
+def test_unknown_parser_is_rejected():
+    with pytest.raises(ParserUnavailableError):
+        parse_html("<p></p>", "nope")
@@ -0,0 +1,11 @@
+from conftest import FIXTURE_PAGES
+
+BASE_URL = "http://fixtures.test/"
+
+
+def test_debug_timings_keep_the_fetch_phases_apart_from_the_total(client):
+    response = client.post("/check?debug=true", json={"url": BASE_URL + FIXTURE_PAGES[0].name})
+    assert response.status_code == 200
+    timings = response.json()["timings"]
+    assert set(timings["fetch"]) == {"connect", "tls", "ttfb", "download"}
+    assert timings["total"] >= timings["analysis"]
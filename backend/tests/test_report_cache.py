@@ -0,0 +1,96 @@
+import httpx
+from http_client import FetchResult
+from report_cache import HIT, MISS, REVALIDATED, ReportCache, normalize_url
+
+
+class FakeChecker:
+    parser_name = "html.parser"
+    rules_name = "all"
+
+    def __init__(self, etag="v1"):
+        self.etag = etag
+        self.status_code = 200
+        self.requests = []
+        self.analyses = 0
+
+    async def fetch(self, url, headers=None):
+        self.requests.append(dict(headers or {}))
+        if self.status_code == 304:
+            return FetchResult(url, 304, httpx.Headers({"etag": self.etag}), "")
+        return FetchResult(url, self.status_code, httpx.Headers({"etag": self.etag}), "<html></html>")
+
+    async def analyze_page(self, html_content, url):
+        self.analyses += 1
+        return {"url": url, "compliance_score": 100.0 - self.analyses}
+
+
+def test_normalize_url():
+    assert normalize_url("HTTP://Example.COM:80") == "http://example.com/"
+    assert normalize_url("https://example.com:8443/a?b=1#top") == "https://example.com:8443/a?b=1"
+
+
+async def test_fresh_entry_is_served_without_fetching():
+    cache = ReportCache(ttl=60, max_bytes=1 << 20)
+    checker = FakeChecker()
+    first, status = await cache.analyze(checker, "https://example.com/")
+    assert status == MISS
+    second, status = await cache.analyze(checker, "https://EXAMPLE.com/#top")
+    assert status == HIT
+    assert second == {**first, "url": "https://EXAMPLE.com/#top"}
+    assert len(checker.requests) == 1
+    assert cache.as_dict()[HIT] == 1
+
+
+async def test_stale_entry_is_revalidated_with_its_validators():
+    cache = ReportCache(ttl=0, max_bytes=1 << 20)
+    checker = FakeChecker(etag='"abc"')
+    first, _ = await cache.analyze(checker, "https://example.com/")
+
+    checker.status_code = 304
+    report, status = await cache.analyze(checker, "https://example.com/")
+    assert status == REVALIDATED
+    assert report == first
+    assert checker.requests[-1] == {"If-None-Match": '"abc"'}
+    assert checker.analyses == 1
+
+
+async def test_stale_entry_is_replaced_when_the_page_changed():
+    cache = ReportCache(ttl=0, max_bytes=1 << 20)
+    checker = FakeChecker()
+    first, _ = await cache.analyze(checker, "https://example.com/")
+    report, status = await cache.analyze(checker, "https://example.com/")
+    assert status == MISS
+    assert report != first
+    assert checker.analyses == 2
+
+
+async def test_failed_fetches_are_not_cached():
+    cache = ReportCache(ttl=60, max_bytes=1 << 20)
+    checker = FakeChecker()
+    checker.status_code = 500
+    await cache.analyze(checker, "https://example.com/")
+    _, status = await cache.analyze(checker, "https://example.com/")
+    assert status == MISS
+    assert cache.as_dict()["entries"] == 0
+
+
+def test_least_recently_used_entries_are_evicted_past_the_budget():
+    # Room for three of these reports
+    report = {"padding": "x" * 30}
+    cache = ReportCache(ttl=60, max_bytes=150)
+    for name in ("a", "b", "c"):
+        cache.put((name,), report, {})
+    cache.get(("a",))
+    cache.put(("d",), report, {})
+
+    assert cache.total_bytes <= 150
+    assert cache.as_dict()["evictions"] == 1
+    assert cache.get(("a",)) is not None
+    assert cache.get(("b",)) is None
+    assert cache.get(("d",)) is not None
+
+
+def test_reports_larger_than_the_budget_are_not_stored():
+    cache = ReportCache(ttl=60, max_bytes=10)
+    cache.put(("a",), {"padding": "x" * 30}, {})
+    assert cache.as_dict()["entries"] == 0
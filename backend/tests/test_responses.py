@@ -0,0 +1,93 @@
+import gzip
+import json
+import httpx
+import pytest
+from starlette.requests import Request
+from conftest import FIXTURE_PAGES
+from main import ComplianceReport
+from responses import brotli, fast_response, msgpack, orjson
+from settings import settings
+from wcag_checker import WCAGChecker
+
+BASE_URL = "http://fixtures.test/"
+# Accept and Accept-Encoding of each encoding the fast path offers
+VARIANTS = {
+    "json": ("application/json", "identity"),
+    "gzip": ("application/json", "gzip"),
+    "br": ("application/json", "br"),
+    "msgpack": ("application/msgpack", "identity"),
+}
+
+
+def same(a, b):
+    # Equality that also tells 1 from 1.0 and True from 1
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, dict):
+        return list(a) == list(b) and all(same(a[key], b[key]) for key in a)
+    if isinstance(a, list):
+        return len(a) == len(b) and all(same(x, y) for x, y in zip(a, b))
+    return a == b
+
+
+def skip_unavailable(variant):
+    if variant == "br" and brotli is None:
+        pytest.skip("brotli is not installed")
+    if variant == "msgpack" and msgpack is None:
+        pytest.skip("msgpack is not installed")
+
+
+def request_for(variant):
+    accept, accept_encoding = VARIANTS[variant]
+    headers = [(b"accept", accept.encode()), (b"accept-encoding", accept_encoding.encode())]
+    return Request({"type": "http", "method": "POST", "path": "/check", "headers": headers})
+
+
+def decode(body, headers):
+    encoding = headers.get("content-encoding")
+    if encoding == "gzip":
+        body = gzip.decompress(body)
+    elif encoding == "br":
+        body = brotli.decompress(body)
+    if headers["content-type"].startswith("application/msgpack"):
+        return msgpack.unpackb(body)
+    return json.loads(body)
+
+
+@pytest.mark.parametrize("variant", list(VARIANTS))
+@pytest.mark.parametrize("fixture", FIXTURE_PAGES, ids=lambda fixture: fixture.name)
+def test_fast_response_matches_the_response_model(fixture, variant):
+    skip_unavailable(variant)
+    report = WCAGChecker().analyze_html(fixture.read_text(encoding="utf-8"), BASE_URL + fixture.name)
+    expected = ComplianceReport.model_validate(report).model_dump(mode="json")
+
+    response = fast_response(request_for(variant), report)
+    if variant in ("gzip", "br"):
+        assert response.headers["content-encoding"] == variant
+    assert same(decode(response.body, response.headers), expected)
+
+
+def endpoint_requests():
+    urls = [BASE_URL + fixture.name for fixture in FIXTURE_PAGES]
+    requests = [("/check", {"url": url}) for url in urls]
+    requests.append(("/check/batch", {"urls": urls + [BASE_URL + "missing.html"]}))
+    requests.append(("/crawl", {"url": urls[0], "max_depth": 1, "max_pages": 10}))
+    return requests
+
+
+@pytest.mark.parametrize("variant", list(VARIANTS))
+def test_fast_endpoints_match_the_validated_endpoints(client, monkeypatch, variant):
+    skip_unavailable(variant)
+    accept, accept_encoding = VARIANTS[variant]
+    for path, body in endpoint_requests():
+        monkeypatch.setattr(settings, "fast_responses", False)
+        expected = client.post(path, json=body)
+        monkeypatch.setattr(settings, "fast_responses", True)
+        response = client.post(path, json=body, headers={"Accept": accept, "Accept-Encoding": accept_encoding})
+
+        assert response.status_code == expected.status_code
+        assert response.headers.get("content-encoding", "identity") == accept_encoding
+        # The test client has already undone the Content-Encoding
+        assert same(decode(response.content, {"content-type": response.headers["content-type"]}), expected.json())
+        if variant == "json" and orjson is not None:
+            assert response.content == expected.content
@@ -0,0 +1,113 @@
+import asyncio
+import pytest
+from singleflight import SingleFlight
+
+
+async def test_concurrent_callers_share_one_call():
+    flights = SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+
+    async def audit():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return "report"
+
+    callers = [asyncio.create_task(flights.run("page", audit)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*callers)
+
+    assert calls == 1
+    assert [result for result, _ in results] == ["report"] * 5
+    assert sorted(shared for _, shared in results) == [False] + [True] * 4
+    assert flights.as_dict() == {"in_flight": 0, "leaders": 1, "coalesced": 4}
+
+
+async def test_different_keys_run_separately():
+    flights = SingleFlight()
+
+    async def audit():
+        await asyncio.sleep(0)
+        return "report"
+
+    await asyncio.gather(flights.run("a", audit), flights.run("b", audit))
+    assert flights.leaders == 2
+    assert flights.coalesced == 0
+
+
+async def test_errors_reach_every_caller():
+    flights = SingleFlight()
+
+    async def audit():
+        await asyncio.sleep(0)
+        raise ValueError("fetch failed")
+
+    results = await asyncio.gather(*[flights.run("page", audit) for _ in range(3)], return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flights.as_dict()["in_flight"] == 0
+
+
+async def test_one_caller_cancelling_leaves_the_call_running_for_the_others():
+    flights = SingleFlight()
+    release = asyncio.Event()
+
+    async def audit():
+        await release.wait()
+        return "report"
+
+    leader = asyncio.create_task(flights.run("page", audit))
+    follower = asyncio.create_task(flights.run("page", audit))
+    await asyncio.sleep(0)
+    leader.cancel()
+    release.set()
+
+    assert await follower == ("report", True)
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+
+
+async def test_call_is_cancelled_when_every_caller_has_gone():
+    flights = SingleFlight()
+    cancelled = asyncio.Event()
+
+    async def audit():
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    caller = asyncio.create_task(flights.run("page", audit))
+    await asyncio.sleep(0)
+    caller.cancel()
+    await asyncio.wait_for(cancelled.wait(), 1)
+
+
+async def test_caller_after_an_abandoned_call_starts_a_new_one():
+    flights = SingleFlight()
+    calls = 0
+
+    async def audit():
+        nonlocal calls
+        calls += 1
+        call = calls
+        try:
+            await asyncio.sleep(0.05 if call == 1 else 0)
+        except asyncio.CancelledError:
+            # Cleanup that outlives the cancellation
+            await asyncio.sleep(0.05)
+            raise
+        return f"report {call}"
+
+    leader = asyncio.create_task(flights.run("page", audit))
+    await asyncio.sleep(0)
+    leader.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+
+    assert await flights.run("page", audit) == ("report 2", False)
+    assert flights.leaders == 2
+    await asyncio.sleep(0.1)
+    assert flights.as_dict()["in_flight"] == 0
@@ -0,0 +1,35 @@
+import pytest
+from wcag_checker import WCAGChecker
+
+PAGE = (
+    "<html lang='en'><head><title>Shop</title></head><body><main><h1>Shop</h1>"
+    "<img src='a.png'><form><input id='q'></form><div onclick='go()'>Go</div>"
+    "</main></body></html>"
+)
+COVERAGE = ("alt_text_coverage", "form_labels_coverage", "interactive_elements_accessibility")
+
+
+def metrics(rules):
+    return WCAGChecker(rules=rules).analyze_html(PAGE, "https://a.test/")["metrics"]
+
+
+def test_all_rules_report_every_metric():
+    result = metrics("all")
+    assert tuple(result["accessibility_coverage"]) == COVERAGE
+    assert result["accessibility_coverage"]["alt_text_coverage"] == 0.0
+    assert {"wcag_compliance", "heuristics_compliance", "element_counts", "structure"} <= set(result)
+
+
+@pytest.mark.parametrize("rules, coverage", [
+    (["images"], ("alt_text_coverage",)),
+    (["forms", "keyboard_nav"], ("form_labels_coverage", "interactive_elements_accessibility")),
+])
+def test_coverage_needs_the_rule_that_feeds_it(rules, coverage):
+    assert tuple(metrics(rules)["accessibility_coverage"]) == coverage
+
+
+def test_heuristics_leave_out_wcag_metrics():
+    result = metrics("heuristics")
+    assert "accessibility_coverage" not in result
+    assert "wcag_compliance" not in result
+    assert "heuristics_compliance" in result
@@ -0,0 +1,281 @@
+from bs4 import BeautifulSoup, Tag
+from collections import defaultdict
+from dataclasses import dataclass
+from hashlib import blake2b
+from typing import Any, Dict, Iterable, List, Optional
+from dom_index import DocumentIndex
+from document_text import DocumentText
+from functools import cached_property
+from time import perf_counter
+
+LANDMARK_TAGS = {'header', 'nav', 'main', 'footer', 'article', 'aside'}
+PREFORMATTED_TAGS = {'code', 'pre'}
+# Roots of the subtrees that sites repeat on every page (site header,
+# navigation, footer, sidebars, cookie and other modals)
+TEMPLATE_TAGS = {'header', 'nav', 'footer', 'aside', 'dialog'}
+TEMPLATE_ROLES = {'banner', 'navigation', 'contentinfo', 'complementary', 'dialog', 'alertdialog'}
+
+
+@dataclass(slots=True)
+class Annotation:
+    # Structural facts about an element, derived from its parent's
+    # annotation as the walk reaches it
+    depth: int
+    form: Optional[Tag]
+    landmark: Optional[Tag]
+    preformatted: bool
+
+
+
+class Walk:
+    # State shared with visitors while the tree is being walked. `path` holds
+    # the ancestors of the element currently being visited (root first), so
+    # path[i] is the ancestor at depth i + 1. `index` is filled in as the
+    # walk goes and is complete by the time visitors finish, as is the
+    # annotation table. `text` is extracted from the whole document the first
+    # time it is used.
+    def __init__(self, soup: BeautifulSoup):
+        self.soup = soup
+        self.index = DocumentIndex()
+        self.annotations: Dict[int, Annotation] = {}
+        self.path: List[Tag] = []
+        self.depth = 0
+
+    @cached_property
+    def text(self) -> DocumentText:
+        return DocumentText(self.soup)
+
+    def annotation(self, element: Tag) -> Annotation:
+        return self.annotations[id(element)]
+
+    def enclosing_forms(self, element: Tag) -> List[Tag]:
+        # Outermost first; nested forms only occur in malformed markup
+        forms = []
+        form = self.annotations[id(element)].form
+        while form is not None:
+            forms.append(form)
+            form = self.annotations[id(form)].form
+        forms.reverse()
+        return forms
+
+    def ancestors(self, name: str) -> List[Tag]:
+        return [tag for tag in self.path if tag.name == name]
+
+    def inside(self, names: Iterable[str]) -> bool:
+        return any(tag.name in names for tag in self.path)
+
+    def has_ancestor(self, element: Optional[Tag], depth: int) -> bool:
+        # O(1) check that `element`, first seen at `depth`, encloses the
+        # element currently being visited
+        return element is not None and len(self.path) >= depth and self.path[depth - 1] is element
+
+
+class Visitor:
+    # Tag names this visitor wants to see. None means every tag.
+    tags: Optional[Iterable[str]] = ()
+    # Attribute names that make any tag interesting to this visitor.
+    attrs: Iterable[str] = ()
+    # True when what the visitor records for an element depends only on that
+    # element and its descendants, not on walk.path or any other element.
+    # Inside template subtrees such visitors are given the records cached
+    # for an identical subtree instead of visiting it; they keep their
+    # records in the list returned by records(), cached under `name`.
+    local = False
+    name = ''
+
+    def visit(self, element: Tag, walk: Walk) -> None:
+        pass
+
+    def finish(self, walk: Walk) -> Any:
+        return None
+
+    def records(self) -> List[Any]:
+        return []
+
+    def share(self, records: List[Any], fingerprint: str) -> None:
+        # Prepares records made inside the template subtree `fingerprint` to
+        # be reused by other documents
+        pass
+
+
+class TimedVisitor(Visitor):
+    # Wraps a visitor and adds up the time spent in its visit and finish
+    # calls. The wrapper's finish returns what the wrapped visitor's does.
+    def __init__(self, visitor: Visitor):
+        self.visitor = visitor
+        self.tags = visitor.tags
+        self.attrs = visitor.attrs
+        self.local = visitor.local
+        self.name = visitor.name
+        self.seconds = 0.0
+
+    def visit(self, element: Tag, walk: Walk) -> None:
+        start = perf_counter()
+        self.visitor.visit(element, walk)
+        self.seconds += perf_counter() - start
+
+    def finish(self, walk: Walk) -> Any:
+        start = perf_counter()
+        result = self.visitor.finish(walk)
+        self.seconds += perf_counter() - start
+        return result
+
+    def records(self) -> List[Any]:
+        return self.visitor.records()
+
+    def share(self, records: List[Any], fingerprint: str) -> None:
+        self.visitor.share(records, fingerprint)
+
+
+class Dispatch:
+    # Which of a set of visitors want to see each element
+    def __init__(self, visitors: Iterable[Visitor]):
+        self.by_tag: Dict[str, List[Visitor]] = defaultdict(list)
+        self.by_attr: Dict[str, List[Visitor]] = defaultdict(list)
+        self.every: List[Visitor] = []
+
+        for visitor in visitors:
+            if visitor.tags is None:
+                self.every.append(visitor)
+                continue
+            for name in visitor.tags:
+                self.by_tag[name].append(visitor)
+            for attr in visitor.attrs:
+                self.by_attr[attr].append(visitor)
+
+    def targets(self, element: Tag) -> List[Visitor]:
+        # Visitors of every tag are not included
+        targets = self.by_tag.get(element.name, [])
+        if self.by_attr:
+            extra = None
+            for attr in element.attrs:
+                for visitor in self.by_attr.get(attr, ()):
+                    if visitor not in targets and (extra is None or visitor not in extra):
+                        if extra is None:
+                            extra = []
+                        extra.append(visitor)
+            if extra:
+                targets = targets + extra
+        return targets
+
+
+class TemplateSubtree:
+    # A template subtree being walked: its elements, in document order, and
+    # a fingerprint of its tags, attributes and strings
+    def __init__(self, depth: int):
+        self.depth = depth
+        self.elements: List[Tag] = []
+        self.hash = blake2b(digest_size=8)
+
+    def add(self, element: Tag, depth: int) -> None:
+        self.elements.append(element)
+        self.hash.update(f"<{depth - self.depth} {element.name} {element.attrs!r}>".encode("utf-8", "surrogatepass"))
+        for child in element.contents:
+            if not isinstance(child, Tag):
+                self.hash.update(f"{type(child).__name__}\x00{child}\x00".encode("utf-8", "surrogatepass"))
+
+    def fingerprint(self) -> str:
+        return self.hash.hexdigest()
+
+
+class TraversalEngine:
+    # With `templates` (a templates.TemplateCache), local visitors skip
+    # template subtrees they have seen in another document and are given
+    # the cached records instead; see Visitor.local.
+    def __init__(self, visitors: Iterable[Visitor], templates: Any = None):
+        self.visitors = list(visitors)
+        self.templates = templates
+        self._all = Dispatch(self.visitors)
+        self._local_visitors = [visitor for visitor in self.visitors if visitor.local] if templates is not None else []
+        self._local = Dispatch(self._local_visitors) if self._local_visitors else None
+        self._others = Dispatch([visitor for visitor in self.visitors if not visitor.local]) if self._local else None
+
+    def _finish_template(self, template: TemplateSubtree, walk: Walk) -> None:
+        # Local visitors record the subtree as if they had visited it in
+        # place: nothing after it has been visited yet
+        fingerprint = template.fingerprint()
+        local = self._local
+        # Templates are only tracked when there are local visitors
+        assert local is not None
+        visitors = self._local_visitors
+        cached = self.templates.get(fingerprint, [visitor.name for visitor in visitors])
+        if cached is not None:
+            for visitor, records in zip(visitors, cached):
+                visitor.records().extend(records)
+            return
+
+        starts = [len(visitor.records()) for visitor in visitors]
+        for element in template.elements:
+            for visitor in local.every:
+                visitor.visit(element, walk)
+            for visitor in local.targets(element):
+                visitor.visit(element, walk)
+        found = []
+        for visitor, start in zip(visitors, starts):
+            records = visitor.records()[start:]
+            visitor.share(records, fingerprint)
+            found.append(records)
+        self.templates.put(fingerprint, [visitor.name for visitor in visitors], found)
+
+    def run(self, soup: BeautifulSoup) -> List[Any]:
+        walk = Walk(soup)
+        path = walk.path
+        index = walk.index
+        annotations = walk.annotations
+        dispatch = self._all
+        every = dispatch.every
+        stack = [(child, 1) for child in reversed(soup.contents) if isinstance(child, Tag)]
+        template: Optional[TemplateSubtree] = None
+        # Dispatch inside template subtrees, None when they are not tracked
+        others = self._others
+
+        # Iterative pre-order walk; every tag is visited exactly once, in
+        # document order, with its ancestors available on walk.path
+        while stack:
+            element, depth = stack.pop()
+            if template is not None and depth <= template.depth:
+                self._finish_template(template, walk)
+                template = None
+                dispatch = self._all
+                every = dispatch.every
+            if template is None and others is not None and (
+                element.name in TEMPLATE_TAGS or element.attrs.get('role') in TEMPLATE_ROLES
+            ):
+                template = TemplateSubtree(depth)
+                dispatch = others
+                every = dispatch.every
+            if template is not None:
+                template.add(element, depth)
+            del path[depth - 1:]
+            walk.depth = depth
+            index.add(element)
+            if path:
+                parent = path[-1]
+                above = annotations[id(parent)]
+                name = parent.name
+                annotations[id(element)] = Annotation(
+                    depth,
+                    parent if name == 'form' else above.form,
+                    parent if name in LANDMARK_TAGS else above.landmark,
+                    above.preformatted or name in PREFORMATTED_TAGS,
+                )
+            else:
+                annotations[id(element)] = Annotation(depth, None, None, False)
+
+            for visitor in every:
+                visitor.visit(element, walk)
+            for visitor in dispatch.targets(element):
+                visitor.visit(element, walk)
+
+            path.append(element)
+            children = element.contents
+            for position in range(len(children) - 1, -1, -1):
+                child = children[position]
+                if isinstance(child, Tag):
+                    stack.append((child, depth + 1))
+
+        if template is not None:
+            self._finish_template(template, walk)
+        walk.path = []
+        walk.depth = 0
+        return [visitor.finish(walk) for visitor in self.visitors]
@@ -46,23 +46,73 @@ interface APIResponse {
   };
 }
 
-const checkCompliance = async (url: string) => {
+type StreamEvent =
+  | { event: 'fetched'; data: { url: string; final_url: string; status_code: number; bytes: number } }
+  | { event: 'check'; data: { check: string; issues: Array<Record<string, any>> } }
+  | { event: 'summary'; data: Omit<APIResponse, 'issues_by_type'> }
+  | { event: 'error'; data: { message: string; type: string } };
+
+// Reads the NDJSON stream from /check/stream and rebuilds the /check response
+const readReport = async (response: Response, onProgress: (message: string) => void): Promise<APIResponse> => {
+  const reader = response.body!.getReader();
+  const decoder = new TextDecoder();
+  const issuesByType: Record<string, Array<Record<string, any>>> = {};
+  let summary: Omit<APIResponse, 'issues_by_type'> | null = null;
+  let buffer = '';
+
+  const handle = (message: StreamEvent) => {
+    switch (message.event) {
+      case 'fetched':
+        onProgress('Page fetched, running accessibility checks...');
+        break;
+      case 'check':
+        for (const { type, ...issue } of message.data.issues) {
+          (issuesByType[type] ??= []).push(issue);
+        }
+        onProgress(`Checked ${message.data.check.replace(/_/g, ' ')}...`);
+        break;
+      case 'summary':
+        summary = message.data;
+        break;
+      case 'error':
+        throw new Error(message.data.message);
+    }
+  };
+
+  for (;;) {
+    const { done, value } = await reader.read();
+    buffer += decoder.decode(value, { stream: !done });
+    const lines = buffer.split('\n');
+    buffer = lines.pop() ?? '';
+    for (const line of lines) {
+      if (line.trim()) handle(JSON.parse(line));
+    }
+    if (done) break;
+  }
+
+  if (!summary) {
+    throw new Error('Failed to check compliance');
+  }
+  return { ...(summary as Omit<APIResponse, 'issues_by_type'>), issues_by_type: issuesByType };
+};
+
+const checkCompliance = async (url: string, onProgress: (message: string) => void) => {
   try {
-    const response = await fetch('http://localhost:8000/check', {
+    const response = await fetch('http://localhost:8000/check/stream', {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
-        'Accept': 'application/json',
+        'Accept': 'application/x-ndjson',
       },
       body: JSON.stringify({ url }),
     });
     
-    if (!response.ok) {
+    if (!response.ok || !response.body) {
       const error = await response.json().catch(() => null);
       throw new Error(error?.detail?.message || 'Failed to check compliance');
     }
     
-    const data: APIResponse = await response.json();
+    const data: APIResponse = await readReport(response, onProgress);
     
     // Transform the data to match expected structure
     return {
@@ -103,6 +153,7 @@ const checkCompliance = async (url: string) => {
 function App() {
   const [url, setUrl] = useState('');
   const [isLoading, setIsLoading] = useState(false);
+  const [progress, setProgress] = useState('');
   const [error, setError] = useState('');
   const [results, setResults] = useState<Omit<ResultsProps, 'url' | 'onDownload'> | null>(null);
 
@@ -112,10 +163,11 @@ function App() {
     setUrl(submittedUrl);
     setIsLoading(true);
     setError('');
+    setProgress('');
     setResults(null);
 
     try {
-      const data = await checkCompliance(submittedUrl);
+      const data = await checkCompliance(submittedUrl, setProgress);
       setResults({
         score: data.score,
         summary: data.summary,
@@ -162,7 +214,7 @@ function App() {
           {isLoading && (
             <div className="flex items-center gap-2 text-blue-600">
               <Loader2 className="w-5 h-5 animate-spin" />
-              Analyzing website accessibility...
+              {progress || 'Analyzing website accessibility...'}
             </div>
           )}
 
@@ -62,6 +62,10 @@ export interface ResultsProps {
       understandable: number;
       robust: number;
     };
+    structure?: {
+      max_depth: number;
+      depth_histogram: number[];
+    };
   };
 }
 